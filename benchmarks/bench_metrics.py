@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Benchmark: legacy two-groupby metrics vs the vectorized metrics engine
+Checks that both produce identical frames and reports the speedup
+
+Usage:
+    python -m benchmarks.bench_metrics --rows 1000000 10000000 50000000
+"""
+
+import argparse
+import time
+
+import pandas as pd
+
+from benchmarks.datasets import make_transactions
+from src.metrics_engine import compute_customer_metrics
+from src.synthetic import legacy_customer_metrics
+
+
+def run(rows, skip_legacy_above):
+    data = make_transactions(rows)
+
+    start = time.perf_counter()
+    engine = compute_customer_metrics(data)
+    engine_seconds = time.perf_counter() - start
+
+    result = {'rows': rows, 'customers': len(engine), 'engine_seconds': engine_seconds}
+    if rows <= skip_legacy_above:
+        start = time.perf_counter()
+        legacy = legacy_customer_metrics(data)
+        result['legacy_seconds'] = time.perf_counter() - start
+        pd.testing.assert_frame_equal(legacy, engine, check_exact=True)
+        result['identical'] = True
+        result['speedup'] = result['legacy_seconds'] / engine_seconds
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000, 10_000_000, 50_000_000])
+    parser.add_argument('--skip-legacy-above', type=int, default=1_000_000,
+                        help='Do not run the slow legacy implementation above this many rows')
+    args = parser.parse_args()
+
+    print(f"{'rows':>12} {'customers':>10} {'legacy s':>10} {'engine s':>10} {'speedup':>8}")
+    for rows in args.rows:
+        r = run(rows, args.skip_legacy_above)
+        legacy = f"{r['legacy_seconds']:10.2f}" if 'legacy_seconds' in r else f"{'-':>10}"
+        speedup = f"{r['speedup']:7.1f}x" if 'speedup' in r else f"{'-':>8}"
+        print(f"{r['rows']:>12,} {r['customers']:>10,} {legacy} {r['engine_seconds']:10.2f} {speedup}")
+
+
+if __name__ == '__main__':
+    main()
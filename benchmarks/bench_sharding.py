@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark: single-process metrics vs hash-sharded metrics on a process pool
+Checks that every worker count produces the single-process frame exactly
+and reports throughput and scaling
+
+Usage:
+    python -m benchmarks.bench_sharding --rows 10000000 --shards 64 --workers 1 8 32 64
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.datasets import write_dataset
+from src.metrics_engine import REQUIRED_COLUMNS, compute_customer_metrics
+from src.schema import TRANSACTION_SCHEMA, apply_schema
+from src.sharding import partition_transactions, sharded_metrics
+from src.storage import read_table
+
+
+def run(rows, num_shards, workers, workdir):
+    path = os.path.join(workdir, 'transactions.parquet')
+    write_dataset(path, rows)
+
+    start = time.perf_counter()
+    data = apply_schema(read_table(path, columns=REQUIRED_COLUMNS), TRANSACTION_SCHEMA)
+    expected = compute_customer_metrics(data)
+    results = [{'workers': 'single', 'seconds': time.perf_counter() - start}]
+    del data
+
+    start = time.perf_counter()
+    shards = partition_transactions(path, os.path.join(workdir, 'shards'), num_shards, columns=REQUIRED_COLUMNS)
+    partition_seconds = time.perf_counter() - start
+
+    for count in workers:
+        start = time.perf_counter()
+        result = sharded_metrics(shards, max_workers=count, schema=TRANSACTION_SCHEMA)
+        seconds = time.perf_counter() - start
+        pd.testing.assert_frame_equal(result, expected, check_exact=True)
+        results.append({'workers': count, 'seconds': seconds})
+    return partition_seconds, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--shards', type=int, default=os.cpu_count())
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count()])
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench-sharding-')
+    try:
+        partition_seconds, results = run(args.rows, args.shards, args.workers, workdir)
+    finally:
+        shutil.rmtree(workdir)
+
+    print(f"Partitioned {args.rows:,} rows into {args.shards} shards in {partition_seconds:.2f}s")
+    print(f"{'workers':>8} {'seconds':>10} {'rows/s':>14} {'speedup':>8}")
+    baseline = next(r['seconds'] for r in results if r['workers'] == 1) if 1 in args.workers else None
+    for r in results:
+        speedup = f"{baseline / r['seconds']:7.1f}x" if baseline and r['workers'] != 'single' else f"{'-':>8}"
+        print(f"{r['workers']:>8} {r['seconds']:10.2f} {args.rows / r['seconds']:14,.0f} {speedup}")
+    print("All sharded results identical to the single-process metrics.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cold start of the API (package import + first request)
+Each run starts a fresh interpreter, imports src.server, serves a first
+/api/analytics/summary request through the test client and reports which
+heavy optional modules (sklearn, plotly, joblib) got loaded on the way.
+Exits with status 1 if the median exceeds the budget
+
+Usage:
+    python -m benchmarks.bench_startup --runs 5 --import-budget 1.5 --request-budget 1.0
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.datasets import write_dataset
+
+HEAVY_MODULES = ('sklearn', 'plotly', 'joblib', 'scipy')
+
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from src import server
+imported = time.perf_counter()
+response = server.app.test_client().get('/api/analytics/summary')
+served = time.perf_counter()
+print(json.dumps({
+    'import_seconds': imported - start,
+    'first_request_seconds': served - imported,
+    'status': response.status_code,
+    'heavy_modules': sorted(m for m in %r if m in sys.modules)
+}))
+""" % (HEAVY_MODULES,)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def startup_run(data_path):
+    """One cold start in a fresh interpreter; returns its measurements"""
+    env = dict(os.environ, CUSTOMER_DATA_FILE=data_path)
+    output = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT], cwd=REPO_ROOT, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure_startup(data_path, runs=3):
+    """Median import and first-request times over several cold starts"""
+    results = [startup_run(data_path) for _ in range(runs)]
+    return {
+        'runs': runs,
+        'import_seconds': statistics.median(r['import_seconds'] for r in results),
+        'first_request_seconds': statistics.median(r['first_request_seconds'] for r in results),
+        'status': results[-1]['status'],
+        'heavy_modules': sorted({m for r in results for m in r['heavy_modules']})
+    }
+
+
+def check_budget(result, import_budget, request_budget):
+    """Budget violations of a measure_startup result, as messages"""
+    violations = []
+    if result['import_seconds'] > import_budget:
+        violations.append(f"import took {result['import_seconds']:.2f}s (budget {import_budget:.2f}s)")
+    if result['first_request_seconds'] > request_budget:
+        violations.append(f"first request took {result['first_request_seconds']:.2f}s "
+                          f"(budget {request_budget:.2f}s)")
+    if result['status'] != 200:
+        violations.append(f"first request returned HTTP {result['status']}")
+    if result['heavy_modules']:
+        violations.append(f"heavy modules loaded at startup: {', '.join(result['heavy_modules'])}")
+    return violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000, help='Rows in the dataset served by the first request')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--import-budget', type=float, default=1.5, help='Seconds allowed to import src.server')
+    parser.add_argument('--request-budget', type=float, default=1.0, help='Seconds allowed for the first request')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench-startup-')
+    try:
+        data_path = os.path.join(workdir, 'transactions.csv')
+        write_dataset(data_path, args.rows)
+        result = measure_startup(data_path, args.runs)
+    finally:
+        shutil.rmtree(workdir)
+
+    print(f"import src.server: {result['import_seconds']:.3f}s (budget {args.import_budget:.2f}s)")
+    print(f"first request:     {result['first_request_seconds']:.3f}s (budget {args.request_budget:.2f}s)")
+    print(f"heavy modules:     {', '.join(result['heavy_modules']) or 'none'}")
+    violations = check_budget(result, args.import_budget, args.request_budget)
+    for violation in violations:
+        print(f"OVER BUDGET: {violation}")
+    sys.exit(1 if violations else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+"""
+Synthetic transaction datasets for benchmarks
+Thin wrappers over src.synthetic: several purchases per customer, with
+per-customer attributes repeated on every transaction as in a real export
+"""
+
+from src.storage import write_chunks
+from src.synthetic import generate_transactions, iter_transactions
+
+
+def make_transactions(num_rows, purchases_per_customer=10, seed=42):
+    """Synthetic transactions with several purchases per customer"""
+    return generate_transactions(num_rows, purchases_per_customer, seed)
+
+
+def write_dataset(path, num_rows, purchases_per_customer=10, seed=42):
+    """Stream a synthetic dataset to path in bounded memory; returns (rows, customers)"""
+    last_id = [0]
+
+    def chunks():
+        for chunk in iter_transactions(num_rows, purchases_per_customer, seed):
+            # Ids de cliente sao contiguos a partir de 1
+            last_id[0] = int(chunk['customer_id'].iloc[-1])
+            yield chunk
+
+    rows = write_chunks(chunks(), path)
+    return rows, last_id[0]
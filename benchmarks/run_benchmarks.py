@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the analytics pipeline and the REST API
+Times and memory-profiles every CustomerBehaviorAnalytics stage and each
+Flask endpoint (through the test client) on synthetic datasets, writes the
+results as JSON and optionally compares them against a stored baseline
+
+Every route is timed except the job endpoints that start or read
+background work (POST /api/jobs, /api/jobs/<id>, /api/jobs/<id>/result,
+/api/analysis/latest): their cost is the analysis run itself, which the
+pipeline timings already cover. GET /api/jobs is timed.
+
+Usage:
+    python -m benchmarks.run_benchmarks --scales 10000 1000000 --output results.json
+    python -m benchmarks.run_benchmarks --scales 10000 --baseline results.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from benchmarks.datasets import write_dataset
+from src import server
+from src.aggregate_cache import AggregateCache
+from src.customer_analytics import CustomerBehaviorAnalytics
+from src.data_store import DatasetStore
+from src.model_store import load_artifacts
+from src.schema import TRANSACTION_SCHEMA
+from src.scoring import ChurnScorer
+
+PIPELINE_STAGES = [
+    ('load_data', lambda a, m: a.load_data()),
+    ('calculate_customer_metrics', lambda a, m: a.calculate_customer_metrics()),
+    ('perform_customer_segmentation', lambda a, m: a.perform_customer_segmentation(m)),
+    ('analyze_segment_characteristics', lambda a, m: a.analyze_segment_characteristics()),
+    ('create_visualizations', lambda a, m: a.create_visualizations()),
+    ('predict_customer_churn', lambda a, m: a.predict_customer_churn()),
+    ('generate_insights_report', lambda a, m: a.generate_insights_report()),
+]
+
+
+def measure(func, trace_memory=True):
+    """Run func once; returns (result, {seconds, cpu_seconds, peak_mb})"""
+    if trace_memory:
+        tracemalloc.start()
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        result = func()
+    finally:
+        stats = {
+            'seconds': time.perf_counter() - wall,
+            'cpu_seconds': time.process_time() - cpu
+        }
+        if trace_memory:
+            stats['peak_mb'] = tracemalloc.get_traced_memory()[1] / 1e6
+            tracemalloc.stop()
+    return result, stats
+
+
+@contextlib.contextmanager
+def working_directory(path):
+    # O dashboard e gravado no diretorio atual; isola os arquivos gerados
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def bench_pipeline(csv_path, workdir, trace_memory):
+    analytics = CustomerBehaviorAnalytics(data_path=csv_path)
+    results = {}
+    metrics = None
+    with working_directory(workdir):
+        for name, stage in PIPELINE_STAGES:
+            output, results[name] = measure(lambda: stage(analytics, metrics), trace_memory)
+            if name == 'calculate_customer_metrics':
+                metrics = output
+    return results
+
+
+def fit_churn_scorer(csv_path, model_dir):
+    """Churn scorer trained on the benchmark dataset plus sample feature records (setup, not timed)"""
+    analytics = CustomerBehaviorAnalytics(data_path=csv_path)
+    analytics.load_data()
+    analytics.perform_customer_segmentation(analytics.calculate_customer_metrics())
+    analytics.predict_customer_churn()
+    analytics.save_models(model_dir)
+    columns = analytics.models['churn_prediction']['feature_columns']
+    return ChurnScorer(load_artifacts(model_dir)), analytics.segments[columns].head(100).to_dict('records')
+
+
+def bench_api(csv_path, customer_id, repeat, trace_memory, model_dir):
+    scorer, records = fit_churn_scorer(csv_path, model_dir)
+    # (metodo, url, corpo JSON)
+    endpoints = {
+        'index': ('GET', '/', None),
+        'customers_page': ('GET', '/api/customers?limit=100', None),
+        'customers_filtered': ('GET', '/api/customers?country=usa&category=books&limit=100', None),
+        'customer_lookup': ('GET', f'/api/customers/{customer_id}', None),
+        'analytics_summary': ('GET', '/api/analytics/summary', None),
+        'analytics_demographics': ('GET', '/api/analytics/demographics', None),
+        'analytics_purchases': ('GET', '/api/analytics/purchases', None),
+        'analytics_cohorts': ('GET', '/api/analytics/cohorts?period=month', None),
+        'customers_ndjson_export': ('GET', '/api/customers?format=ndjson', None),
+        'predict_churn_single': ('POST', '/api/predict/churn', {'features': records[0]}),
+        'predict_churn_batch': ('POST', '/api/predict/churn', {'instances': records}),
+        'predict_stats': ('GET', '/api/predict/stats', None),
+        'jobs_list': ('GET', '/api/jobs', None),
+        'metrics': ('GET', '/metrics', None),
+        'health': ('GET', '/health', None)
+    }
+    original = (server.store, server.aggregate_cache, server.churn_scorer)
+    server.store, server.aggregate_cache = DatasetStore(csv_path, schema=TRANSACTION_SCHEMA), AggregateCache()
+    server.churn_scorer = scorer
+    results = {}
+    try:
+        client = server.app.test_client()
+        # A primeira requisicao paga a carga do dataset; medida a parte
+        _, results['dataset_load'] = measure(lambda: client.get('/api/customers?limit=1'), trace_memory)
+        for name, (method, url, body) in endpoints.items():
+            def call():
+                return client.open(url, method=method, json=body)
+
+            response, cold = measure(call, trace_memory)
+            if response.status_code != 200:
+                raise RuntimeError(f"{method} {url} returned {response.status_code}")
+            warm = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                call()
+                warm.append(time.perf_counter() - start)
+            results[name] = {
+                'cold_seconds': cold['seconds'],
+                'warm_p50_seconds': statistics.median(warm) if warm else None,
+                'warm_max_seconds': max(warm) if warm else None,
+                **({'peak_mb': cold['peak_mb']} if 'peak_mb' in cold else {})
+            }
+    finally:
+        server.store, server.aggregate_cache, server.churn_scorer = original
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(scales, repeat=5, trace_memory=True, skip_pipeline=False, skip_api=False):
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'git_revision': git_revision(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'trace_memory': trace_memory
+        },
+        'scales': {}
+    }
+    for rows in scales:
+        print(f"== {rows:,} transactions ==")
+        with tempfile.TemporaryDirectory() as tmpdir:
+            csv_path = os.path.join(tmpdir, 'customer_data.csv')
+            _, customers = write_dataset(csv_path, rows)
+            entry = {'rows': rows, 'customers': customers}
+            customer_id = 1
+            if not skip_pipeline:
+                entry['pipeline'] = bench_pipeline(csv_path, tmpdir, trace_memory)
+            if not skip_api:
+                entry['api'] = bench_api(csv_path, customer_id, repeat, trace_memory,
+                                         os.path.join(tmpdir, 'models'))
+        report['scales'][str(rows)] = entry
+        for section in ('pipeline', 'api'):
+            for name, stats in entry.get(section, {}).items():
+                seconds = stats.get('seconds', stats.get('cold_seconds'))
+                print(f"  {section:8} {name:34} {seconds:9.4f}s")
+    return report
+
+
+def flatten(report):
+    """{'<rows>/<section>/<name>/<metric>': value} for every numeric result"""
+    flat = {}
+    for rows, entry in report['scales'].items():
+        for section in ('pipeline', 'api'):
+            for name, stats in entry.get(section, {}).items():
+                for metric, value in stats.items():
+                    if isinstance(value, (int, float)):
+                        flat[f'{rows}/{section}/{name}/{metric}'] = value
+    return flat
+
+
+def compare(current, baseline, tolerance=0.2, min_seconds=0.005):
+    """Metrics that got worse than baseline by more than tolerance
+
+    Time metrics below min_seconds in both runs are ignored as noise.
+    """
+    base, new = flatten(baseline), flatten(current)
+    regressions = []
+    for key in sorted(base.keys() & new.keys()):
+        old_value, new_value = base[key], new[key]
+        if key.endswith('seconds') and max(old_value, new_value) < min_seconds:
+            continue
+        if old_value > 0 and new_value > old_value * (1 + tolerance):
+            regressions.append({'metric': key, 'baseline': old_value, 'current': new_value,
+                                'ratio': new_value / old_value})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the analytics pipeline and REST API")
+    parser.add_argument('--scales', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                        help='Transaction counts to benchmark (e.g. 10000 ... 50000000)')
+    parser.add_argument('--repeat', type=int, default=5, help='Warm requests per endpoint')
+    parser.add_argument('--output', help='Write results JSON to this path')
+    parser.add_argument('--baseline', help='Compare against a previous results JSON')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed slowdown ratio (0.2 = 20%%)')
+    parser.add_argument('--no-memory', action='store_true', help='Disable tracemalloc (faster, no peak_mb)')
+    parser.add_argument('--skip-pipeline', action='store_true')
+    parser.add_argument('--skip-api', action='store_true')
+    args = parser.parse_args()
+
+    report = run_suite(args.scales, args.repeat, not args.no_memory, args.skip_pipeline, args.skip_api)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r['metric']}: {r['baseline']:.4f} -> {r['current']:.4f} ({r['ratio']:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Bounded cache of serialized analytics responses
+Entries are keyed by endpoint, dataset version and request parameters
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class CachedResponse:
+    """Serialized JSON body plus the strong ETag derived from it"""
+
+    def __init__(self, body):
+        self.body = body
+        self.etag = hashlib.sha1(body.encode('utf-8')).hexdigest()
+
+
+class AggregateCache:
+    """Thread-safe LRU cache with hit/miss/eviction counters"""
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(name, fingerprint, params=None):
+        return (name, fingerprint, tuple(sorted((params or {}).items())))
+
+    def get_or_compute(self, key, compute, serialize):
+        """Return the cached entry for key, computing and storing it on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        # Calcula fora do lock para nao bloquear outros endpoints
+        entry = CachedResponse(serialize(compute()))
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def __contains__(self, key):
+        # Consulta sem contar hit/miss nem alterar a ordem LRU
+        with self._lock:
+            return key in self._entries
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
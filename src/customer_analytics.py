@@ -1,30 +1,122 @@
 
 import pandas as pd
 import numpy as np
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import classification_report, confusion_matrix
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+import os
+import time
 import warnings
 
+from .dashboard import build_dashboard, write_dashboard
+from .incremental import IncrementalAnalytics
+from .instrumentation import instrument_stage
+from .metrics_engine import REQUIRED_COLUMNS, compute_customer_metrics, stream_metrics
+from .model_store import save_artifacts
+from .pipeline import PipelineScheduler
+from .result_store import ResultStore, file_fingerprint, fingerprint
+from .rollups import ROLLUP_COLUMNS, build_rollups, rollups_from_file
+from .schema import CUSTOMER_SCHEMA, TRANSACTION_SCHEMA, compact_frame
+from .segmentation import SegmentationEngine
+from .sharding import partition_transactions, shard_paths, sharded_metrics
+from .storage import read_table
+
 warnings.filterwarnings("ignore")
 
+# Parâmetros do modelo de churn (também entram na chave do resultado salvo)
+CHURN_MODEL_PARAMS = {'n_estimators': 100, 'test_size': 0.2, 'random_state': 42}
+_MISSING = object()
+
 class CustomerBehaviorAnalytics:
-    def __init__(self, data_path='src/data/customer_data.csv'):
+    def __init__(self, data_path='src/data/customer_data.csv', chunksize=None,
+                 n_clusters=4, segmentation_engine='kmeans', kmeans_init='k-means++', segmentation_sample_size=100_000,
+                 n_jobs=-1, profile_dir=None, dashboard_path='customer_behavior_dashboard.html',
+                 dashboard_mode='sample', dashboard_max_points=5000, plotlyjs='cdn',
+                 num_shards=None, shard_dir=None, shard_workers=None, result_store=None):
         self.data_path = data_path
+        self.chunksize = chunksize  # se definido, lê o arquivo em modo streaming
+        # 'kmeans' (ajuste completo), 'minibatch' ou 'sampled' (amostra estratificada)
+        self.n_clusters = n_clusters
+        self.segmentation_engine = segmentation_engine
+        self.kmeans_init = kmeans_init
+        self.segmentation_sample_size = segmentation_sample_size
+        self.n_jobs = n_jobs  # núcleos para o RandomForest (-1 = todos)
+        # Se definido, grava cProfile/tracemalloc de cada etapa neste diretório
+        self.profile_dir = profile_dir or os.environ.get('CBA_PROFILE_DIR')
+        # Dashboard: 'sample' (até N pontos por segmento), 'density' (células RFM) ou 'full'
+        self.dashboard_path = dashboard_path
+        self.dashboard_mode = dashboard_mode
+        self.dashboard_max_points = dashboard_max_points
+        self.plotlyjs = plotlyjs  # 'cdn', 'directory', caminho .js ou True (embutido)
+        # Modo particionado: num_shards particiona data_path por hash de customer_id em shard_dir;
+        # só shard_dir reutiliza shards já gravados. Métricas calculadas em shard_workers processos
+        self.num_shards = num_shards
+        self.shard_dir = shard_dir
+        self.shard_workers = shard_workers
+        self.shards = None
+        # Diretório (ou ResultStore) onde cada etapa salva seu resultado; reexecuções com
+        # as mesmas entradas e parâmetros carregam o resultado em vez de recalcular
+        result_store = result_store or os.environ.get('CBA_RESULT_STORE')
+        self.result_store = ResultStore(result_store) if isinstance(result_store, str) else result_store
         self.data = None
+        self.metrics_accumulator = None
+        self.ingest_stats = None
         self.segments = None
         self.models = {}
+        self.memory_report = {}  # bytes antes/depois da compactação de cada tabela
+        self.rollups = None
 
     def load_data(self):
+        self.rollups = None
+        self.shards = None
         try:
-            self.data = pd.read_csv(self.data_path)
+            if self.num_shards or self.shard_dir:
+                self._load_data_sharded()
+                return
+            if self.chunksize:
+                self._load_data_streaming()
+                return
+            # CSV, Parquet ou Arrow; lê só as colunas usadas pelas métricas
+            data = read_table(self.data_path, columns=REQUIRED_COLUMNS)
         except FileNotFoundError:
             print(f"Warning: {self.data_path} not found. Generating synthetic data.")
-            self.data = self._generate_synthetic_data()
+            data = self._generate_synthetic_data()
+        self.data = self._compact('data', data, TRANSACTION_SCHEMA)
+
+    def _compact(self, name, frame, schema):
+        # Categóricas, menores inteiros seguros e datetime64; registra a memória antes/depois
+        frame, report = compact_frame(frame, schema)
+        self.memory_report[name] = report
+        print(f"   {name}: {report['before_bytes'] / 1e6:,.1f} MB -> {report['after_bytes'] / 1e6:,.1f} MB "
+              f"({report['reduction']}x)")
+        return frame
+
+    def _load_data_streaming(self):
+        # Agrega cada chunk por cliente sem manter as transações em memória
+        def report(rows, seconds):
+            print(f"   {rows:,} rows read ({rows / max(seconds, 1e-9):,.0f} rows/s)")
+
+        start = time.perf_counter()
+        self.metrics_accumulator = stream_metrics(self.data_path, self.chunksize, on_progress=report,
+                                                  schema=TRANSACTION_SCHEMA)
+        seconds = time.perf_counter() - start
+        self.data = None
+        self.ingest_stats = {
+            'rows': self.metrics_accumulator.rows,
+            'seconds': seconds,
+            'rows_per_second': self.metrics_accumulator.rows / max(seconds, 1e-9)
+        }
+
+    def _load_data_sharded(self):
+        # Cada cliente fica inteiro em um shard; os workers leem seus próprios arquivos
+        start = time.perf_counter()
+        if self.num_shards:
+            shard_dir = self.shard_dir or os.path.splitext(self.data_path)[0] + '_shards'
+            self.shards = partition_transactions(self.data_path, shard_dir, self.num_shards,
+                                                 chunksize=self.chunksize or 1_000_000, columns=REQUIRED_COLUMNS)
+        else:
+            self.shards = shard_paths(self.shard_dir)
+            if not self.shards:
+                raise FileNotFoundError(self.shard_dir)
+        self.data = None
+        self.ingest_stats = {'shards': len(self.shards), 'seconds': time.perf_counter() - start}
 
     def _generate_synthetic_data(self, num_customers=1000):
         # Gerar dados sintéticos para demonstração
@@ -48,53 +140,45 @@ class CustomerBehaviorAnalytics:
         return df
 
     def calculate_customer_metrics(self):
+        if self.shards:
+            # Agregados por shard em processos separados, data de referência global no merge
+            return sharded_metrics(self.shards, max_workers=self.shard_workers, schema=TRANSACTION_SCHEMA)
+        if self.data is None and self.metrics_accumulator is not None:
+            return self.metrics_accumulator.finalize()
         if self.data is None:
             raise ValueError("Data not loaded. Call load_data() first.")
 
-        # Exemplo de cálculo de métricas RFM (Recency, Frequency, Monetary)
-        snapshot_date = self.data['purchase_date'].max() + pd.Timedelta(days=1)
-        rfm = self.data.groupby('customer_id').agg(
-            Recency=('purchase_date', lambda date: (snapshot_date - date.max()).days),
-            Frequency=('purchase_amount', 'count'),
-            Monetary=('purchase_amount', 'sum')
-        )
-        rfm['Recency'] = rfm['Recency'].astype(int)
-        rfm['Frequency'] = rfm['Frequency'].astype(int)
-        rfm['Monetary'] = rfm['Monetary'].astype(float)
-
-        # Adicionar outras métricas como CLV, Churn, etc.
-        customer_metrics = self.data.groupby('customer_id').agg(
-            total_spent=('purchase_amount', 'sum'),
-            avg_purchase_amount=('purchase_amount', 'mean'),
-            num_purchases=('purchase_amount', 'count'),
-            first_purchase=('purchase_date', 'min'),
-            last_purchase=('purchase_date', 'max'),
-            age=('age', 'first'),
-            gender=('gender', 'first'),
-            country=('country', 'first'),
-            city=('city', 'first'),
-            is_churned=('is_churned', 'first')
-        )
-        customer_metrics = customer_metrics.merge(rfm, on='customer_id', how='left')
-        customer_metrics['customer_lifetime_value'] = customer_metrics['total_spent'] * (365 / (snapshot_date - customer_metrics['first_purchase']).dt.days) # Exemplo simplificado
-
-        return customer_metrics
+        # Métricas RFM (Recency, Frequency, Monetary), totais e CLV em um único groupby vetorizado
+        return compute_customer_metrics(self.data)
 
     def perform_customer_segmentation(self, customer_metrics):
         if customer_metrics is None:
             raise ValueError("Customer metrics not calculated. Call calculate_customer_metrics() first.")
 
+        # sklearn só é importado quando a etapa roda (segundos a menos no import do pacote)
+        from sklearn.preprocessing import StandardScaler
+
         # Usar RFM para segmentação
         rfm_data = customer_metrics[['Recency', 'Frequency', 'Monetary']]
         scaler = StandardScaler()
         rfm_scaled = scaler.fit_transform(rfm_data)
 
-        kmeans = KMeans(n_clusters=4, random_state=42, n_init=10) # n_init para evitar warning
-        customer_metrics['segment_rfm'] = kmeans.fit_predict(rfm_scaled)
+        engine = SegmentationEngine(engine=self.segmentation_engine, n_clusters=self.n_clusters,
+                                    init=self.kmeans_init, sample_size=self.segmentation_sample_size)
+        customer_metrics['segment_rfm'] = engine.fit_predict(rfm_scaled)
+        self.models['segmentation'] = {'scaler': scaler, 'engine': engine}
 
-        self.segments = customer_metrics
+        self.segments = self._compact('segments', customer_metrics, CUSTOMER_SCHEMA)
         return self.segments
 
+    def segmentation_quality_report(self, silhouette_sample=10_000):
+        # Compara o motor escolhido com o KMeans completo (inércia e silhouette)
+        if 'segmentation' not in self.models:
+            raise ValueError("Customer segmentation must be performed first.")
+        segmentation = self.models['segmentation']
+        rfm_scaled = segmentation['scaler'].transform(self.segments[['Recency', 'Frequency', 'Monetary']])
+        return segmentation['engine'].quality_report(rfm_scaled, silhouette_sample=silhouette_sample)
+
     def analyze_segment_characteristics(self):
         if self.segments is None:
             raise ValueError("Customer segmentation must be performed first.")
@@ -114,37 +198,10 @@ class CustomerBehaviorAnalytics:
         if self.segments is None:
             raise ValueError("Customer segmentation must be performed first.")
 
-        fig = make_subplots(rows=2, cols=2, 
-                            specs=[[{'type': 'scene'}, {'type': 'xy'}],
-                                   [{'type': 'domain'}, {'type': 'xy'}]],
-                            subplot_titles=("Segmentação de Clientes (RFM)", 
-                                            "Distribuição de Churn por Segmento",
-                                            "Receita por Segmento",
-                                            "CLV Médio por Segmento"))
-
-        # 1. RFM Segmentation (Scatter Plot)
-        fig.add_trace(go.Scatter3d(x=self.segments['Recency'], y=self.segments['Frequency'], z=self.segments['Monetary'],
-                                   mode='markers', marker=dict(color=self.segments['segment_rfm'], size=5, opacity=0.8),
-                                   name='Segmentos RFM'), row=1, col=1)
-
-        # 2. Churn Distribution by Segment (Bar Chart)
-        churn_by_segment = self.segments.groupby('segment_rfm')['is_churned'].value_counts(normalize=True).mul(100).unstack().fillna(0)
-        fig.add_trace(go.Bar(x=churn_by_segment.index, y=churn_by_segment[1], name='Churn Rate', marker_color='red'), row=1, col=2)
-
-        # 3. Revenue by Segment (Pie Chart)
-        revenue_by_segment = self.segments.groupby('segment_rfm')['total_spent'].sum()
-        fig.add_trace(go.Pie(labels=revenue_by_segment.index, values=revenue_by_segment.values, name='Receita', hole=0.3),
-                      row=2, col=1)
-
-        # 4. Average CLV by Segment (Bar Chart)
-        clv_by_segment = self.segments.groupby('segment_rfm')['customer_lifetime_value'].mean()
-        fig.add_trace(go.Bar(x=clv_by_segment.index, y=clv_by_segment.values, name='CLV Médio', marker_color='blue'), row=2, col=2)
-
-        fig.update_layout(title_text="Dashboard de Análise de Comportamento do Cliente", height=800, showlegend=False)
-        
-        # Salvar como HTML
-        output_path = 'customer_behavior_dashboard.html'
-        fig.write_html(output_path)
+        # Dispersão 3D amostrada ou agregada e plotly.js referenciado: tamanho do HTML limitado
+        fig = build_dashboard(self.segments, mode=self.dashboard_mode,
+                              max_points_per_segment=self.dashboard_max_points)
+        output_path = write_dashboard(fig, self.dashboard_path, include_plotlyjs=self.plotlyjs)
         print(f"Dashboard salvo em: {output_path}")
         return output_path
 
@@ -152,15 +209,22 @@ class CustomerBehaviorAnalytics:
         if self.segments is None:
             raise ValueError("Customer segmentation must be performed first.")
 
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.metrics import classification_report, confusion_matrix
+        from sklearn.model_selection import train_test_split
+
         # Feature Engineering
         feature_columns = ['Recency', 'Frequency', 'Monetary', 'age', 'total_spent', 'avg_purchase_amount', 'num_purchases', 'customer_lifetime_value']
         features = self.segments[feature_columns]
         target = self.segments['is_churned']
 
-        X_train, X_test, y_train, y_test = train_test_split(features, target, test_size=0.2, random_state=42)
+        params = CHURN_MODEL_PARAMS
+        X_train, X_test, y_train, y_test = train_test_split(features, target, test_size=params['test_size'],
+                                                            random_state=params['random_state'])
 
         # Model Training
-        rf_model = RandomForestClassifier(n_estimators=100, random_state=42)
+        rf_model = RandomForestClassifier(n_estimators=params['n_estimators'], random_state=params['random_state'],
+                                          n_jobs=self.n_jobs)
         rf_model.fit(X_train, y_train)
 
         # Evaluation
@@ -168,12 +232,19 @@ class CustomerBehaviorAnalytics:
         
         self.models['churn_prediction'] = {
             'model': rf_model,
+            'feature_columns': feature_columns,
             'feature_importance': dict(zip(feature_columns, rf_model.feature_importances_)),
             'classification_report': classification_report(y_test, y_pred),
             'confusion_matrix': confusion_matrix(y_test, y_pred)
         }
         return self.models['churn_prediction']
 
+    def save_models(self, base_dir='models', version=None):
+        # Persiste scaler, centróides e modelo de churn em um diretório versionado
+        version = save_artifacts(self.models, base_dir=base_dir, version=version)
+        print(f"Model artifacts saved: {base_dir}/{version}")
+        return version
+
     def generate_insights_report(self):
         if self.segments is None:
             raise ValueError("Customer segmentation must be performed first")
@@ -199,31 +270,192 @@ class CustomerBehaviorAnalytics:
         }
         return insights
 
-    def run_complete_analysis(self):
-        print("Starting Customer Behavior Analytics...")
-        print("1. Loading data (real if available)...")
+    def build_rollups(self):
+        # Rollups dia x cliente x categoria; consultas por período não relêem as transações
+        if self.data is not None and set(ROLLUP_COLUMNS) <= set(self.data.columns):
+            self.rollups = build_rollups(self.data)
+        else:
+            self.rollups = rollups_from_file(self.data_path, chunksize=self.chunksize or 1_000_000)
+        return self.rollups
+
+    def _require_rollups(self):
+        return self.rollups if self.rollups is not None else self.build_rollups()
+
+    def cohort_retention(self, period='M', start=None, end=None):
+        # Tamanho de cada coorte (mês/semana da primeira compra) e retenção por período
+        return self._require_rollups().cohort_matrix(period, start, end)
+
+    def rolling_revenue(self, windows=(30, 90)):
+        return self._require_rollups().rolling_revenue(windows)
+
+    def rfm_as_of(self, as_of):
+        # RFM considerando apenas as compras até a data informada
+        return self._require_rollups().rfm_as_of(as_of)
+
+    def range_summary(self, start=None, end=None):
+        return self._require_rollups().range_totals(start, end)
+
+    def initialize_incremental(self, state_dir='analytics_state', n_clusters=None):
+        # Estado inicial a partir do histórico completo (uma única vez)
         self.load_data()
-        print("2. Calculating customer metrics...")
-        customer_metrics = self.calculate_customer_metrics()
-        print("3. Performing customer segmentation...")
-        self.perform_customer_segmentation(customer_metrics)
-        print("4. Analyzing segment characteristics...")
-        kmeans_analysis, rfm_analysis = self.analyze_segment_characteristics()
-        print("5. Creating visualizations...")
-        dashboard = self.create_visualizations()
-        print("6. Building churn prediction model...")
-        churn_model = self.predict_customer_churn()
-        print("7. Generating insights report...")
-        insights = self.generate_insights_report()
+        incremental = IncrementalAnalytics(state_dir, n_clusters=n_clusters or self.n_clusters)
+        if self.data is not None:
+            report = incremental.initialize(self.data)
+        elif self.metrics_accumulator is not None:
+            # Modo streaming: o acumulador já tem os agregados parciais por cliente
+            report = incremental.initialize_partials(self.metrics_accumulator.partials(),
+                                                     self.metrics_accumulator.rows)
+        else:
+            raise ValueError("Incremental state cannot be initialized from sharded data; "
+                             "load the history without num_shards/shard_dir.")
+        self.segments = incremental.metrics()
+        return report
+
+    def update_incremental(self, batch, state_dir='analytics_state', refit=False):
+        # Aplica apenas as transações novas (caminho de arquivo ou DataFrame)
+        if isinstance(batch, str):
+            batch = read_table(batch, columns=REQUIRED_COLUMNS)
+        # Mesmos tipos compactos do histórico usado para criar o estado
+        batch = self._compact('batch', batch, TRANSACTION_SCHEMA)
+        incremental = IncrementalAnalytics(state_dir).load()
+        report = incremental.apply_batch(batch, refit=refit)
+        self.segments = incremental.metrics()
+        print(f"Incremental update: {report['rows']:,} rows, {report['customers_touched']:,} customers touched "
+              f"({report['new_customers']:,} new), drift {report['drift']:.3f}, refit={report['refit']}")
+        return report
+
+    def _data_fingerprint(self):
+        if self.shard_dir and not self.num_shards:
+            files = [os.path.join(shard, name) for shard in shard_paths(self.shard_dir) for name in os.listdir(shard)]
+            return file_fingerprint(files)
+        if self.data_path and os.path.exists(self.data_path):
+            return file_fingerprint([self.data_path])
+        return fingerprint('synthetic', 1000)
+
+    def stage_keys(self):
+        # Cada chave depende da impressão digital dos dados, da chave anterior e dos parâmetros da etapa
+        metrics = fingerprint('customer_metrics', self._data_fingerprint())
+        segmentation = fingerprint('segmentation', metrics, self.n_clusters, self.segmentation_engine,
+                                   self.kmeans_init, self.segmentation_sample_size)
+        return {
+            'customer_metrics': metrics,
+            'segmentation': segmentation,
+            'segment_analysis': fingerprint('segment_analysis', segmentation),
+            'churn_model': fingerprint('churn_model', segmentation, CHURN_MODEL_PARAMS),
+            'insights': fingerprint('insights', segmentation)
+        }
+
+    def run_complete_analysis(self, max_workers=None):
+        print("Starting Customer Behavior Analytics...")
+
+        stage_metrics = {}
+        store = self.result_store
+        keys = self.stage_keys() if store is not None else {}
+        reuse = {}
+
+        def cached(name, compute, save=lambda result: result, restore=lambda value: value):
+            if store is None:
+                return compute
+
+            def run(*args):
+                stored = store.get(name, keys[name], _MISSING)
+                if stored is not _MISSING:
+                    reuse[name] = 'hit'
+                    print(f"   {name}: reusing stored result")
+                    return restore(stored)
+                result = compute(*args)
+                store.put(name, keys[name], save(result))
+                reuse[name] = 'miss'
+                return result
+            return run
+
+        def load():
+            # Métricas já salvas para estes dados: nada a ler
+            if store is not None and ('customer_metrics', keys['customer_metrics']) in store:
+                reuse['load_data'] = 'skipped'
+                return
+            self.load_data()
+
+        def metrics():
+            if self.data is None and self.metrics_accumulator is None and not self.shards:
+                self.load_data()
+            return self.calculate_customer_metrics()
+
+        def segment(customer_metrics):
+            # Segmenta uma cópia: results['customer_metrics'] fica igual com ou sem resultado salvo
+            return self.perform_customer_segmentation(customer_metrics.copy())
+
+        def restore_segmentation(stored):
+            self.models['segmentation'] = stored['model']
+            self.segments = stored['segments']
+            return self.segments
+
+        def restore_churn(stored):
+            self.models['churn_prediction'] = stored
+            return stored
+
+        def stage(name, message, func, rows):
+            def run(*args):
+                print(message)
+                with instrument_stage(name, profile_dir=self.profile_dir) as record:
+                    result = func(*args)
+                    record['rows'] = rows()
+                stage_metrics[name] = record
+                return result
+            return run
+
+        def input_rows():
+            if self.data is not None:
+                return len(self.data)
+            return self.metrics_accumulator.rows if self.metrics_accumulator is not None else None
+
+        def customer_rows():
+            return len(self.segments) if self.segments is not None else None
+
+        # Após a segmentação, as etapas 4-7 só leem self.segments e rodam em paralelo
+        pipeline = PipelineScheduler(max_workers=max_workers)
+        pipeline.add('load_data', stage('load_data', "1. Loading data (real if available)...",
+                                        load, input_rows))
+        pipeline.add('customer_metrics', stage('customer_metrics', "2. Calculating customer metrics...",
+                                               cached('customer_metrics', lambda _: metrics()), input_rows),
+                     ['load_data'])
+        pipeline.add('segmentation', stage('segmentation', "3. Performing customer segmentation...",
+                                           cached('segmentation', segment,
+                                                  lambda _: {'segments': self.segments,
+                                                             'model': self.models['segmentation']},
+                                                  restore_segmentation), customer_rows),
+                     ['customer_metrics'])
+        pipeline.add('segment_analysis', stage('segment_analysis', "4. Analyzing segment characteristics...",
+                                               cached('segment_analysis',
+                                                      lambda _: self.analyze_segment_characteristics()),
+                                               customer_rows),
+                     ['segmentation'])
+        pipeline.add('visualizations', stage('visualizations', "5. Creating visualizations...",
+                                             lambda _: self.create_visualizations(), customer_rows),
+                     ['segmentation'])
+        pipeline.add('churn_model', stage('churn_model', "6. Building churn prediction model...",
+                                          cached('churn_model', lambda _: self.predict_customer_churn(),
+                                                 restore=restore_churn), customer_rows),
+                     ['segmentation'])
+        pipeline.add('insights', stage('insights', "7. Generating insights report...",
+                                       cached('insights', lambda _: self.generate_insights_report()),
+                                       customer_rows),
+                     ['segmentation'])
+        results, timings = pipeline.run()
         print("Analysis completed successfully!")
+
+        kmeans_analysis, rfm_analysis = results['segment_analysis']
         return {
-            'customer_metrics': customer_metrics,
+            'customer_metrics': results['customer_metrics'],
             'segments': self.segments,
             'kmeans_analysis': kmeans_analysis,
             'rfm_analysis': rfm_analysis,
-            'churn_model': churn_model,
-            'insights': insights,
-            'dashboard': dashboard
+            'churn_model': results['churn_model'],
+            'insights': results['insights'],
+            'dashboard': results['visualizations'],
+            'stage_timings': timings,
+            'stage_metrics': stage_metrics,
+            'result_store': reuse
         }
 
 def main():
@@ -232,13 +464,13 @@ def main():
     - Place your real CSV at data/customer_data.csv using columns like:
       customer_id, name, email, age, gender, purchase_amount, purchase_date,
       category, last_login, signup_date, country, city.
-    - Run: python customer_analytics.py
+    - Run: python -m src.customer_analytics
     - The script will automatically prefer the real dataset and only generate synthetic
       data if the CSV is missing or invalid. Visualizations will be written to
       customer_behavior_dashboard.html.
 
     Example:
-      $ python customer_analytics.py
+      $ python -m src.customer_analytics
     """
     analytics = CustomerBehaviorAnalytics()
     results = analytics.run_complete_analysis()
@@ -0,0 +1,106 @@
+"""
+Bounded-size rendering of the customer behavior dashboard
+The 3D RFM scatter is reduced to a capped stratified sample per segment or
+to density bins, the other panels are drawn from one pre-aggregated frame,
+and plotly.js is referenced (CDN or shared file) instead of inlined, so
+build time and HTML size do not grow with the number of customers.
+"""
+
+import os
+
+import numpy as np
+
+SCATTER_MODES = ('sample', 'density', 'full')
+RFM_COLUMNS = ['Recency', 'Frequency', 'Monetary']
+
+
+def sample_per_segment(segments, max_points, segment_column='segment_rfm', random_state=42):
+    """Random sample of at most max_points rows from each segment"""
+    rng = np.random.default_rng(random_state)
+    shuffled = segments.iloc[rng.permutation(len(segments))]
+    keep = shuffled.groupby(segment_column, sort=False).cumcount().to_numpy() < max_points
+    return shuffled[keep]
+
+
+def density_bins(segments, bins=20, segment_column='segment_rfm'):
+    """Customers counted per segment in a bins x bins x bins RFM grid
+
+    Returns one row per occupied cell with the mean RFM of its customers
+    and the customer count.
+    """
+    cells = segments[[segment_column]].copy()
+    for col in RFM_COLUMNS:
+        values = segments[col].to_numpy(dtype=np.float64)
+        low, high = values.min(), values.max()
+        scale = bins / (high - low) if high > low else 0.0
+        cells[col] = np.minimum(((values - low) * scale).astype(np.int64), bins - 1)
+    grouped = segments[RFM_COLUMNS].groupby([cells[segment_column]] + [cells[col] for col in RFM_COLUMNS])
+    binned = grouped.mean()
+    binned['customers'] = grouped.size()
+    return binned.reset_index(level=0).reset_index(drop=True)
+
+
+def segment_summary(segments, segment_column='segment_rfm'):
+    """Churn rate, revenue and mean CLV per segment in a single groupby"""
+    summary = segments.groupby(segment_column).agg(
+        churn_rate=('is_churned', 'mean'),
+        revenue=('total_spent', 'sum'),
+        avg_clv=('customer_lifetime_value', 'mean')
+    )
+    summary['churn_rate'] *= 100
+    return summary
+
+
+def rfm_scatter(segments, mode='sample', max_points_per_segment=5000, bins=20):
+    if mode not in SCATTER_MODES:
+        raise ValueError(f"Unknown scatter mode '{mode}'. Choose from {SCATTER_MODES}.")
+    import plotly.graph_objects as go
+
+    if mode == 'density':
+        binned = density_bins(segments, bins)
+        # Area do marcador proporcional ao log do numero de clientes na celula
+        size = 3 + 3 * np.log1p(binned['customers'].to_numpy())
+        return go.Scatter3d(x=binned['Recency'], y=binned['Frequency'], z=binned['Monetary'], mode='markers',
+                            marker=dict(color=binned['segment_rfm'], size=size, opacity=0.6),
+                            text=binned['customers'], hovertemplate='%{text} clientes<extra></extra>',
+                            name='Segmentos RFM')
+    points = segments if mode == 'full' else sample_per_segment(segments, max_points_per_segment)
+    return go.Scatter3d(x=points['Recency'], y=points['Frequency'], z=points['Monetary'], mode='markers',
+                        marker=dict(color=points['segment_rfm'], size=5, opacity=0.8), name='Segmentos RFM')
+
+
+def build_dashboard(segments, mode='sample', max_points_per_segment=5000, bins=20):
+    # plotly so e carregado ao desenhar; quem so usa os agregados nao paga o import
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    fig = make_subplots(rows=2, cols=2,
+                        specs=[[{'type': 'scene'}, {'type': 'xy'}],
+                               [{'type': 'domain'}, {'type': 'xy'}]],
+                        subplot_titles=("Segmentação de Clientes (RFM)",
+                                        "Distribuição de Churn por Segmento",
+                                        "Receita por Segmento",
+                                        "CLV Médio por Segmento"))
+    summary = segment_summary(segments)
+
+    fig.add_trace(rfm_scatter(segments, mode, max_points_per_segment, bins), row=1, col=1)
+    fig.add_trace(go.Bar(x=summary.index, y=summary['churn_rate'], name='Churn Rate', marker_color='red'), row=1, col=2)
+    fig.add_trace(go.Pie(labels=summary.index, values=summary['revenue'], name='Receita', hole=0.3), row=2, col=1)
+    fig.add_trace(go.Bar(x=summary.index, y=summary['avg_clv'], name='CLV Médio', marker_color='blue'), row=2, col=2)
+
+    fig.update_layout(title_text="Dashboard de Análise de Comportamento do Cliente", height=800, showlegend=False)
+    return fig
+
+
+def write_dashboard(fig, output_path, include_plotlyjs='cdn'):
+    """Write the figure as HTML; include_plotlyjs is passed to plotly's write_html
+
+    'cdn' links plotly.js from the CDN, 'directory' shares one plotly.min.js
+    next to the HTML file, a path ending in .js links that file, and True
+    inlines the library (several MB per file).
+    """
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    fig.write_html(output_path, include_plotlyjs=include_plotlyjs)
+    return output_path
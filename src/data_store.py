@@ -0,0 +1,222 @@
+"""
+Shared in-memory dataset store for the Customer Behavior Analytics API
+Loads the customer data file (CSV, Parquet or Arrow) once and reloads it
+only when the file changes
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .rollups import build_rollups
+from .schema import compact_frame
+from .storage import detect_format, read_table
+
+
+def build_value_index(series):
+    """Map lower-cased values to the sorted row positions that hold them"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        labels = series.cat.categories
+    else:
+        codes, labels = pd.factorize(series)
+
+    # argsort estavel mantem as posicoes ordenadas dentro de cada valor
+    order = np.argsort(codes, kind='stable')
+    missing = int((codes < 0).sum())
+    counts = np.bincount(codes[codes >= 0], minlength=len(labels))
+    groups = np.split(order[missing:], np.cumsum(counts)[:-1])
+
+    index = {}
+    for label, rows in zip(labels, groups):
+        key = str(label).lower()
+        index[key] = np.union1d(index[key], rows) if key in index else rows
+    return index
+
+
+class DatasetSnapshot:
+    """Immutable view of one loaded version of the dataset"""
+
+    INDEXED_COLUMNS = ('country', 'category')
+
+    def __init__(self, data, signature=None, load_seconds=0.0, loaded_at=None, raw_memory_bytes=None):
+        self.data = data
+        self.signature = signature
+        self.load_seconds = load_seconds
+        self.loaded_at = loaded_at
+        self.memory_bytes = int(data.memory_usage(deep=True).sum()) if not data.empty else 0
+        # Memoria do frame como lido, antes da compactacao pelo schema
+        self.raw_memory_bytes = raw_memory_bytes if raw_memory_bytes is not None else self.memory_bytes
+        self._index_lock = threading.Lock()
+        self._customer_index = None
+        self._value_indexes = None
+        self._rollups = None
+
+    def _ensure_indexes(self):
+        if self._value_indexes is not None:
+            return
+        with self._index_lock:
+            if self._value_indexes is not None:
+                return
+            ids = self.data['customer_id']
+            first = ~ids.duplicated().to_numpy()
+            self._customer_index = dict(zip(ids[first].tolist(), np.flatnonzero(first).tolist()))
+            self._value_indexes = {
+                col: build_value_index(self.data[col])
+                for col in self.INDEXED_COLUMNS if col in self.data.columns
+            }
+
+    def customer_position(self, customer_id):
+        """Row position of the first record for customer_id, or None"""
+        if self.data.empty:
+            return None
+        self._ensure_indexes()
+        return self._customer_index.get(customer_id)
+
+    def filter_positions(self, **filters):
+        """Sorted row positions matching case-insensitive equality filters
+
+        Returns None when no filter is set, meaning every row matches.
+        """
+        active = {col: value for col, value in filters.items() if value}
+        if not active:
+            return None
+        self._ensure_indexes()
+        positions = None
+        for col, value in active.items():
+            if col not in self._value_indexes:
+                raise KeyError(col)
+            rows = self._value_indexes[col].get(value.lower(), np.empty(0, dtype=np.intp))
+            positions = rows if positions is None else np.intersect1d(positions, rows, assume_unique=True)
+        return positions
+
+    @property
+    def rollups(self):
+        """Day x customer x category rollups, built on first use"""
+        if self._rollups is None:
+            with self._index_lock:
+                if self._rollups is None:
+                    self._rollups = build_rollups(self.data)
+        return self._rollups
+
+    @property
+    def fingerprint(self):
+        """Version identifier derived from the file's mtime and size"""
+        if self.signature is None:
+            return 'empty'
+        mtime_ns, size = self.signature
+        return f'{mtime_ns:x}-{size:x}'
+
+    @property
+    def empty(self):
+        return self.data.empty
+
+
+class DatasetStore:
+    """Thread-safe cache of a dataset file, invalidated on mtime/size change
+
+    If schema is given, each load is compacted with it (see src.schema).
+    get() reloads a changed file itself; load() and publish() let a
+    background job build the next snapshot while readers keep the
+    current one.
+    """
+
+    def __init__(self, path, loader=read_table, schema=None):
+        self.path = path
+        self.loader = loader
+        self.schema = schema
+        self.format = detect_format(path)
+        self._lock = threading.Lock()
+        self._snapshot = DatasetSnapshot(pd.DataFrame())
+        self._loads = 0
+        self._last_error = None
+        # Assinatura que falhou ao carregar: nao e recarregada ate o arquivo mudar de novo
+        self._failed_signature = None
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    @property
+    def current(self):
+        """The published snapshot, without checking the file"""
+        return self._snapshot
+
+    def changed(self):
+        """Whether the file differs from the published snapshot (and has not failed to load)"""
+        signature = self._file_signature()
+        return signature != self._snapshot.signature and signature != self._failed_signature
+
+    def load(self):
+        """Read the file into a new snapshot without publishing it"""
+        signature = self._file_signature()
+        if signature is None:
+            return DatasetSnapshot(pd.DataFrame())
+
+        start = time.perf_counter()
+        try:
+            data = self.loader(self.path)
+        except Exception as e:
+            self._last_error = str(e)
+            self._failed_signature = signature
+            raise
+        raw_memory_bytes = None
+        if self.schema:
+            data, report = compact_frame(data, self.schema)
+            raw_memory_bytes = report['before_bytes']
+        snapshot = DatasetSnapshot(
+            data,
+            signature=signature,
+            load_seconds=time.perf_counter() - start,
+            loaded_at=datetime.now(),
+            raw_memory_bytes=raw_memory_bytes
+        )
+        self._loads += 1
+        self._last_error = None
+        self._failed_signature = None
+        return snapshot
+
+    def publish(self, snapshot):
+        """Make snapshot the one readers get"""
+        with self._lock:
+            self._snapshot = snapshot
+        return snapshot
+
+    def get(self):
+        """Return the current snapshot, reloading the file only if it changed"""
+        signature = self._file_signature()
+        snapshot = self._snapshot
+        if signature == snapshot.signature:
+            return snapshot
+
+        with self._lock:
+            # Outra thread pode ter recarregado enquanto esperavamos o lock
+            snapshot = self._snapshot
+            if signature == snapshot.signature:
+                return snapshot
+            self._snapshot = self.load()
+            return self._snapshot
+
+    def stats(self):
+        """Summary of the cached dataset for health reporting"""
+        snapshot = self._snapshot
+        return {
+            'path': self.path,
+            'format': self.format,
+            'loaded': snapshot.signature is not None,
+            'fingerprint': snapshot.fingerprint,
+            'rows': len(snapshot.data),
+            'memory_bytes': snapshot.memory_bytes,
+            'raw_memory_bytes': snapshot.raw_memory_bytes,
+            'load_seconds': round(snapshot.load_seconds, 6),
+            'loaded_at': snapshot.loaded_at.isoformat() if snapshot.loaded_at else None,
+            'loads': self._loads,
+            'last_error': self._last_error
+        }
@@ -0,0 +1,175 @@
+"""
+Incremental (append-only) customer metrics and segment updates
+Persists per-customer aggregate state plus the fitted scaler and KMeans
+centroids, and folds new transaction batches into affected customers only
+"""
+
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .metrics_engine import combine_partials, finalize_partials, partial_aggregates
+
+RFM_COLUMNS = ['Recency', 'Frequency', 'Monetary']
+DEFAULT_N_CLUSTERS = 4
+DEFAULT_DRIFT_THRESHOLD = 0.25
+
+
+class IncrementalAnalytics:
+    """Per-customer state that is updated from daily transaction batches
+
+    Metrics for untouched customers are re-derived from their stored
+    aggregates (an O(customers) vectorized step, never a history rescan).
+    Segments are reassigned only for touched customers using the stored
+    scaler and centroids; KMeans is refitted on demand or when the mean
+    distance to the centroids drifts past drift_threshold.
+
+    n_clusters and drift_threshold are saved with the state: load() restores
+    them when not given, and rejects a different explicit n_clusters.
+    """
+
+    STATE_FILE = 'customer_state.pkl'
+    MODEL_FILE = 'segmentation.joblib'
+    META_FILE = 'metadata.json'
+
+    def __init__(self, state_dir, n_clusters=None, drift_threshold=None, random_state=42):
+        self.state_dir = state_dir
+        self._requested = {'n_clusters': n_clusters, 'drift_threshold': drift_threshold}
+        self.n_clusters = n_clusters or DEFAULT_N_CLUSTERS
+        self.drift_threshold = DEFAULT_DRIFT_THRESHOLD if drift_threshold is None else drift_threshold
+        self.random_state = random_state
+        self.state = None
+        self.segments = None
+        self.scaler = None
+        self.kmeans = None
+        self.metadata = {}
+
+    @property
+    def initialized(self):
+        return os.path.exists(os.path.join(self.state_dir, self.META_FILE))
+
+    def initialize(self, transactions):
+        """Build the state from the full transaction history and fit segments"""
+        return self.initialize_partials(partial_aggregates(transactions), len(transactions))
+
+    def initialize_partials(self, partials, rows):
+        """Build the state from already combined partial aggregates (e.g. streamed)"""
+        self.state = partials
+        self.metadata = {'refits': 0, 'batches': 0, 'rows': rows}
+        self.refit()
+        self.save()
+        return {'rows': rows, 'customers_touched': len(self.state),
+                'new_customers': len(self.state), 'drift': 0.0, 'refit': True}
+
+    def metrics(self):
+        """Current per-customer metrics table, with segment_rfm"""
+        metrics = finalize_partials(self.state)
+        metrics['segment_rfm'] = self.segments.reindex(metrics.index).to_numpy()
+        return metrics
+
+    def _distances(self, rfm):
+        # Distancia quadratica de cada cliente ao centroide mais proximo
+        return self.kmeans.transform(self.scaler.transform(rfm)).min(axis=1) ** 2
+
+    def refit(self):
+        """Refit the scaler and KMeans on every customer's current RFM"""
+        from sklearn.cluster import KMeans
+        from sklearn.preprocessing import StandardScaler
+
+        rfm = finalize_partials(self.state)[RFM_COLUMNS]
+        self.scaler = StandardScaler().fit(rfm)
+        self.kmeans = KMeans(n_clusters=self.n_clusters, random_state=self.random_state, n_init=10)
+        labels = self.kmeans.fit_predict(self.scaler.transform(rfm))
+        self.segments = pd.Series(labels, index=rfm.index, name='segment_rfm')
+        self.metadata['fit_mean_distance'] = float(self._distances(rfm).mean())
+        self.metadata['fitted_at'] = datetime.now().isoformat()
+        self.metadata['refits'] = self.metadata.get('refits', 0) + 1
+
+    def drift(self, rfm=None):
+        """Relative change of the mean distance to centroids since the last fit"""
+        if rfm is None:
+            rfm = finalize_partials(self.state)[RFM_COLUMNS]
+        baseline = self.metadata['fit_mean_distance']
+        return float(self._distances(rfm).mean() / baseline - 1) if baseline else 0.0
+
+    def apply_batch(self, transactions, refit=False):
+        """Fold a batch of new transactions into the state
+
+        Returns a report with the number of customers touched and whether
+        the segmentation was refitted.
+        """
+        if self.state is None:
+            self.load()
+        partial = partial_aggregates(transactions)
+        touched = partial.index
+        existing = touched.intersection(self.state.index)
+        new_customers = len(touched) - len(existing)
+
+        # Combina o estado antigo dos clientes afetados com o lote novo
+        merged = combine_partials([self.state.loc[existing], partial])
+        state = pd.concat([self.state.drop(existing), merged]).sort_index()
+        for col in self.state.columns:
+            if isinstance(self.state[col].dtype, pd.CategoricalDtype):
+                state[col] = state[col].astype('category')
+        self.state = state
+
+        rfm = finalize_partials(self.state)[RFM_COLUMNS]
+        drift = self.drift(rfm)
+        do_refit = refit or abs(drift) > self.drift_threshold
+        if do_refit:
+            self.refit()
+        else:
+            labels = self.kmeans.predict(self.scaler.transform(rfm.loc[touched]))
+            segments = self.segments.drop(existing)
+            self.segments = pd.concat([segments, pd.Series(labels, index=touched, name='segment_rfm')]).sort_index()
+
+        self.metadata['batches'] = self.metadata.get('batches', 0) + 1
+        self.metadata['rows'] = self.metadata.get('rows', 0) + len(transactions)
+        self.save()
+        return {
+            'rows': len(transactions),
+            'customers_touched': len(touched),
+            'new_customers': new_customers,
+            'drift': drift,
+            'refit': do_refit
+        }
+
+    def save(self):
+        import joblib
+
+        os.makedirs(self.state_dir, exist_ok=True)
+        state = self.state.copy()
+        state['segment_rfm'] = self.segments.reindex(state.index).to_numpy()
+        state.to_pickle(os.path.join(self.state_dir, self.STATE_FILE))
+        joblib.dump({'scaler': self.scaler, 'kmeans': self.kmeans}, os.path.join(self.state_dir, self.MODEL_FILE))
+        self.metadata['updated_at'] = datetime.now().isoformat()
+        self.metadata['customers'] = len(self.state)
+        self.metadata['n_clusters'] = self.n_clusters
+        self.metadata['drift_threshold'] = self.drift_threshold
+        with open(os.path.join(self.state_dir, self.META_FILE), 'w') as f:
+            json.dump(self.metadata, f, indent=2)
+
+    def load(self):
+        if not self.initialized:
+            raise FileNotFoundError(f"No incremental state in {self.state_dir}")
+        import joblib
+
+        state = pd.read_pickle(os.path.join(self.state_dir, self.STATE_FILE))
+        self.segments = state.pop('segment_rfm').astype(np.int32)
+        self.state = state
+        models = joblib.load(os.path.join(self.state_dir, self.MODEL_FILE))
+        self.scaler, self.kmeans = models['scaler'], models['kmeans']
+        with open(os.path.join(self.state_dir, self.META_FILE)) as f:
+            self.metadata = json.load(f)
+        # Parametros salvos valem na recarga; refit com outro n_clusters mudaria os segmentos
+        stored = self.metadata.get('n_clusters', DEFAULT_N_CLUSTERS)
+        requested = self._requested['n_clusters']
+        if requested is not None and requested != stored:
+            raise ValueError(f"State in {self.state_dir} was fitted with n_clusters={stored}, not {requested}.")
+        self.n_clusters = stored
+        if self._requested['drift_threshold'] is None:
+            self.drift_threshold = self.metadata.get('drift_threshold', DEFAULT_DRIFT_THRESHOLD)
+        return self
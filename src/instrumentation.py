@@ -0,0 +1,282 @@
+"""
+In-process metrics registry and per-stage instrumentation
+Records wall/CPU time, peak RSS and rows processed for pipeline stages,
+latency histograms for API endpoints, and renders everything in the
+Prometheus text exposition format. Optional cProfile/tracemalloc capture
+writes one profile per stage to disk.
+"""
+
+import contextlib
+import cProfile
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Intervalo de amostragem do RSS durante um estagio (segundos)
+RSS_SAMPLE_INTERVAL = 0.005
+# Limites dos buckets de latencia (segundos), como no cliente Prometheus
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def current_rss_mb():
+    """Current resident set size of this process, in MB (None if unknown)"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE') / 1e6
+
+
+def process_peak_rss_mb():
+    """High-water mark of this process's RSS since it started, in MB (None if unknown)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss e em bytes no macOS e em KB no Linux
+    return peak / 1e6 if sys.platform == 'darwin' else peak / 1e3
+
+
+class RssPeakSampler:
+    """Samples the current RSS from a background thread between start and stop
+
+    peak_mb is the highest RSS seen between enter and exit (None if the
+    platform does not expose the current RSS). Allocations that live for
+    less than one interval can be missed.
+    """
+
+    def __init__(self, interval=RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak_mb = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        rss = current_rss_mb()
+        if rss is not None and (self.peak_mb is None or rss > self.peak_mb):
+            self.peak_mb = rss
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._sample()
+        if self.peak_mb is not None:
+            self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop sampling; returns peak_mb"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._sample()
+        return self.peak_mb
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += 1
+        self.sum += value
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    body = ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in labels)
+    return '{' + body + '}'
+
+
+class MetricsRegistry:
+    """Thread-safe store of counters, gauges, histograms and stage records"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._help = {}
+        self.stages = {}
+
+    def _describe(self, name, kind, help_text):
+        self._help.setdefault(name, (kind, help_text))
+
+    def inc(self, name, value=1, help_text='', **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._describe(name, 'counter', help_text)
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, help_text='', **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._describe(name, 'gauge', help_text)
+            self._gauges[key] = value
+
+    def observe(self, name, value, help_text='', buckets=DEFAULT_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._describe(name, 'histogram', help_text)
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def record_stage(self, name, record):
+        with self._lock:
+            self.stages[name] = dict(record)
+        for metric in ('wall_seconds', 'cpu_seconds', 'stage_peak_rss_mb', 'rows'):
+            if record.get(metric) is not None:
+                self.set_gauge('pipeline_stage_' + metric.removeprefix('stage_'), record[metric],
+                               f'Last observed {metric} of a pipeline stage', stage=name)
+        self.inc('pipeline_stage_runs_total', 1, 'Pipeline stage executions', stage=name)
+
+    def snapshot(self):
+        """Plain-dict copy of every metric, for programmatic access"""
+        with self._lock:
+            return {
+                'counters': {(n, l): v for (n, l), v in self._counters.items()},
+                'gauges': {(n, l): v for (n, l), v in self._gauges.items()},
+                'histograms': {(n, l): {'count': h.total, 'sum': h.sum} for (n, l), h in self._histograms.items()},
+                'stages': {name: dict(r) for name, r in self.stages.items()}
+            }
+
+    def render_prometheus(self, extra_gauges=(), extra_counters=()):
+        """Prometheus text format; extra_gauges and extra_counters are (name, help, labels, value) tuples"""
+        lines = []
+        with self._lock:
+            series = {}
+            for (name, labels), value in self._counters.items():
+                series.setdefault(name, []).append((labels, value))
+            for (name, labels), value in self._gauges.items():
+                series.setdefault(name, []).append((labels, value))
+            for name in sorted(series):
+                kind, help_text = self._help[name]
+                lines.append(f'# HELP {name} {help_text or name}')
+                lines.append(f'# TYPE {name} {kind}')
+                for labels, value in sorted(series[name]):
+                    lines.append(f'{name}{_labels(labels)} {value}')
+
+            histograms = {}
+            for (name, labels), histogram in self._histograms.items():
+                histograms.setdefault(name, []).append((labels, histogram))
+            for name in sorted(histograms):
+                _, help_text = self._help[name]
+                lines.append(f'# HELP {name} {help_text or name}')
+                lines.append(f'# TYPE {name} histogram')
+                for labels, h in sorted(histograms[name], key=lambda item: item[0]):
+                    for bound, count in zip(h.buckets, h.counts):
+                        lines.append(f'{name}_bucket{_labels(labels + (("le", bound),))} {count}')
+                    lines.append(f'{name}_bucket{_labels(labels + (("le", "+Inf"),))} {h.total}')
+                    lines.append(f'{name}_sum{_labels(labels)} {h.sum}')
+                    lines.append(f'{name}_count{_labels(labels)} {h.total}')
+
+        described = set()
+        extra = [(metric, 'gauge') for metric in extra_gauges] + [(metric, 'counter') for metric in extra_counters]
+        for (name, help_text, labels, value), kind in sorted(extra, key=lambda item: item[0][0]):
+            if value is None:
+                continue
+            if name not in described:
+                described.add(name)
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+            lines.append(f'{name}{_labels(tuple(sorted(labels.items())))} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+# Registro padrao compartilhado pelo pipeline e pela API no mesmo processo
+registry = MetricsRegistry()
+
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_tracemalloc_owned = False
+
+
+@contextlib.contextmanager
+def _tracemalloc_session():
+    # tracemalloc e global ao processo; estagios paralelos compartilham a sessao
+    # e so paramos o rastreamento se fomos nos que o iniciamos
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracemalloc_owned = True
+        _tracemalloc_users += 1
+    try:
+        yield
+    finally:
+        with _tracemalloc_lock:
+            _tracemalloc_users -= 1
+            if _tracemalloc_users == 0 and _tracemalloc_owned:
+                tracemalloc.stop()
+                _tracemalloc_owned = False
+
+
+@contextlib.contextmanager
+def instrument_stage(name, registry=registry, profile_dir=None):
+    """Measure a pipeline stage and record it in the registry
+
+    Yields a dict; the stage may set record['rows'] to the number of rows
+    it processed. With profile_dir set, a cProfile dump (<name>.prof) and
+    the top tracemalloc allocation sites (<name>.tracemalloc.txt) are
+    written there. CPU time is process-wide, so it includes native worker
+    threads started by the stage. stage_peak_rss_mb is the highest RSS
+    sampled while the stage ran (see RssPeakSampler), so memory allocated
+    and freed inside the stage still counts; it is process-wide, so
+    stages running in parallel see each other's memory.
+    process_peak_rss_mb is the lifetime high-water mark, for reference.
+    """
+    record = {'stage': name, 'rows': None}
+    profiler = None
+    tracing = contextlib.nullcontext()
+    if profile_dir:
+        os.makedirs(profile_dir, exist_ok=True)
+        profiler = cProfile.Profile()
+        tracing = _tracemalloc_session()
+
+    with tracing:
+        rss = RssPeakSampler().start()
+        wall, cpu = time.perf_counter(), time.process_time()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield record
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            record['wall_seconds'] = time.perf_counter() - wall
+            record['cpu_seconds'] = time.process_time() - cpu
+            record['stage_peak_rss_mb'] = rss.stop()
+            record['process_peak_rss_mb'] = process_peak_rss_mb()
+            if profiler is not None:
+                profiler.dump_stats(os.path.join(profile_dir, f'{name}.prof'))
+                top = tracemalloc.take_snapshot().statistics('lineno')[:25]
+                with open(os.path.join(profile_dir, f'{name}.tracemalloc.txt'), 'w') as f:
+                    f.write('\n'.join(str(stat) for stat in top) + '\n')
+                record['profile'] = os.path.join(profile_dir, f'{name}.prof')
+            registry.record_stage(name, record)
@@ -0,0 +1,143 @@
+"""
+Background jobs for the REST API
+Long tasks (full analysis runs, analytics precomputation) run on a small
+worker pool off the request path. The latest successful result of each
+kind is kept so readers are served immediately, even while a newer run
+is still computing.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+ACTIVE_STATES = ('queued', 'running')
+
+
+class Job:
+    """State of one submitted job"""
+
+    def __init__(self, kind, params):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.params = params
+        self.status = 'queued'
+        self.submitted_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self.seconds = None
+        self.error = None
+        self.result = None
+        self.done = threading.Event()
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'type': self.kind,
+            'status': self.status,
+            'params': self.params,
+            'submitted_at': self.submitted_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'seconds': round(self.seconds, 6) if self.seconds is not None else None,
+            'error': self.error
+        }
+
+
+class JobManager:
+    """Run jobs on a thread pool and track their status
+
+    Only the last max_history jobs are kept; the latest successful job of
+    each kind is kept regardless.
+    """
+
+    def __init__(self, max_workers=2, max_history=100):
+        self.max_history = max_history
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='api-job')
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._latest = {}
+
+    def submit(self, kind, func, exclusive=True, **params):
+        """Queue func(**params); returns (job, created)
+
+        With exclusive=True an already queued or running job of the same
+        kind is returned instead of starting another one.
+        """
+        with self._lock:
+            if exclusive:
+                for job in reversed(self._jobs.values()):
+                    if job.kind == kind and job.status in ACTIVE_STATES:
+                        return job, False
+            job = Job(kind, params)
+            self._jobs[job.id] = job
+            self._trim()
+        self._executor.submit(self._run, job, func)
+        return job, True
+
+    def _trim(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.status not in ACTIVE_STATES]
+        latest_ids = {job.id for job in self._latest.values()}
+        excess = len(self._jobs) - self.max_history
+        for job_id in finished:
+            if excess <= 0:
+                break
+            if job_id not in latest_ids:
+                del self._jobs[job_id]
+                excess -= 1
+
+    def _run(self, job, func):
+        job.status = 'running'
+        job.started_at = datetime.now()
+        start = time.perf_counter()
+        result, error = None, None
+        try:
+            result = func(**job.params)
+        except Exception as e:
+            error = f'{type(e).__name__}: {e}'
+        job.seconds = time.perf_counter() - start
+        job.finished_at = datetime.now()
+        if error is not None:
+            job.error = error
+            job.status = 'failed'
+        else:
+            job.result = result
+            with self._lock:
+                # Troca atomica: leitores veem o resultado anterior ate aqui
+                current = self._latest.get(job.kind)
+                if current is None or current.submitted_at <= job.submitted_at:
+                    self._latest[job.kind] = job
+                job.status = 'succeeded'
+        job.done.set()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self, kind=None):
+        """Known jobs, newest first"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job for job in reversed(jobs) if kind is None or job.kind == kind]
+
+    def latest(self, kind):
+        """Most recent successful job of this kind, or None"""
+        with self._lock:
+            return self._latest.get(kind)
+
+    def wait(self, job_id, timeout=None):
+        job = self.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        job.done.wait(timeout)
+        return job
+
+    def stats(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        counts = {}
+        for job in jobs:
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return counts
@@ -0,0 +1,116 @@
+"""
+Versioned persistence of fitted model artifacts
+Each version directory holds the RFM scaler, the segmentation centroids,
+the churn model and a manifest; LATEST points at the newest version
+"""
+
+import json
+import os
+import uuid
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .segmentation import assign_clusters
+
+MANIFEST_FILE = 'manifest.json'
+ARTIFACTS_FILE = 'artifacts.joblib'
+LATEST_FILE = 'LATEST'
+RFM_COLUMNS = ['Recency', 'Frequency', 'Monetary']
+
+
+def save_artifacts(models, base_dir='models', version=None):
+    """Persist the fitted scaler, centroids and churn model; returns the version"""
+    import joblib
+
+    if 'segmentation' not in models or 'churn_prediction' not in models:
+        raise ValueError("Segmentation and churn prediction must be run before saving artifacts.")
+    # Microssegundos + sufixo aleatorio: saves simultaneos nao colidem e a ordem segue o tempo
+    version = version or f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{uuid.uuid4().hex[:6]}"
+    version_dir = os.path.join(base_dir, version)
+    os.makedirs(version_dir, exist_ok=False)
+
+    churn = models['churn_prediction']
+    segmentation = models['segmentation']
+    joblib.dump({
+        'scaler': segmentation['scaler'],
+        'centroids': np.asarray(segmentation['engine'].cluster_centers_),
+        'churn_model': churn['model']
+    }, os.path.join(version_dir, ARTIFACTS_FILE))
+
+    manifest = {
+        'version': version,
+        'created_at': datetime.now().isoformat(),
+        'rfm_columns': RFM_COLUMNS,
+        'feature_columns': list(churn['feature_columns']),
+        'n_clusters': int(len(segmentation['engine'].cluster_centers_)),
+        'segmentation_engine': segmentation['engine'].engine
+    }
+    with open(os.path.join(version_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    # Atualiza o ponteiro por ultimo: leitores nunca veem versao incompleta
+    tmp_path = os.path.join(base_dir, LATEST_FILE + '.tmp')
+    with open(tmp_path, 'w') as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(base_dir, LATEST_FILE))
+    return version
+
+
+def list_versions(base_dir='models'):
+    if not os.path.isdir(base_dir):
+        return []
+    return sorted(d for d in os.listdir(base_dir) if os.path.exists(os.path.join(base_dir, d, MANIFEST_FILE)))
+
+
+def load_artifacts(base_dir='models', version='latest'):
+    """Load a saved version (or the one LATEST points at)"""
+    if version == 'latest':
+        latest_path = os.path.join(base_dir, LATEST_FILE)
+        if not os.path.exists(latest_path):
+            raise FileNotFoundError(f"No model artifacts found in {base_dir}")
+        with open(latest_path) as f:
+            version = f.read().strip()
+    version_dir = os.path.join(base_dir, version)
+    with open(os.path.join(version_dir, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    # joblib (e o sklearn dos modelos) so carregam quando ha artefatos
+    import joblib
+
+    return ModelArtifacts(manifest, joblib.load(os.path.join(version_dir, ARTIFACTS_FILE)))
+
+
+class ModelArtifacts:
+    """Loaded artifacts of one model version"""
+
+    def __init__(self, manifest, artifacts):
+        self.manifest = manifest
+        self.version = manifest['version']
+        self.feature_columns = manifest['feature_columns']
+        self.scaler = artifacts['scaler']
+        self.centroids = artifacts['centroids']
+        self.churn_model = artifacts['churn_model']
+        # Predicoes pequenas e frequentes: evita o custo de criar threads por chamada
+        if hasattr(self.churn_model, 'n_jobs'):
+            self.churn_model.n_jobs = 1
+        # Modelo treinado com uma unica classe: a probabilidade e constante (0 ou 1)
+        classes = list(self.churn_model.classes_)
+        if len(classes) == 1:
+            self._churn_column = None
+            self._constant_probability = float(classes[0] == 1)
+        elif 1 in classes:
+            self._churn_column = classes.index(1)
+        else:
+            raise ValueError(f"Churn model of version {self.version} has no churn class (1); classes: {classes}")
+
+    def churn_probability(self, features):
+        """Churn probability for each row of a feature matrix (columns in feature_columns order)"""
+        matrix = np.asarray(features, dtype=np.float64)
+        if self._churn_column is None:
+            return np.full(len(matrix), self._constant_probability)
+        frame = pd.DataFrame(matrix, columns=self.feature_columns)
+        return self.churn_model.predict_proba(frame)[:, self._churn_column]
+
+    def assign_segments(self, rfm):
+        """Segment labels for a frame with Recency/Frequency/Monetary columns"""
+        return assign_clusters(self.scaler.transform(rfm[RFM_COLUMNS]), self.centroids)
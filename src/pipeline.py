@@ -0,0 +1,60 @@
+"""
+Minimal DAG scheduler for the analytics pipeline
+Runs each stage as soon as its dependencies finish, executing independent
+stages concurrently on a thread pool, and records per-stage wall time
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class PipelineScheduler:
+    """Register stages with dependencies, then run them as a DAG
+
+    Each stage is called with its dependencies' results as positional
+    arguments, in depends_on order; results are returned by stage name.
+    Threads are used because stages share the analytics object in memory;
+    the heavy stages (model training, HTML writing) release the GIL in
+    native code or spend their time in I/O.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+        self.stages = {}
+
+    def add(self, name, func, depends_on=()):
+        missing = [dep for dep in depends_on if dep not in self.stages]
+        if missing:
+            raise ValueError(f"Stage '{name}' depends on unknown stages: {missing}")
+        self.stages[name] = (func, tuple(depends_on))
+        return self
+
+    @staticmethod
+    def _timed(func, args):
+        start = time.perf_counter()
+        result = func(*args)
+        return result, time.perf_counter() - start
+
+    def run(self):
+        """Execute every stage; returns (results, timings) keyed by stage name"""
+        results, timings = {}, {}
+        pending = dict(self.stages)
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                # Dispara, na ordem de registro, os estagios com dependencias prontas
+                for name in [n for n, (_, deps) in pending.items() if all(d in results for d in deps)]:
+                    func, deps = pending.pop(name)
+                    args = [results[dep] for dep in deps]
+                    running[executor.submit(self._timed, func, args)] = name
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name], timings[name] = future.result()
+                    except Exception:
+                        for other in running:
+                            other.cancel()
+                        raise
+        return results, timings
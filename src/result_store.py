@@ -0,0 +1,235 @@
+"""
+Content-addressed on-disk store of analysis stage results
+Each stage result is saved under a key hashed from everything it depends
+on (dataset fingerprint, upstream keys, stage parameters), pickled with
+the highest protocol. Reruns on unchanged inputs load results instead of
+recomputing them; the least recently used entries are evicted once the
+store outgrows its size budget.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import threading
+from datetime import datetime
+from functools import lru_cache
+from importlib import metadata
+
+# Muda quando o formato dos resultados muda: invalida entradas antigas
+STORE_VERSION = 1
+ENTRY_SUFFIX = '.pkl'
+DEFAULT_ROOT = '.cba_results'
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+# Resultados pickled dependem destas bibliotecas: atualiza-las invalida as chaves
+KEY_LIBRARIES = ('pandas', 'numpy', 'scikit-learn')
+# Arquivos ate este tamanho entram inteiros no hash; maiores, por blocos em offsets fixos
+FULL_HASH_MAX_BYTES = 64 * 1024 ** 2
+SAMPLE_BLOCKS = 16
+SAMPLE_BLOCK_BYTES = 1024 ** 2
+# Erros de um pickle truncado ou gravado por outra versao das bibliotecas
+UNREADABLE_ERRORS = (pickle.UnpicklingError, EOFError, AttributeError, ImportError,
+                     ValueError, TypeError, KeyError)
+
+
+@lru_cache(maxsize=None)
+def library_versions():
+    """Installed versions of KEY_LIBRARIES, read without importing them"""
+    versions = {}
+    for name in KEY_LIBRARIES:
+        try:
+            versions[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            versions[name] = None
+    return versions
+
+
+def fingerprint(*parts):
+    """Stable hex digest of JSON-serializable parts and the library versions"""
+    payload = json.dumps([STORE_VERSION, library_versions(), *parts], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+def content_hash(path):
+    """blake2b of a file's content: the whole file, or fixed-offset blocks if large"""
+    size = os.path.getsize(path)
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(path, 'rb') as f:
+        if size <= FULL_HASH_MAX_BYTES:
+            for block in iter(lambda: f.read(SAMPLE_BLOCK_BYTES), b''):
+                digest.update(block)
+        else:
+            step = (size - SAMPLE_BLOCK_BYTES) // (SAMPLE_BLOCKS - 1)
+            for i in range(SAMPLE_BLOCKS):
+                f.seek(i * step)
+                digest.update(f.read(SAMPLE_BLOCK_BYTES))
+    return digest.hexdigest()
+
+
+def file_fingerprint(paths):
+    """Fingerprint of files from their size and content hash
+
+    Paths and mtimes are left out, so a copied or moved dataset keeps its
+    key and a same-size rewrite does not. Files over FULL_HASH_MAX_BYTES
+    are hashed from SAMPLE_BLOCKS evenly spaced blocks plus their size.
+    """
+    return fingerprint('files', [content_hash(path) for path in sorted(paths)])
+
+
+class ResultStore:
+    """Stage results on disk, keyed by fingerprint, with LRU size eviction
+
+    Entries are files named <stage>-<key>.pkl; an entry's mtime is bumped
+    on every hit and is what eviction orders by. Writes go to a temporary
+    file first, so readers never see a partial entry; an entry that cannot
+    be unpickled is deleted and counted as a miss.
+    """
+
+    def __init__(self, root=DEFAULT_ROOT, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, stage, key):
+        return os.path.join(self.root, f'{stage}-{key}{ENTRY_SUFFIX}')
+
+    def __contains__(self, entry):
+        return os.path.exists(self._path(*entry))
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, stage, key, default=None):
+        path = self._path(stage, key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            self._count(hit=False)
+            return default
+        except UNREADABLE_ERRORS:
+            self._remove(path)
+            self._count(hit=False)
+            return default
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        self._count(hit=True)
+        return value
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def put(self, stage, key, value):
+        """Save value; returns its size in bytes"""
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(stage, key)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        finally:
+            self._remove(tmp_path)
+        self.evict()
+        return os.path.getsize(path) if os.path.exists(path) else 0
+
+    def entries(self):
+        """Stored entries, least recently used first"""
+        if not os.path.isdir(self.root):
+            return []
+        entries = []
+        for name in os.listdir(self.root):
+            if not name.endswith(ENTRY_SUFFIX):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.root, name))
+            except FileNotFoundError:
+                continue
+            stage, _, key = name[:-len(ENTRY_SUFFIX)].rpartition('-')
+            entries.append({'stage': stage, 'key': key, 'bytes': stat.st_size, 'last_used': stat.st_mtime})
+        return sorted(entries, key=lambda entry: entry['last_used'])
+
+    def evict(self):
+        """Remove least recently used entries until the store fits max_bytes"""
+        with self._lock:
+            entries = self.entries()
+            total = sum(entry['bytes'] for entry in entries)
+            removed = 0
+            for entry in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(self._path(entry['stage'], entry['key']))
+                except FileNotFoundError:
+                    pass
+                total -= entry['bytes']
+                removed += 1
+            return removed
+
+    def clear(self, stage=None):
+        """Remove every entry (or only those of one stage); returns the count"""
+        removed = 0
+        for entry in self.entries():
+            if stage is None or entry['stage'] == stage:
+                try:
+                    os.remove(self._path(entry['stage'], entry['key']))
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    def info(self):
+        entries = self.entries()
+        stages = {}
+        for entry in entries:
+            stage = stages.setdefault(entry['stage'], {'entries': 0, 'bytes': 0})
+            stage['entries'] += 1
+            stage['bytes'] += entry['bytes']
+        return {
+            'root': self.root,
+            'entries': len(entries),
+            'bytes': sum(entry['bytes'] for entry in entries),
+            'max_bytes': self.max_bytes,
+            'stages': stages,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear the analysis result store")
+    parser.add_argument('--root', default=os.environ.get('CBA_RESULT_STORE', DEFAULT_ROOT))
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('info', help='Show size and entries per stage')
+    clear = commands.add_parser('clear', help='Remove stored results')
+    clear.add_argument('--stage', help='Only remove entries of this stage')
+    args = parser.parse_args()
+
+    store = ResultStore(args.root)
+    if args.command == 'clear':
+        print(f"Removed {store.clear(args.stage)} entries from {args.root}")
+        return
+    info = store.info()
+    print(f"{info['root']}: {info['entries']} entries, {info['bytes'] / 1e6:,.1f} MB")
+    for stage, totals in sorted(info['stages'].items()):
+        print(f"   {stage:<20} {totals['entries']:>5} entries {totals['bytes'] / 1e6:>10,.1f} MB")
+    for entry in store.entries()[::-1]:
+        last_used = datetime.fromtimestamp(entry['last_used']).isoformat(timespec='seconds')
+        print(f"   {entry['stage']:<20} {entry['key']} {entry['bytes'] / 1e6:>10,.1f} MB  {last_used}")
+
+
+if __name__ == '__main__':
+    main()
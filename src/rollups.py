@@ -0,0 +1,243 @@
+"""
+Time-bucketed rollups of the transaction table
+Transactions are reduced once to one row per (day, customer, category)
+with purchase count and revenue, sorted by day and carrying the customer
+attributes. Date-range totals, rolling revenue, RFM as of a past date and
+cohort retention are then answered from the rollup (a sorted slice plus a
+small groupby) instead of rescanning raw transactions.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .storage import iter_chunks
+
+ATTRIBUTE_COLUMNS = ['age', 'gender', 'country', 'city', 'is_churned']
+ROLLUP_COLUMNS = ['customer_id', 'purchase_date', 'purchase_amount', 'category'] + ATTRIBUTE_COLUMNS
+PERIODS = {'M': 'M', 'month': 'M', 'W': 'W', 'week': 'W'}
+
+
+def _group_daily(day, customer_id, category, purchases, revenue):
+    """Sum purchases/revenue per (day, customer, category), sorted by those keys
+
+    Rows without a date are dropped. When the key ranges allow it, the three
+    keys are packed into one int64 so the grouping is a single factorize +
+    bincount; otherwise (non-integer or very sparse ids) a multi-key
+    groupby is used.
+    """
+    day = np.asarray(day, dtype='datetime64[D]')
+    customer_id = np.asarray(customer_id)
+    category = pd.Categorical(category)
+    purchases, revenue = np.asarray(purchases, dtype=np.float64), np.asarray(revenue, dtype=np.float64)
+    valid = ~np.isnat(day)
+    if not valid.all():
+        day, customer_id, category = day[valid], customer_id[valid], category[valid]
+        purchases, revenue = purchases[valid], revenue[valid]
+
+    slots = len(category.categories) + 1
+    packable = len(day) > 0 and np.issubdtype(customer_id.dtype, np.integer)
+    if packable:
+        day = day.astype(np.int64)
+        customer_id = customer_id.astype(np.int64)
+        first_day, first_customer = int(day.min()), int(customer_id.min())
+        day_span = int(day.max()) - first_day + 1
+        customer_span = int(customer_id.max()) - first_customer + 1
+        # Inteiros do Python: o teste em si nao pode estourar
+        packable = day_span * customer_span * slots < 2 ** 63
+    if not packable:
+        return _group_daily_frame(day, customer_id, category, purchases, revenue)
+
+    codes = category.codes.astype(np.int64)
+    codes[codes < 0] = slots - 1  # categoria ausente ocupa o ultimo slot
+    key = ((day - first_day) * customer_span + (customer_id - first_customer)) * slots + codes
+    group, keys = pd.factorize(key, sort=True)
+
+    category_codes = keys % slots
+    category_codes[category_codes == slots - 1] = -1
+    rest = keys // slots
+    return pd.DataFrame({
+        'day': (rest // customer_span + first_day).astype('datetime64[D]').astype('datetime64[ns]'),
+        'customer_id': rest % customer_span + first_customer,
+        'category': pd.Categorical.from_codes(category_codes, category.categories),
+        'purchases': np.bincount(group, weights=purchases, minlength=len(keys)).astype(np.int64),
+        'revenue': np.bincount(group, weights=revenue, minlength=len(keys))
+    })
+
+
+def _group_daily_frame(day, customer_id, category, purchases, revenue):
+    frame = pd.DataFrame({
+        'day': np.asarray(day, dtype='datetime64[D]').astype('datetime64[ns]'),
+        'customer_id': customer_id,
+        'category': category,
+        'purchases': purchases,
+        'revenue': revenue
+    })
+    daily = frame.groupby(['day', 'customer_id', 'category'], observed=True, dropna=False).sum().reset_index()
+    daily['purchases'] = daily['purchases'].astype(np.int64)
+    return daily
+
+
+def _daily_partial(transactions):
+    return _group_daily(transactions['purchase_date'].to_numpy(), transactions['customer_id'].to_numpy(),
+                        transactions['category'], np.ones(len(transactions)),
+                        transactions['purchase_amount'].to_numpy(dtype=np.float64))
+
+
+def _customer_partial(transactions):
+    aggregations = {col: (col, 'first') for col in ATTRIBUTE_COLUMNS if col in transactions.columns}
+    return transactions.groupby('customer_id').agg(first_purchase=('purchase_date', 'min'), **aggregations)
+
+
+def _combine(daily_parts, customer_parts):
+    daily = daily_parts[0]
+    if len(daily_parts) > 1:
+        parts = pd.concat(daily_parts, ignore_index=True)
+        # Categorias variam entre chunks: agrupa pelo valor (object mantem ausentes como NaN)
+        daily = _group_daily(parts['day'].to_numpy(), parts['customer_id'].to_numpy(),
+                             parts['category'].astype(object), parts['purchases'].to_numpy(dtype=np.float64),
+                             parts['revenue'].to_numpy())
+    customers = pd.concat(customer_parts)
+    if len(customer_parts) > 1:
+        aggregations = {col: 'first' for col in customers.columns}
+        aggregations['first_purchase'] = 'min'
+        customers = customers.groupby(level=0).agg(aggregations)
+    for col in customers.columns:
+        # Categorias variam entre chunks; recria as categoricas no final
+        if col in ('gender', 'country', 'city') and not isinstance(customers[col].dtype, pd.CategoricalDtype):
+            customers[col] = customers[col].astype('category')
+    return Rollups(daily, customers)
+
+
+def build_rollups(transactions):
+    """Rollups of an in-memory transaction table"""
+    return _combine([_daily_partial(transactions)], [_customer_partial(transactions)])
+
+
+def rollups_from_file(path, chunksize=1_000_000):
+    """Rollups of a transaction file, read in chunks"""
+    daily_parts, customer_parts = [], []
+    for chunk in iter_chunks(path, columns=ROLLUP_COLUMNS, chunksize=chunksize):
+        daily_parts.append(_daily_partial(chunk))
+        customer_parts.append(_customer_partial(chunk))
+    if not daily_parts:
+        raise ValueError(f"No transactions in {path}")
+    return _combine(daily_parts, customer_parts)
+
+
+def _to_day(value):
+    return None if value is None else pd.Timestamp(value).normalize()
+
+
+def weighted_median(values, weights):
+    """Median of values repeated weights times, without materializing them"""
+    order = np.argsort(values, kind='stable')
+    values, cumulative = np.asarray(values)[order], np.cumsum(np.asarray(weights)[order])
+    total = cumulative[-1]
+    lower = values[np.searchsorted(cumulative, (total - 1) // 2, side='right')]
+    upper = values[np.searchsorted(cumulative, total // 2, side='right')]
+    return (float(lower) + float(upper)) / 2
+
+
+class Rollups:
+    """Day x customer x category rollup plus per-customer attributes
+
+    daily is sorted by day; each row also carries the customer's
+    attributes so breakdowns by gender/country/city need no join.
+    """
+
+    def __init__(self, daily, customers):
+        positions = customers.index.get_indexer(daily['customer_id'])
+        for col in customers.columns.drop('first_purchase'):
+            daily[col] = customers[col].array.take(positions)
+        self.daily = daily
+        self.customers = customers
+        self._days = daily['day'].to_numpy()
+        self.daily_revenue = daily.groupby('day')['revenue'].sum().asfreq('D', fill_value=0.0)
+
+    @property
+    def first_day(self):
+        return pd.Timestamp(self._days[0]) if len(self._days) else None
+
+    @property
+    def last_day(self):
+        return pd.Timestamp(self._days[-1]) if len(self._days) else None
+
+    @property
+    def memory_bytes(self):
+        return int(self.daily.memory_usage(deep=True).sum() + self.customers.memory_usage(deep=True).sum())
+
+    def window(self, start=None, end=None):
+        """Rollup rows with start <= day <= end (both optional, inclusive)"""
+        start, end = _to_day(start), _to_day(end)
+        lo = 0 if start is None else np.searchsorted(self._days, start.to_datetime64(), side='left')
+        hi = len(self._days) if end is None else np.searchsorted(self._days, end.to_datetime64(), side='right')
+        return self.daily.iloc[lo:hi]
+
+    def range_totals(self, start=None, end=None):
+        """Revenue, purchases and active customers in a date range, overall and by category"""
+        rows = self.window(start, end)
+        by_category = rows.groupby('category', observed=True).agg(purchases=('purchases', 'sum'),
+                                                                  revenue=('revenue', 'sum'))
+        return {
+            'start': start,
+            'end': end,
+            'purchases': int(rows['purchases'].sum()),
+            'revenue': float(rows['revenue'].sum()),
+            'customers': int(rows['customer_id'].nunique()),
+            'by_category': by_category
+        }
+
+    def rolling_revenue(self, windows=(30, 90)):
+        """Daily revenue with trailing rolling sums over each window (days)"""
+        revenue = self.daily_revenue
+        frame = pd.DataFrame({'revenue': revenue})
+        for days in windows:
+            frame[f'revenue_{days}d'] = revenue.rolling(days, min_periods=1).sum()
+        return frame
+
+    def rfm_as_of(self, as_of=None):
+        """Recency/Frequency/Monetary using only purchases up to as_of (inclusive)
+
+        Recency is counted from the day after as_of, like
+        compute_customer_metrics does for the last purchase date.
+        """
+        as_of = self.last_day if as_of is None else _to_day(as_of)
+        rows = self.window(end=as_of)
+        rfm = rows.groupby('customer_id').agg(last_purchase=('day', 'max'), Frequency=('purchases', 'sum'),
+                                               Monetary=('revenue', 'sum'))
+        rfm['Recency'] = (as_of + pd.Timedelta(days=1) - rfm['last_purchase']).dt.days
+        return rfm[['Recency', 'Frequency', 'Monetary', 'last_purchase']]
+
+    def cohort_matrix(self, period='M', start=None, end=None):
+        """Active customers per acquisition cohort and periods since acquisition
+
+        Returns (sizes, retention): cohort sizes and the share of each cohort
+        active n periods later. Periods not yet observable are NaN. start/end
+        restrict the cohorts by acquisition date.
+        """
+        if period not in PERIODS:
+            raise ValueError(f"Unknown period '{period}'. Choose from {sorted(PERIODS)}.")
+        freq = PERIODS[period]
+        acquired = self.customers['first_purchase'].dt.normalize()
+        cohort_of = pd.Series(pd.PeriodIndex(acquired, freq=freq).asi8, index=self.customers.index)
+        activity = pd.DataFrame({
+            'customer_id': self.daily['customer_id'].to_numpy(),
+            'period': pd.PeriodIndex(self.daily['day'], freq=freq).asi8
+        }).drop_duplicates()
+        activity['cohort'] = cohort_of.reindex(activity['customer_id']).to_numpy()
+        activity['offset'] = activity['period'] - activity['cohort']
+
+        counts = activity.groupby(['cohort', 'offset']).size().unstack(fill_value=0).sort_index()
+        last_period = pd.Period(self.last_day, freq=freq).ordinal
+        observable = last_period - counts.index.to_numpy()
+        counts = counts.astype(float).mask(counts.columns.to_numpy()[None, :] > observable[:, None])
+
+        labels = pd.PeriodIndex.from_ordinals(counts.index, freq=freq)
+        counts.index = labels
+        counts.columns.name = 'periods_since_acquisition'
+        if start is not None:
+            counts = counts[labels.end_time >= _to_day(start)]
+        if end is not None:
+            counts = counts[counts.index.start_time <= _to_day(end)]
+        sizes = counts[0].astype(int).rename('customers')
+        return sizes, counts.div(counts[0], axis=0)
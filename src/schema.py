@@ -0,0 +1,108 @@
+"""
+Compact dtypes for the transaction and customer tables
+Each schema maps a column to a target type: 'category', 'datetime',
+'integer' (smallest signed integer that holds the values), 'float'
+(float32 when lossless) or a fixed numpy integer dtype, used as is when
+the values fit. Conversions never lose information.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Tipos fixos para colunas de transacao: chunks e leitura completa coincidem
+TRANSACTION_SCHEMA = {
+    'age': 'int8',
+    'gender': 'category',
+    'category': 'category',
+    'country': 'category',
+    'city': 'category',
+    'purchase_date': 'datetime',
+    'last_login': 'datetime',
+    'signup_date': 'datetime',
+    'is_churned': 'int8'
+}
+
+# Tabela por cliente (metricas + segmento): tipos escolhidos pelos valores
+CUSTOMER_SCHEMA = {
+    'Recency': 'integer',
+    'Frequency': 'integer',
+    'num_purchases': 'integer',
+    'segment_rfm': 'integer',
+    'age': 'int8',
+    'is_churned': 'int8',
+    'gender': 'category',
+    'country': 'category',
+    'city': 'category',
+    'first_purchase': 'datetime',
+    'last_purchase': 'datetime',
+    'Monetary': 'float',
+    'total_spent': 'float',
+    'avg_purchase_amount': 'float',
+    'customer_lifetime_value': 'float'
+}
+
+
+def memory_bytes(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+def _smallest_integer(series):
+    if not pd.api.types.is_integer_dtype(series.dtype):
+        return series
+    return pd.to_numeric(series, downcast='integer')
+
+
+def _fixed_integer(series, dtype):
+    if not pd.api.types.is_integer_dtype(series.dtype) or series.empty:
+        return _smallest_integer(series)
+    info = np.iinfo(dtype)
+    if series.min() >= info.min and series.max() <= info.max:
+        return series.astype(dtype)
+    return _smallest_integer(series)
+
+
+def _lossless_float32(series):
+    if series.dtype != np.float64:
+        return series
+    values = series.to_numpy()
+    narrowed = values.astype(np.float32)
+    # So reduz a precisao se todo valor volta identico (NaN incluido)
+    if np.array_equal(narrowed.astype(np.float64), values, equal_nan=True):
+        return pd.Series(narrowed, index=series.index, name=series.name)
+    return series
+
+
+def _convert(series, kind):
+    if kind == 'category':
+        return series if isinstance(series.dtype, pd.CategoricalDtype) else series.astype('category')
+    if kind == 'datetime':
+        return series if pd.api.types.is_datetime64_any_dtype(series) else pd.to_datetime(series)
+    if kind == 'integer':
+        return _smallest_integer(series)
+    if kind == 'float':
+        return _lossless_float32(series)
+    return _fixed_integer(series, np.dtype(kind))
+
+
+def apply_schema(df, schema):
+    """Copy of df with each column in schema converted to its compact type
+
+    Columns not in schema, or missing from df, are left untouched.
+    """
+    df = df.copy(deep=False)
+    for col, kind in schema.items():
+        if col in df.columns:
+            df[col] = _convert(df[col], kind)
+    return df
+
+
+def compact_frame(df, schema):
+    """apply_schema plus a before/after memory report"""
+    before = memory_bytes(df)
+    compacted = apply_schema(df, schema)
+    after = memory_bytes(compacted)
+    return compacted, {
+        'before_bytes': before,
+        'after_bytes': after,
+        'reduction': round(before / after, 2) if after else None
+    }
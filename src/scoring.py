@@ -0,0 +1,123 @@
+"""
+Low-latency churn scoring for the REST API
+Concurrent requests are coalesced into microbatches by a background worker
+so the model is invoked once per batch instead of once per request
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class LatencyTracker:
+    """Rolling latency samples per model version with percentile summaries"""
+
+    def __init__(self, window=10000):
+        self.window = window
+        self._samples = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def record(self, version, seconds):
+        with self._lock:
+            self._samples.setdefault(version, deque(maxlen=self.window)).append(seconds)
+            self._counts[version] = self._counts.get(version, 0) + 1
+
+    def summary(self):
+        with self._lock:
+            samples = {version: np.array(values) for version, values in self._samples.items()}
+            counts = dict(self._counts)
+        return {
+            version: {
+                'requests': counts[version],
+                'p50_ms': float(np.percentile(values, 50) * 1000),
+                'p99_ms': float(np.percentile(values, 99) * 1000)
+            }
+            for version, values in samples.items()
+        }
+
+
+class MicroBatcher:
+    """Coalesce scoring requests into batches of up to max_batch_rows rows
+
+    A request waits at most max_wait_ms for others to join its batch.
+    """
+
+    def __init__(self, score_fn, max_batch_rows=1024, max_wait_ms=2.0):
+        self.score_fn = score_fn
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name='churn-microbatcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, rows):
+        """Queue a 2D feature array; returns a Future with its scores"""
+        future = Future()
+        self._queue.put((np.asarray(rows, dtype=np.float64), future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            size = len(batch[0][0])
+            deadline = time.perf_counter() + self.max_wait
+            while size < self.max_batch_rows:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                size += len(item[0])
+            self._score(batch)
+
+    def _score(self, batch):
+        try:
+            scores = self.score_fn(np.vstack([rows for rows, _ in batch]))
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        offset = 0
+        for rows, future in batch:
+            future.set_result(scores[offset:offset + len(rows)])
+            offset += len(rows)
+
+
+class ChurnScorer:
+    """Serve churn probabilities from persisted model artifacts"""
+
+    def __init__(self, artifacts, max_batch_rows=1024, max_wait_ms=2.0, timeout=30.0):
+        self.artifacts = artifacts
+        self.timeout = timeout
+        self.latency = LatencyTracker()
+        self.batcher = MicroBatcher(artifacts.churn_probability, max_batch_rows, max_wait_ms)
+
+    @property
+    def version(self):
+        return self.artifacts.version
+
+    @property
+    def feature_columns(self):
+        return self.artifacts.feature_columns
+
+    def to_matrix(self, records):
+        """Feature matrix from a list of dicts; raises KeyError on a missing feature"""
+        return np.array([[float(record[col]) for col in self.feature_columns] for record in records])
+
+    def score(self, records):
+        start = time.perf_counter()
+        features = self.to_matrix(records)
+        # Lotes grandes sao divididos para nao monopolizar o worker
+        futures = [self.batcher.submit(features[i:i + self.batcher.max_batch_rows])
+                   for i in range(0, len(features), self.batcher.max_batch_rows)]
+        scores = np.concatenate([future.result(timeout=self.timeout) for future in futures]) if futures else np.empty(0)
+        self.latency.record(self.version, time.perf_counter() - start)
+        return scores
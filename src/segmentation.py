@@ -0,0 +1,139 @@
+"""
+Scalable customer segmentation engines
+Exact KMeans, MiniBatchKMeans, or KMeans fitted on a stratified sample,
+followed by chunked vectorized assignment of every customer
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+ENGINES = ('kmeans', 'minibatch', 'sampled')
+
+
+def stratified_sample(X, sample_size, random_state=42, bins=4):
+    """Row indices of a sample stratified by per-feature quantile bins"""
+    n = len(X)
+    if sample_size >= n:
+        return np.arange(n)
+    # Cada estrato combina o quantil de cada coluna (bins ** n_features estratos)
+    strata = np.zeros(n, dtype=np.int64)
+    for col in range(X.shape[1]):
+        codes = pd.qcut(X[:, col], q=bins, labels=False, duplicates='drop')
+        strata = strata * bins + np.nan_to_num(codes, nan=0).astype(np.int64)
+    sample = pd.Series(np.arange(n)).groupby(strata).sample(frac=sample_size / n, random_state=random_state)
+    return np.sort(sample.to_numpy())
+
+
+def assign_clusters(X, centers, chunk_size=1_000_000):
+    """Nearest-centroid labels, computed in chunks to bound memory"""
+    labels = np.empty(len(X), dtype=np.int32)
+    centers_sq = (centers ** 2).sum(axis=1)
+    for start in range(0, len(X), chunk_size):
+        chunk = X[start:start + chunk_size]
+        # ||x - c||^2 sem o termo ||x||^2, que nao altera o argmin
+        distances = centers_sq - 2 * chunk @ centers.T
+        labels[start:start + chunk_size] = distances.argmin(axis=1)
+    return labels
+
+
+def inertia(X, labels, centers, chunk_size=1_000_000):
+    """Sum of squared distances of each point to its assigned center"""
+    total = 0.0
+    for start in range(0, len(X), chunk_size):
+        diff = X[start:start + chunk_size] - centers[labels[start:start + chunk_size]]
+        total += float((diff ** 2).sum())
+    return total
+
+
+class SegmentationEngine:
+    """Fit cluster centers with the selected engine and assign all customers
+
+    engine='kmeans' reproduces the original full KMeans fit. 'minibatch'
+    fits MiniBatchKMeans over the whole data; 'sampled' fits KMeans on a
+    stratified sample of sample_size rows. Both then assign every row to
+    the nearest center in chunks of chunk_size rows.
+    """
+
+    def __init__(self, engine='kmeans', n_clusters=4, init='k-means++', n_init=10,
+                 sample_size=100_000, batch_size=10_000, chunk_size=1_000_000, random_state=42):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown segmentation engine '{engine}'. Choose one of {ENGINES}.")
+        self.engine = engine
+        self.n_clusters = n_clusters
+        self.init = init
+        self.n_init = n_init
+        self.sample_size = sample_size
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.random_state = random_state
+        self.model = None
+        self.fit_seconds = None
+
+    @property
+    def cluster_centers_(self):
+        return self.model.cluster_centers_
+
+    def _kmeans(self):
+        from sklearn.cluster import KMeans
+
+        return KMeans(n_clusters=self.n_clusters, init=self.init, n_init=self.n_init, random_state=self.random_state)
+
+    def fit(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        start = time.perf_counter()
+        if self.engine == 'kmeans':
+            self.model = self._kmeans().fit(X)
+        elif self.engine == 'minibatch':
+            from sklearn.cluster import MiniBatchKMeans
+
+            self.model = MiniBatchKMeans(n_clusters=self.n_clusters, init=self.init, batch_size=self.batch_size,
+                                         n_init=min(self.n_init, 3), random_state=self.random_state).fit(X)
+        else:
+            sample = stratified_sample(X, self.sample_size, self.random_state)
+            self.model = self._kmeans().fit(X[sample])
+        self.fit_seconds = time.perf_counter() - start
+        return self
+
+    def predict(self, X):
+        return assign_clusters(np.asarray(X, dtype=np.float64), self.cluster_centers_, self.chunk_size)
+
+    def fit_predict(self, X):
+        self.fit(X)
+        if self.engine == 'kmeans':
+            # Mantem exatamente os rotulos do ajuste completo
+            return self.model.labels_
+        return self.predict(X)
+
+    def quality_report(self, X, silhouette_sample=10_000):
+        """Compare this engine's clustering against an exact full KMeans fit"""
+        from sklearn.metrics import silhouette_score
+
+        X = np.asarray(X, dtype=np.float64)
+        labels = self.predict(X)
+
+        start = time.perf_counter()
+        exact = self._kmeans().fit(X)
+        exact_seconds = time.perf_counter() - start
+
+        rng = np.random.default_rng(self.random_state)
+        sample = rng.choice(len(X), size=min(silhouette_sample, len(X)), replace=False)
+
+        def silhouette(lbls):
+            return float(silhouette_score(X[sample], lbls[sample])) if len(np.unique(lbls[sample])) > 1 else None
+
+        approx_inertia = inertia(X, labels, self.cluster_centers_, self.chunk_size)
+        return {
+            'engine': self.engine,
+            'n_clusters': self.n_clusters,
+            'fit_seconds': self.fit_seconds,
+            'exact_fit_seconds': exact_seconds,
+            'speedup': exact_seconds / self.fit_seconds if self.fit_seconds else None,
+            'inertia': approx_inertia,
+            'exact_inertia': float(exact.inertia_),
+            'inertia_ratio': approx_inertia / exact.inertia_ if exact.inertia_ else None,
+            'silhouette': silhouette(labels),
+            'exact_silhouette': silhouette(exact.labels_),
+            'silhouette_sample_size': len(sample)
+        }
@@ -4,28 +4,110 @@ Flask REST API Server for Customer Behavior Analytics
 Provides minimal RESTful endpoints for customer data analysis
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request, stream_with_context
 from flask_cors import CORS
+import numpy as np
 import pandas as pd
 import os
+import time
 from datetime import datetime
 
+from .aggregate_cache import AggregateCache, CachedResponse
+from .customer_analytics import CustomerBehaviorAnalytics
+from .data_store import DatasetSnapshot, DatasetStore
+from .instrumentation import registry
+from .jobs import JobManager
+from .model_store import load_artifacts
+from .rollups import PERIODS, weighted_median
+from .schema import TRANSACTION_SCHEMA
+from .scoring import ChurnScorer
+from .storage import iter_pinned_chunks, open_pinned
+
 app = Flask(__name__)
 CORS(app)  # Enable Cross-Origin Resource Sharing
 
 # Configuration
-DATA_FILE = 'data/customer_data.csv'
+# CSV, Parquet (.parquet) or Arrow IPC (.feather/.arrow)
+DATA_FILE = os.environ.get('CUSTOMER_DATA_FILE', 'data/customer_data.csv')
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 10000
+EXPORT_CHUNK_ROWS = 50000
+MODEL_DIR = os.environ.get('MODEL_DIR', 'models')
+MODEL_VERSION = os.environ.get('MODEL_VERSION', 'latest')
+PREDICT_MAX_BATCH = 10000
+ANALYSIS_OUTPUT_DIR = os.environ.get('ANALYSIS_OUTPUT_DIR', 'reports')
+# Shared across request threads; a changed file is reloaded by a background job
+store = DatasetStore(DATA_FILE, schema=TRANSACTION_SCHEMA)
 
-def load_customer_data():
-    """Load customer data from CSV file"""
+# Serialized /api/analytics/* responses, keyed by dataset version
+aggregate_cache = AggregateCache(max_entries=int(os.environ.get('AGGREGATE_CACHE_SIZE', 64)))
+
+# Analysis runs and precomputation execute here, never on a request thread
+jobs = JobManager(max_workers=int(os.environ.get('JOB_WORKERS', 2)))
+
+def load_churn_scorer(model_dir=MODEL_DIR, version=MODEL_VERSION):
+    """Load persisted model artifacts once; None if no model was saved"""
     try:
-        if os.path.exists(DATA_FILE):
-            return pd.read_csv(DATA_FILE)
-        else:
-            return pd.DataFrame()  # Return empty DataFrame if file doesn't exist
+        return ChurnScorer(load_artifacts(model_dir, version))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Error loading model artifacts: {e}")
+        return None
+
+# Loaded at startup; scoring never retrains
+churn_scorer = load_churn_scorer()
+
+def load_snapshot():
+    """Return the current dataset snapshot (empty if unavailable)
+
+    Once a version is loaded, readers never wait for a reload: a changed
+    file is loaded and its analytics precomputed by a background refresh
+    job, and the previous snapshot is served until the new one is ready.
+    """
+    try:
+        snapshot = store.current
+        if snapshot.empty:
+            # Nothing to serve yet, so the first load happens here
+            return store.get()
+        if store.changed():
+            jobs.submit('refresh', refresh_dataset)
+        return snapshot
     except Exception as e:
         print(f"Error loading data: {e}")
-        return pd.DataFrame()
+        return DatasetSnapshot(pd.DataFrame())
+
+def load_customer_data():
+    """Return the cached customer DataFrame (empty if unavailable)"""
+    return load_snapshot().data
+
+def stringify_dates(df):
+    """Copy of df with parsed date columns rendered back as strings"""
+    df = df.copy()
+    for col in df.select_dtypes(include='datetime').columns:
+        df[col] = df[col].astype(str).where(df[col].notna(), None)
+    return df
+
+def frame_to_records(df):
+    """Convert rows to JSON-ready dicts"""
+    return stringify_dates(df).to_dict('records')
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """Per-endpoint latency histogram and request counter"""
+    start = g.pop('request_start', None)
+    if start is not None:
+        # Streamed bodies are timed until the response starts, not until it ends
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        registry.observe('http_request_duration_seconds', time.perf_counter() - start,
+                         'API request latency in seconds', endpoint=endpoint, method=request.method)
+        registry.inc('http_requests_total', 1, 'API requests by status',
+                     endpoint=endpoint, method=request.method, status=response.status_code)
+    return response
 
 @app.route('/')
 def home():
@@ -34,135 +116,563 @@ def home():
         'message': 'Customer Behavior Analytics API',
         'version': '1.0',
         'endpoints': {
-            '/api/customers': 'GET - List all customers',
+            '/api/customers': 'GET - List customers (limit/cursor pagination, format=ndjson export)',
             '/api/customers/<id>': 'GET - Get specific customer',
-            '/api/analytics/summary': 'GET - Customer analytics summary',
-            '/api/analytics/demographics': 'GET - Demographics analysis',
-            '/api/analytics/purchases': 'GET - Purchase behavior analysis'
+            '/api/analytics/summary': 'GET - Customer analytics summary (?from=&to= for a date range)',
+            '/api/analytics/demographics': 'GET - Demographics analysis (?from=&to=)',
+            '/api/analytics/purchases': 'GET - Purchase behavior analysis (?from=&to=)',
+            '/api/analytics/cohorts': 'GET - Cohort retention (?period=month|week, ?from=&to=)',
+            '/api/predict/churn': 'POST - Churn probability for features or instances',
+            '/api/predict/stats': 'GET - Scoring latency (p50/p99) per model version',
+            '/api/jobs': 'POST - Start a background analysis run or precomputation; GET - List jobs',
+            '/api/jobs/<id>': 'GET - Job status (/result for its output)',
+            '/api/analysis/latest': 'GET - Latest completed analysis results',
+            '/metrics': 'GET - Prometheus metrics'
         }
     })
 
 @app.route('/api/customers', methods=['GET'])
 def get_customers():
-    """Get all customers with optional filtering"""
+    """List customers with optional filtering, cursor pagination and NDJSON export"""
     try:
-        df = load_customer_data()
-        if df.empty:
+        snapshot = load_snapshot()
+        if snapshot.empty:
             return jsonify({'error': 'No customer data available'}), 404
-        
+        df = snapshot.data
+
         # Optional filtering by query parameters
-        country = request.args.get('country')
-        category = request.args.get('category')
-        
-        if country:
-            df = df[df['country'].str.lower() == country.lower()]
-        if category:
-            df = df[df['category'].str.lower() == category.lower()]
-        
+        filters = {
+            'country': request.args.get('country'),
+            'category': request.args.get('category')
+        }
+
+        if request.args.get('format') == 'ndjson':
+            return Response(stream_with_context(stream_ndjson(export_chunks(snapshot, filters))),
+                            mimetype='application/x-ndjson')
+
+        # Pages are answered from the prebuilt in-memory indexes
+        positions = snapshot.filter_positions(**filters)
+        if positions is None:
+            positions = np.arange(len(df))
+
+        try:
+            limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+            cursor = int(request.args.get('cursor', 0))
+        except ValueError:
+            return jsonify({'error': 'limit and cursor must be integers'}), 400
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            return jsonify({'error': f'limit must be between 1 and {MAX_PAGE_SIZE}'}), 400
+
+        # The cursor is the row position where the next page starts
+        start = int(np.searchsorted(positions, cursor))
+        page = positions[start:start + limit]
+        end = start + limit
         return jsonify({
-            'customers': df.to_dict('records'),
-            'total_count': len(df)
+            'customers': frame_to_records(df.iloc[page]),
+            'total_count': len(positions),
+            'limit': limit,
+            'next_cursor': str(positions[end]) if end < len(positions) else None
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def export_chunks(snapshot, filters):
+    """Chunks of the snapshot's rows matching filters, for the NDJSON export
+
+    Columnar files are streamed from disk with the filters pushed down, but
+    only when the mapped file is still the version the snapshot was loaded
+    from; otherwise the rows come from the snapshot in memory, so one export
+    never mixes two versions of the file.
+    """
+    if store.format != 'csv':
+        try:
+            fragment, signature = open_pinned(store.path)
+        except (OSError, ImportError):
+            signature = None
+        if signature is not None and signature == snapshot.signature:
+            return iter_pinned_chunks(fragment, filters=filters, chunksize=EXPORT_CHUNK_ROWS)
+    return iter_row_chunks(snapshot.data, snapshot.filter_positions(**filters))
+
+def iter_row_chunks(df, positions):
+    """Yield the selected rows of an in-memory frame in bounded chunks"""
+    if positions is None:
+        for start in range(0, len(df), EXPORT_CHUNK_ROWS):
+            yield df.iloc[start:start + EXPORT_CHUNK_ROWS]
+    else:
+        for start in range(0, len(positions), EXPORT_CHUNK_ROWS):
+            yield df.iloc[positions[start:start + EXPORT_CHUNK_ROWS]]
+
+def stream_ndjson(chunks):
+    """Yield DataFrame chunks as NDJSON text"""
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        text = stringify_dates(chunk).to_json(orient='records', lines=True)
+        yield text if text.endswith('\n') else text + '\n'
+
 @app.route('/api/customers/<int:customer_id>', methods=['GET'])
 def get_customer(customer_id):
     """Get specific customer by ID"""
     try:
-        df = load_customer_data()
-        if df.empty:
+        snapshot = load_snapshot()
+        if snapshot.empty:
             return jsonify({'error': 'No customer data available'}), 404
         
-        customer = df[df['customer_id'] == customer_id]
-        if customer.empty:
+        position = snapshot.customer_position(customer_id)
+        if position is None:
             return jsonify({'error': 'Customer not found'}), 404
         
-        return jsonify(customer.iloc[0].to_dict())
+        return jsonify(frame_to_records(snapshot.data.iloc[position:position + 1])[0])
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def compute_summary(df):
+    """Basic analytics summary of the transaction table"""
+    return {
+        'total_customers': len(df),
+        'total_revenue': float(df['purchase_amount'].sum()),
+        'average_purchase': float(df['purchase_amount'].mean()),
+        'countries': df['country'].nunique(),
+        'categories': df['category'].nunique(),
+        'gender_distribution': df['gender'].value_counts().to_dict(),
+        'top_categories': df['category'].value_counts().head(5).to_dict(),
+        'top_countries': df['country'].value_counts().head(5).to_dict()
+    }
+
+def compute_demographics(df):
+    """Customer demographics breakdown"""
+    return {
+        'age_statistics': {
+            'average_age': float(df['age'].mean()),
+            'min_age': int(df['age'].min()),
+            'max_age': int(df['age'].max()),
+            'median_age': float(df['age'].median())
+        },
+        'gender_breakdown': df['gender'].value_counts().to_dict(),
+        'geographic_distribution': df.groupby('country', observed=True)['customer_id'].count().to_dict(),
+        'city_distribution': df.groupby('city', observed=True)['customer_id'].count().to_dict()
+    }
+
+def compute_purchases(df):
+    """Purchase behavior by category, gender and country"""
+    return {
+        'revenue_by_category': df.groupby('category', observed=True)['purchase_amount'].sum().to_dict(),
+        'purchases_by_category': df['category'].value_counts().to_dict(),
+        'average_by_category': df.groupby('category', observed=True)['purchase_amount'].mean().to_dict(),
+        'revenue_by_gender': df.groupby('gender', observed=True)['purchase_amount'].sum().to_dict(),
+        'revenue_by_country': df.groupby('country', observed=True)['purchase_amount'].sum().to_dict(),
+        'total_revenue': float(df['purchase_amount'].sum()),
+        'transaction_count': len(df)
+    }
+
+def cached_analytics(name, compute, params=None):
+    """Serve an aggregate computed once per dataset version, with ETag support
+
+    compute receives the dataset snapshot; params are part of the cache key.
+    """
+    snapshot = load_snapshot()
+    if snapshot.empty:
+        return jsonify({'error': 'No customer data available'}), 404
+
+    key = aggregate_cache.make_key(name, snapshot.fingerprint, params)
+    entry = aggregate_cache.get_or_compute(key, lambda: compute(snapshot), app.json.dumps)
+    return etag_response(entry)
+
+def etag_response(entry):
+    """Serve a CachedResponse, answering 304 when the client's ETag matches"""
+    if request.if_none_match.contains(entry.etag):
+        response = Response(status=304)
+    else:
+        response = Response(entry.body, mimetype='application/json')
+    response.set_etag(entry.etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def parse_date_window():
+    """(start, end) days from ?from=&to= (None when absent); raises ValueError"""
+    bounds = []
+    for arg in ('from', 'to'):
+        value = request.args.get(arg)
+        if value is None or value == '':
+            bounds.append(None)
+            continue
+        try:
+            bounds.append(pd.Timestamp(value).normalize())
+        except ValueError:
+            raise ValueError(f"'{arg}' must be a date (YYYY-MM-DD)")
+    start, end = bounds
+    if start is not None and end is not None and start > end:
+        raise ValueError("'from' must not be after 'to'")
+    return start, end
+
+def window_params(start, end):
+    return {'from': str(start.date()) if start is not None else None,
+            'to': str(end.date()) if end is not None else None}
+
+def window_counts(rows, column, value='purchases'):
+    """Sum of value per column label in descending order, like value_counts"""
+    totals = rows.groupby(column, observed=True)[value].sum()
+    return totals.sort_values(ascending=False, kind='stable')
+
+def compute_summary_window(rollups, start, end):
+    """compute_summary restricted to a date range, from the rollups"""
+    rows = rollups.window(start, end)
+    purchases = int(rows['purchases'].sum())
+    revenue = float(rows['revenue'].sum())
+    categories = window_counts(rows, 'category')
+    countries = window_counts(rows, 'country')
+    return {
+        'window': window_params(start, end),
+        'total_customers': purchases,  # transaction rows, as in compute_summary
+        'total_revenue': revenue,
+        'average_purchase': revenue / purchases if purchases else None,
+        'countries': len(countries),
+        'categories': len(categories),
+        'gender_distribution': window_counts(rows, 'gender').to_dict(),
+        'top_categories': categories.head(5).to_dict(),
+        'top_countries': countries.head(5).to_dict()
+    }
+
+def compute_demographics_window(rollups, start, end):
+    """compute_demographics restricted to a date range, from the rollups"""
+    rows = rollups.window(start, end)
+    ages, weights = rows['age'].to_numpy(dtype=np.float64, na_value=np.nan), rows['purchases'].to_numpy()
+    # Idades ausentes ficam fora, como no mean/median do historico completo
+    known = ~np.isnan(ages)
+    ages, weights = ages[known], weights[known]
+    age_statistics = None
+    if weights.sum():
+        age_statistics = {
+            'average_age': float((ages * weights).sum() / weights.sum()),
+            'min_age': int(ages.min()),
+            'max_age': int(ages.max()),
+            'median_age': weighted_median(ages, weights)
+        }
+    return {
+        'window': window_params(start, end),
+        'age_statistics': age_statistics,
+        'gender_breakdown': window_counts(rows, 'gender').to_dict(),
+        'geographic_distribution': rows.groupby('country', observed=True)['purchases'].sum().to_dict(),
+        'city_distribution': rows.groupby('city', observed=True)['purchases'].sum().to_dict()
+    }
+
+def compute_purchases_window(rollups, start, end):
+    """compute_purchases restricted to a date range, from the rollups"""
+    rows = rollups.window(start, end)
+    by_category = rows.groupby('category', observed=True)[['revenue', 'purchases']].sum()
+    return {
+        'window': window_params(start, end),
+        'revenue_by_category': by_category['revenue'].to_dict(),
+        'purchases_by_category': window_counts(rows, 'category').to_dict(),
+        'average_by_category': (by_category['revenue'] / by_category['purchases']).to_dict(),
+        'revenue_by_gender': rows.groupby('gender', observed=True)['revenue'].sum().to_dict(),
+        'revenue_by_country': rows.groupby('country', observed=True)['revenue'].sum().to_dict(),
+        'total_revenue': float(rows['revenue'].sum()),
+        'transaction_count': int(rows['purchases'].sum())
+    }
+
+def compute_cohorts(rollups, period, start, end):
+    """Cohort sizes and retention curves, from the rollups"""
+    sizes, retention = rollups.cohort_matrix(period, start, end)
+    return {
+        'period': period,
+        'window': window_params(start, end),
+        'cohorts': [
+            {
+                'cohort': str(cohort),
+                'customers': int(sizes[cohort]),
+                'retention': [round(float(v), 4) for v in retention.loc[cohort].dropna()]
+            }
+            for cohort in retention.index
+        ]
+    }
+
+def windowed_analytics(name, compute, compute_window):
+    """Whole-history aggregate, or one answered from the rollups when ?from=/?to= is set"""
+    try:
+        start, end = parse_date_window()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if start is None and end is None:
+        return cached_analytics(name, lambda snapshot: compute(snapshot.data))
+    return cached_analytics(name, lambda snapshot: compute_window(snapshot.rollups, start, end),
+                            params=window_params(start, end))
+
 @app.route('/api/analytics/summary', methods=['GET'])
 def analytics_summary():
-    """Provide basic analytics summary"""
+    """Provide basic analytics summary (optionally for ?from=&to=)"""
     try:
-        df = load_customer_data()
-        if df.empty:
-            return jsonify({'error': 'No customer data available'}), 404
-        
-        summary = {
-            'total_customers': len(df),
-            'total_revenue': float(df['purchase_amount'].sum()),
-            'average_purchase': float(df['purchase_amount'].mean()),
-            'countries': df['country'].nunique(),
-            'categories': df['category'].nunique(),
-            'gender_distribution': df['gender'].value_counts().to_dict(),
-            'top_categories': df['category'].value_counts().head(5).to_dict(),
-            'top_countries': df['country'].value_counts().head(5).to_dict()
-        }
-        return jsonify(summary)
+        return windowed_analytics('summary', compute_summary, compute_summary_window)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/analytics/demographics', methods=['GET'])
 def demographics_analysis():
-    """Analyze customer demographics"""
+    """Analyze customer demographics (optionally for ?from=&to=)"""
     try:
-        df = load_customer_data()
-        if df.empty:
-            return jsonify({'error': 'No customer data available'}), 404
-        
-        demographics = {
-            'age_statistics': {
-                'average_age': float(df['age'].mean()),
-                'min_age': int(df['age'].min()),
-                'max_age': int(df['age'].max()),
-                'median_age': float(df['age'].median())
-            },
-            'gender_breakdown': df['gender'].value_counts().to_dict(),
-            'geographic_distribution': df.groupby('country')['customer_id'].count().to_dict(),
-            'city_distribution': df.groupby('city')['customer_id'].count().to_dict()
-        }
-        return jsonify(demographics)
+        return windowed_analytics('demographics', compute_demographics, compute_demographics_window)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/analytics/purchases', methods=['GET'])
 def purchase_analysis():
-    """Analyze purchase behavior"""
+    """Analyze purchase behavior (optionally for ?from=&to=)"""
     try:
-        df = load_customer_data()
-        if df.empty:
-            return jsonify({'error': 'No customer data available'}), 404
-        
-        purchase_data = {
-            'revenue_by_category': df.groupby('category')['purchase_amount'].sum().to_dict(),
-            'purchases_by_category': df['category'].value_counts().to_dict(),
-            'average_by_category': df.groupby('category')['purchase_amount'].mean().to_dict(),
-            'revenue_by_gender': df.groupby('gender')['purchase_amount'].sum().to_dict(),
-            'revenue_by_country': df.groupby('country')['purchase_amount'].sum().to_dict(),
-            'total_revenue': float(df['purchase_amount'].sum()),
-            'transaction_count': len(df)
-        }
-        return jsonify(purchase_data)
+        return windowed_analytics('purchases', compute_purchases, compute_purchases_window)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/analytics/cohorts', methods=['GET'])
+def cohort_analysis():
+    """Acquisition cohorts and their retention (?period=month|week, ?from=&to=)"""
+    period = request.args.get('period', 'month')
+    if period not in PERIODS:
+        return jsonify({'error': f"period must be one of {sorted(PERIODS)}"}), 400
+    try:
+        start, end = parse_date_window()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        period = PERIODS[period]
+        return cached_analytics('cohorts', lambda snapshot: compute_cohorts(snapshot.rollups, period, start, end),
+                                params={'period': period, **window_params(start, end)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+ANALYTICS = {
+    'summary': compute_summary,
+    'demographics': compute_demographics,
+    'purchases': compute_purchases
+}
+
+def precompute_analytics(snapshot=None):
+    """Compute every /api/analytics/* response for a dataset version (default: current)"""
+    if snapshot is None:
+        snapshot = store.get()
+    if snapshot.empty:
+        return {'fingerprint': None, 'endpoints': []}
+    for name, compute in ANALYTICS.items():
+        key = aggregate_cache.make_key(name, snapshot.fingerprint)
+        aggregate_cache.get_or_compute(key, lambda: compute(snapshot.data), app.json.dumps)
+    # Date-range and cohort queries are answered from these
+    snapshot.rollups
+    return {'fingerprint': snapshot.fingerprint, 'endpoints': list(ANALYTICS)}
+
+def refresh_dataset():
+    """Load the dataset file, precompute its analytics, then publish the snapshot"""
+    snapshot = store.load()
+    precompute_analytics(snapshot)
+    store.publish(snapshot)
+    return {'fingerprint': snapshot.fingerprint, 'rows': len(snapshot.data)}
+
+def analysis_summary(results):
+    """JSON-ready digest of run_complete_analysis results"""
+    insights = results['insights']
+    return {
+        'generated_at': datetime.now().isoformat(),
+        'total_customers': int(insights['total_customers']),
+        'total_revenue': float(insights['total_revenue']),
+        'average_clv': float(insights['average_clv']),
+        'churn_rate': float(insights['churn_rate']),
+        'segments': frame_to_records(insights['segment_summary'].reset_index()),
+        'segment_characteristics': frame_to_records(results['kmeans_analysis'].reset_index()),
+        'churn_feature_importance': {name: float(value) for name, value
+                                     in results['churn_model']['feature_importance'].items()},
+        'dashboard': results['dashboard'],
+        'stage_timings': {name: round(seconds, 6) for name, seconds in results['stage_timings'].items()},
+        'result_store': results.get('result_store', {})
+    }
+
+def run_analysis(max_workers=None):
+    """Full pipeline run on the served dataset; returns the serialized digest"""
+    # Sem o arquivo servido a analise cairia nos dados sinteticos: o job deve falhar
+    if not os.path.exists(store.path):
+        raise FileNotFoundError(f"Dataset not found: {store.path}")
+    analytics = CustomerBehaviorAnalytics(
+        data_path=store.path,
+        dashboard_path=os.path.join(ANALYSIS_OUTPUT_DIR, 'customer_behavior_dashboard.html')
+    )
+    results = analytics.run_complete_analysis(max_workers=max_workers)
+    return CachedResponse(app.json.dumps(analysis_summary(results)))
+
+JOB_TYPES = {
+    'analysis': run_analysis,
+    'precompute': precompute_analytics,
+    'refresh': refresh_dataset
+}
+
+def job_payload(job):
+    payload = job.to_dict()
+    payload['status_url'] = f'/api/jobs/{job.id}'
+    if job.status == 'succeeded':
+        payload['result_url'] = f'/api/jobs/{job.id}/result'
+    return payload
+
+@app.route('/api/jobs', methods=['POST'])
+def start_job():
+    """Start a background job; an identical queued or running job is reused"""
+    payload = request.get_json(silent=True) or {}
+    kind = payload.get('type', 'analysis')
+    if kind not in JOB_TYPES:
+        return jsonify({'error': f"Unknown job type '{kind}'", 'types': list(JOB_TYPES)}), 400
+    params = {}
+    if kind == 'analysis' and payload.get('max_workers') is not None:
+        try:
+            params['max_workers'] = int(payload['max_workers'])
+        except (TypeError, ValueError):
+            return jsonify({'error': 'max_workers must be an integer'}), 400
+    job, created = jobs.submit(kind, JOB_TYPES[kind], **params)
+    response = jsonify(job_payload(job))
+    response.status_code = 202 if created else 200
+    response.headers['Location'] = f'/api/jobs/{job.id}'
+    return response
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """Recent jobs, newest first"""
+    return jsonify({'jobs': [job_payload(job) for job in jobs.list(request.args.get('type'))]})
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status of one job"""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job_payload(job))
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    """Output of a finished job (202 while it is still queued or running)"""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if job.status == 'failed':
+        return jsonify({'error': job.error, 'job': job_payload(job)}), 500
+    if job.status != 'succeeded':
+        return jsonify(job_payload(job)), 202
+    if isinstance(job.result, CachedResponse):
+        return etag_response(job.result)
+    return jsonify(job.result)
+
+@app.route('/api/analysis/latest', methods=['GET'])
+def latest_analysis():
+    """Most recent completed analysis run; never waits for a run in progress"""
+    job = jobs.latest('analysis')
+    if job is None:
+        running = jobs.list('analysis')
+        return jsonify({'error': 'No completed analysis run',
+                        'job': job_payload(running[0]) if running else None}), 404
+    response = etag_response(job.result)
+    response.headers['X-Analysis-Job'] = job.id
+    return response
+
+@app.route('/api/predict/churn', methods=['POST'])
+def predict_churn():
+    """Score churn probability for one feature vector or a batch"""
+    if churn_scorer is None:
+        return jsonify({'error': 'No churn model available'}), 503
+    payload = request.get_json(silent=True) or {}
+    single = 'features' in payload
+    records = [payload['features']] if single else payload.get('instances')
+    if not isinstance(records, list) or not records:
+        return jsonify({'error': "Provide 'features' (object) or 'instances' (list of objects)"}), 400
+    if len(records) > PREDICT_MAX_BATCH:
+        return jsonify({'error': f'At most {PREDICT_MAX_BATCH} instances per request'}), 400
+    try:
+        scores = churn_scorer.score(records)
+    except KeyError as e:
+        return jsonify({'error': f'Missing feature: {e.args[0]}',
+                        'feature_columns': churn_scorer.feature_columns}), 400
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid feature value: {e}'}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+    predictions = [{'churn_probability': float(p), 'churn_prediction': int(p >= 0.5)} for p in scores]
+    if single:
+        return jsonify({'model_version': churn_scorer.version, **predictions[0]})
+    return jsonify({'model_version': churn_scorer.version, 'predictions': predictions})
+
+@app.route('/api/predict/stats', methods=['GET'])
+def predict_stats():
+    """Scoring latency percentiles per model version"""
+    if churn_scorer is None:
+        return jsonify({'error': 'No churn model available'}), 503
+    return jsonify({
+        'model_version': churn_scorer.version,
+        'feature_columns': churn_scorer.feature_columns,
+        'latency': churn_scorer.latency.summary()
+    })
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus text exposition of API, cache, dataset and pipeline metrics"""
+    cache = aggregate_cache.stats()
+    dataset = store.stats()
+    extra = [
+        ('aggregate_cache_entries', 'Cached analytics responses', {}, cache['entries']),
+        ('dataset_rows', 'Rows in the cached dataset', {}, dataset['rows']),
+        ('dataset_memory_bytes', 'Memory used by the cached dataset', {}, dataset['memory_bytes']),
+        ('dataset_load_seconds', 'Duration of the last dataset load', {}, dataset['load_seconds'])
+    ]
+    counters = [
+        ('aggregate_cache_hits_total', 'Analytics cache hits since start', {}, cache['hits']),
+        ('aggregate_cache_misses_total', 'Analytics cache misses since start', {}, cache['misses']),
+        ('aggregate_cache_evictions_total', 'Analytics cache evictions since start', {}, cache['evictions']),
+        ('dataset_loads_total', 'Dataset loads since start', {}, dataset['loads'])
+    ]
+    for status, count in jobs.stats().items():
+        extra.append(('background_jobs', 'Tracked background jobs by status', {'status': status}, count))
+    if churn_scorer is not None:
+        for version, latency in churn_scorer.latency.summary().items():
+            extra.append(('churn_scoring_p50_seconds', 'Median churn scoring latency', {'version': version},
+                          latency['p50_ms'] / 1000))
+            extra.append(('churn_scoring_p99_seconds', 'p99 churn scoring latency', {'version': version},
+                          latency['p99_ms'] / 1000))
+    return Response(registry.render_prometheus(extra, counters), mimetype='text/plain; version=0.0.4')
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
-        'data_available': os.path.exists(DATA_FILE)
+        'data_available': os.path.exists(DATA_FILE),
+        'dataset': store.stats(),
+        'aggregate_cache': aggregate_cache.stats(),
+        'jobs': jobs.stats(),
+        'model_version': churn_scorer.version if churn_scorer else None
     })
 
+def serve(host='0.0.0.0', port=5000, threads=8, debug=False):
+    """Run the API on a multi-threaded WSGI server
+
+    Uses waitress when installed and Flask's threaded server otherwise.
+    Jobs live in this process, so run a single process with many threads
+    (e.g. gunicorn --workers 1 --threads 8 src.server:app).
+    """
+    if not debug:
+        try:
+            from waitress import serve as waitress_serve
+        except ImportError:
+            waitress_serve = None
+        if waitress_serve is not None:
+            waitress_serve(app, host=host, port=port, threads=threads)
+            return
+    app.run(host=host, port=port, debug=debug, threaded=True)
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
+    threads = int(os.environ.get('SERVER_THREADS', 8))
     
     print(f"Starting Flask server on port {port}")
     print(f"Debug mode: {debug}")
     print(f"Data file: {DATA_FILE}")
     
-    app.run(host='0.0.0.0', port=port, debug=debug)
+    # Load and warm the first version before accepting requests
+    try:
+        refresh_dataset()
+    except Exception as e:
+        print(f"Error loading data: {e}")
+    serve(port=port, threads=threads, debug=debug)
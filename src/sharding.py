@@ -0,0 +1,166 @@
+"""
+Hash-sharded, multi-process customer metrics
+Transactions are partitioned by a hash of customer_id into shard
+directories, so each customer's whole history lives in one shard. Worker
+processes read their own shard files and reduce them to per-customer
+aggregates; only those travel back to the parent, which derives RFM/CLV
+with a single global snapshot date. The result is identical to
+compute_customer_metrics on the full table.
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from .metrics_engine import REQUIRED_COLUMNS, aggregate_transactions, derive_metrics
+from .schema import TRANSACTION_SCHEMA, apply_schema
+from .storage import iter_chunks, read_table, write_chunks
+
+# Sem fork: o pool e criado a partir de threads do pipeline e do servidor, e um
+# filho bifurcado herdaria locks presos (pools, logging, BLAS)
+WORKER_START_METHOD = 'spawn'
+SHARD_PREFIX = 'shard-'
+PART_PREFIX = 'part-'
+
+
+def shard_of(customer_ids, num_shards):
+    """Shard number of each customer id, stable across runs and processes"""
+    hashes = pd.util.hash_array(np.asarray(customer_ids, dtype=np.int64))
+    return (hashes % np.uint64(num_shards)).astype(np.int64)
+
+
+def _default_extension():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return '.csv'
+    return '.parquet'
+
+
+def shard_paths(shard_dir):
+    """Shard directories under shard_dir, in shard order"""
+    if not os.path.isdir(shard_dir):
+        return []
+    return sorted(os.path.join(shard_dir, name) for name in os.listdir(shard_dir) if name.startswith(SHARD_PREFIX))
+
+
+def _part_files(shard):
+    return sorted(os.path.join(shard, name) for name in os.listdir(shard) if name.startswith(PART_PREFIX))
+
+
+def partition_transactions(path, shard_dir, num_shards, chunksize=1_000_000, columns=None, extension=None):
+    """Hash-partition a transaction file by customer_id into num_shards directories
+
+    Every input chunk adds at most one part file per shard (part-00000,
+    part-00001, ...), so rows keep their source order within a shard.
+    Shards already in shard_dir are replaced. Parquet shards (the default
+    when pyarrow is installed) keep the source dtypes exactly. Returns the
+    shard directories.
+    """
+    extension = extension or _default_extension()
+    for shard in shard_paths(shard_dir):
+        shutil.rmtree(shard)
+    shards = [os.path.join(shard_dir, f'{SHARD_PREFIX}{i:05d}') for i in range(num_shards)]
+    for shard in shards:
+        os.makedirs(shard)
+
+    for part, chunk in enumerate(iter_chunks(path, columns=columns, chunksize=chunksize)):
+        # Ordenacao estavel por shard: cada fatia preserva a ordem original
+        assignment = shard_of(chunk['customer_id'], num_shards)
+        order = np.argsort(assignment, kind='stable')
+        bounds = np.searchsorted(assignment[order], np.arange(num_shards + 1))
+        for shard, lo, hi in zip(shards, bounds[:-1], bounds[1:]):
+            if hi > lo:
+                write_chunks([chunk.iloc[order[lo:hi]]], os.path.join(shard, f'{PART_PREFIX}{part:05d}{extension}'))
+    return shards
+
+
+def shard_aggregates(shard, columns=REQUIRED_COLUMNS, schema=None):
+    """Per-customer aggregates of one shard directory (runs in a worker process)"""
+    parts = [read_table(path, columns=columns) for path in _part_files(shard)]
+    if not parts:
+        return None
+    data = pd.concat(parts, ignore_index=True)
+    if schema:
+        data = apply_schema(data, schema)
+    return aggregate_transactions(data)
+
+
+def merge_aggregates(frames):
+    """Concatenate per-shard aggregates (disjoint customers) in customer_id order"""
+    frames = [frame for frame in frames if frame is not None]
+    if not frames:
+        raise ValueError("No transactions in any shard.")
+    categories = {}
+    for frame in frames:
+        for col in frame.columns:
+            if isinstance(frame[col].dtype, pd.CategoricalDtype):
+                categories.setdefault(col, []).append(frame[col].cat.categories)
+    merged = pd.concat(frames).sort_index()
+    # Cada shard tem suas proprias categorias; usa a uniao ordenada, como a leitura completa
+    for col, indexes in categories.items():
+        union = indexes[0].append(indexes[1:]).unique().sort_values()
+        merged[col] = merged[col].astype(pd.CategoricalDtype(union))
+    return merged
+
+
+def sharded_metrics(shards, max_workers=None, schema=None, snapshot_date=None, columns=REQUIRED_COLUMNS):
+    """Per-customer metrics of sharded transactions, one worker process per shard
+
+    shards is a list of shard directories or a directory containing them.
+    max_workers=1 runs in-process; otherwise workers are spawned, never
+    forked, since callers run this from threads. The snapshot date (one day after the
+    last purchase in any shard) is computed after the merge, so Recency and
+    CLV match compute_customer_metrics on the full table.
+    """
+    if isinstance(shards, str):
+        shards = shard_paths(shards)
+    if not shards:
+        raise ValueError("No shards to read.")
+    worker = partial(shard_aggregates, columns=columns, schema=schema)
+    if max_workers == 1:
+        frames = list(map(worker, shards))
+    else:
+        context = multiprocessing.get_context(WORKER_START_METHOD)
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as pool:
+            frames = list(pool.map(worker, shards))
+    aggregates = merge_aggregates(frames)
+    if snapshot_date is None:
+        snapshot_date = aggregates['last_purchase'].max() + pd.Timedelta(days=1)
+    return derive_metrics(aggregates, snapshot_date)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Partition transactions by customer and compute sharded metrics")
+    commands = parser.add_subparsers(dest='command', required=True)
+    partition = commands.add_parser('partition', help='Hash-partition a transaction file by customer_id')
+    partition.add_argument('path')
+    partition.add_argument('shard_dir')
+    partition.add_argument('--shards', type=int, default=os.cpu_count())
+    partition.add_argument('--chunksize', type=int, default=1_000_000)
+    metrics = commands.add_parser('metrics', help='Compute per-customer metrics from a shard directory')
+    metrics.add_argument('shard_dir')
+    metrics.add_argument('--workers', type=int, default=None)
+    metrics.add_argument('--output', help='Write the metrics table (.csv, .parquet or .arrow)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == 'partition':
+        shards = partition_transactions(args.path, args.shard_dir, args.shards, args.chunksize, columns=REQUIRED_COLUMNS)
+        print(f"Partitioned {args.path} into {len(shards)} shards in {time.perf_counter() - start:.1f}s")
+        return
+    result = sharded_metrics(args.shard_dir, max_workers=args.workers, schema=TRANSACTION_SCHEMA)
+    print(f"Computed metrics for {len(result):,} customers in {time.perf_counter() - start:.1f}s")
+    if args.output:
+        write_chunks([result.reset_index()], args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,266 @@
+"""
+Storage backends for customer transaction data
+Reads CSV, Parquet and Arrow IPC (Feather) files with column projection
+and, for the columnar formats, filter pushdown into the reader.
+Parquet/Arrow support requires the optional pyarrow dependency.
+"""
+
+import argparse
+import os
+import time
+
+import pandas as pd
+
+# Colunas de baixa cardinalidade mantidas como categoricas
+CATEGORICAL_COLUMNS = ['country', 'category', 'gender', 'city']
+DATE_COLUMNS = ['purchase_date', 'last_login', 'signup_date']
+
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+ARROW_EXTENSIONS = ('.feather', '.arrow', '.ipc')
+
+
+def detect_format(path):
+    """Storage format inferred from the file extension: csv, parquet or arrow"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in PARQUET_EXTENSIONS:
+        return 'parquet'
+    if ext in ARROW_EXTENSIONS:
+        return 'arrow'
+    return 'csv'
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.dataset
+        import pyarrow.fs
+    except ImportError as e:
+        raise ImportError("Parquet/Arrow storage requires pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+
+def _fix_dtypes(df):
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    for col in DATE_COLUMNS:
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col])
+    return df
+
+
+def _filter_frame(df, filters):
+    for col, value in (filters or {}).items():
+        if value:
+            df = df[df[col].astype(str).str.lower() == value.lower()]
+    return df
+
+
+def _csv_options(path, columns):
+    header = pd.read_csv(path, nrows=0).columns
+    wanted = [col for col in header if columns is None or col in columns]
+    return {
+        'usecols': wanted if columns is not None else None,
+        'dtype': {col: 'category' for col in CATEGORICAL_COLUMNS if col in wanted},
+        'parse_dates': [col for col in DATE_COLUMNS if col in wanted]
+    }
+
+
+def _open_dataset(path, fmt):
+    pa = _import_pyarrow()
+    # Leitura mapeada em memoria evita copiar o arquivo para buffers do leitor;
+    # o DataFrame gerado por to_pandas continua sendo uma copia privada
+    filesystem = pa.fs.LocalFileSystem(use_mmap=True)
+    return pa.dataset.dataset(path, format='parquet' if fmt == 'parquet' else 'ipc', filesystem=filesystem)
+
+
+def _filter_expression(filters):
+    """Case-insensitive equality filters as a pyarrow dataset expression"""
+    pa = _import_pyarrow()
+    expression = None
+    for col, value in (filters or {}).items():
+        if not value:
+            continue
+        field = pa.dataset.field(col).cast(pa.string())
+        condition = pa.compute.utf8_lower(field) == value.lower()
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def _projection(dataset, columns):
+    if columns is None:
+        return None
+    return [col for col in dataset.schema.names if col in columns]
+
+
+def read_table(path, columns=None, filters=None):
+    """Read a data file into a DataFrame
+
+    columns restricts the columns read from disk; filters is a mapping of
+    column -> value matched case-insensitively. For Parquet/Arrow files the
+    filters are evaluated inside the reader, so non-matching rows are never
+    materialized.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    fmt = detect_format(path)
+    if fmt == 'csv':
+        df = pd.read_csv(path, **_csv_options(path, columns))
+        return _filter_frame(df, filters).reset_index(drop=True) if filters else df
+
+    dataset = _open_dataset(path, fmt)
+    table = dataset.to_table(columns=_projection(dataset, columns), filter=_filter_expression(filters))
+    # split_blocks evita consolidar colunas numericas (e copias extras)
+    return _fix_dtypes(table.to_pandas(split_blocks=True))
+
+
+def _scan_chunks(scanner):
+    for batch in scanner.to_batches():
+        if batch.num_rows:
+            yield _fix_dtypes(batch.to_pandas(split_blocks=True))
+
+
+def open_pinned(path):
+    """Memory-map a Parquet/Arrow file; returns (fragment, signature)
+
+    The fragment keeps reading the mapped file even if path is replaced
+    afterwards. signature is the (mtime_ns, size) of path taken after
+    mapping, so a mismatch with an expected version means the file changed.
+    """
+    pa = _import_pyarrow()
+    fmt = detect_format(path)
+    file_format = pa.dataset.ParquetFileFormat() if fmt == 'parquet' else pa.dataset.IpcFileFormat()
+    fragment = file_format.make_fragment(pa.memory_map(path))
+    stat = os.stat(path)
+    return fragment, (stat.st_mtime_ns, stat.st_size)
+
+
+def iter_pinned_chunks(fragment, columns=None, filters=None, chunksize=1_000_000):
+    """Yield a fragment from open_pinned as DataFrame chunks, filters pushed down"""
+    names = fragment.physical_schema.names
+    scanner = fragment.scanner(columns=None if columns is None else [col for col in names if col in columns],
+                               filter=_filter_expression(filters), batch_size=chunksize)
+    return _scan_chunks(scanner)
+
+
+def iter_chunks(path, columns=None, filters=None, chunksize=1_000_000):
+    """Yield the file as DataFrame chunks of at most chunksize rows"""
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    fmt = detect_format(path)
+    if fmt == 'csv':
+        for chunk in pd.read_csv(path, chunksize=chunksize, **_csv_options(path, columns)):
+            yield _filter_frame(chunk, filters)
+        return
+
+    dataset = _open_dataset(path, fmt)
+    scanner = dataset.scanner(columns=_projection(dataset, columns), filter=_filter_expression(filters),
+                              batch_size=chunksize)
+    yield from _scan_chunks(scanner)
+
+
+def _arrow_csv_table(pa, chunk):
+    table = pa.Table.from_pandas(chunk, preserve_index=False)
+    for col in DATE_COLUMNS:
+        if col in table.column_names:
+            # Datas sem horario saem como AAAA-MM-DD, como no to_csv do pandas
+            try:
+                table = table.set_column(table.column_names.index(col), col, table[col].cast(pa.date32()))
+            except pa.ArrowInvalid:
+                pass
+    return table
+
+
+def _write_csv_chunks(chunks, out_path):
+    try:
+        pa = _import_pyarrow()
+        import pyarrow.csv
+    except ImportError:
+        pa = None
+    rows = 0
+    if pa is None:
+        with open(out_path, 'w', newline='') as f:
+            for chunk in chunks:
+                chunk.to_csv(f, header=rows == 0, index=False)
+                rows += len(chunk)
+        return rows
+
+    # O escritor CSV do pyarrow e varias vezes mais rapido que o to_csv
+    writer = None
+    schema = None
+    try:
+        for chunk in chunks:
+            table = _arrow_csv_table(pa, chunk)
+            if writer is None:
+                schema = table.schema
+                writer = pa.csv.CSVWriter(out_path, schema, write_options=pa.csv.WriteOptions(quoting_style='needed'))
+            writer.write_table(table if table.schema.equals(schema) else table.cast(schema))
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def write_chunks(chunks, out_path):
+    """Write an iterable of DataFrame chunks to CSV, Parquet or Arrow IPC
+
+    The format follows out_path's extension; only one chunk is held in
+    memory at a time. Returns the row count.
+    """
+    fmt = detect_format(out_path)
+    if fmt == 'csv':
+        return _write_csv_chunks(chunks, out_path)
+
+    pa = _import_pyarrow()
+    import pyarrow.parquet as pq
+
+    writer = None
+    schema = None
+    rows = 0
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            if writer is None:
+                schema = table.schema
+                writer = pq.ParquetWriter(out_path, schema) if fmt == 'parquet' else pa.ipc.new_file(out_path, schema)
+            writer.write_table(table)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def convert_csv(csv_path, out_path, chunksize=1_000_000):
+    """Convert a customer CSV to Parquet or Arrow IPC in bounded memory
+
+    The output format follows out_path's extension. Returns the row count.
+    """
+    if detect_format(out_path) == 'csv':
+        raise ValueError(f"Output must be a Parquet or Arrow file: {out_path}")
+
+    # Categorias variam entre chunks; grava texto simples e o leitor
+    # recria as categoricas (o Parquet ja codifica por dicionario)
+    options = _csv_options(csv_path, None)
+    options.pop('dtype')
+    return write_chunks(pd.read_csv(csv_path, chunksize=chunksize, **options), out_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a customer CSV to Parquet or Arrow IPC")
+    parser.add_argument('csv_path')
+    parser.add_argument('out_path', help='Destination (.parquet, .feather or .arrow)')
+    parser.add_argument('--chunksize', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rows = convert_csv(args.csv_path, args.out_path, args.chunksize)
+    elapsed = time.perf_counter() - start
+    print(f"Converted {rows:,} rows to {args.out_path} in {elapsed:.1f}s "
+          f"({os.path.getsize(args.out_path) / 1e6:,.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
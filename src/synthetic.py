@@ -0,0 +1,214 @@
+"""
+Vectorized synthetic transaction generator for load testing
+Produces a multi-purchase history per customer with seasonality and churn
+behaviour, block by block from a local Generator, so arbitrarily large
+datasets (100M+ rows) can be streamed to CSV/Parquet/Arrow in bounded
+memory. The output is reproducible for a given seed and parameters.
+legacy_customer_metrics is the original per-customer metrics code, kept as
+the reference the vectorized engine is checked against.
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from .storage import write_chunks
+
+GENDERS = ['Male', 'Female']
+COUNTRIES = ['USA', 'Canada', 'UK', 'Germany']
+COUNTRY_WEIGHTS = [0.45, 0.2, 0.2, 0.15]
+CITIES_BY_COUNTRY = {
+    'USA': ['New York', 'Chicago', 'Los Angeles'],
+    'Canada': ['Toronto', 'Vancouver'],
+    'UK': ['London', 'Manchester'],
+    'Germany': ['Berlin', 'Munich']
+}
+CITIES = [city for country in COUNTRIES for city in CITIES_BY_COUNTRY[country]]
+CATEGORIES = ['Electronics', 'Clothing', 'Books', 'Food']
+# Ticket medio relativo de cada categoria
+CATEGORY_PRICE = np.array([2.5, 1.0, 0.4, 0.3])
+
+COLUMNS = ['customer_id', 'age', 'gender', 'purchase_amount', 'purchase_date', 'category', 'last_login',
+           'signup_date', 'country', 'city', 'is_churned', 'total_spent', 'customer_lifetime_value']
+
+
+def seasonal_weights(start_date, days):
+    """Relative purchase volume per day: yearly cycle, holiday peak and weekends"""
+    dates = pd.date_range(start_date, periods=days, freq='D')
+    day_of_year = dates.dayofyear.to_numpy()
+    weights = 1 + 0.2 * np.cos(2 * np.pi * (day_of_year - 355) / 365.25)
+    weights += np.where((dates.month == 11) & (dates.day >= 20) | (dates.month == 12) & (dates.day <= 24), 0.8, 0)
+    weights += np.where(dates.dayofweek >= 5, 0.25, 0)
+    return weights / weights.sum()
+
+
+def _customer_block(rng, first_id, num_customers, purchases_per_customer, churn_rate):
+    # Atributos por cliente; cada transacao os repete como num export real
+    country = rng.choice(len(COUNTRIES), num_customers, p=COUNTRY_WEIGHTS)
+    offsets = np.cumsum([0] + [len(CITIES_BY_COUNTRY[c]) for c in COUNTRIES])
+    sizes = np.diff(offsets)
+    city = offsets[country] + (rng.random(num_customers) * sizes[country]).astype(np.int64)
+    # Frequencia binomial negativa: poucos clientes compram muito
+    propensity = rng.gamma(2.0, 0.5, num_customers)
+    purchases = 1 + rng.poisson(max(purchases_per_customer - 1, 0) * propensity)
+    return {
+        'customer_id': np.arange(first_id, first_id + num_customers, dtype=np.int64),
+        'age': rng.integers(18, 70, num_customers).astype(np.int16),
+        'gender': rng.integers(0, len(GENDERS), num_customers),
+        'country': country,
+        'city': city,
+        'is_churned': (rng.random(num_customers) < churn_rate).astype(np.int8),
+        'spend_level': rng.lognormal(0.0, 0.5, num_customers),
+        'favourite_category': rng.integers(0, len(CATEGORIES), num_customers),
+        'purchases': purchases
+    }
+
+
+def _transactions_for(rng, customers, day_cdf, day_month, start_date):
+    num_customers = len(customers['customer_id'])
+    purchases = customers['purchases']
+    owner = np.repeat(np.arange(num_customers), purchases)
+    num_rows = len(owner)
+
+    days = len(day_cdf)
+    day = np.searchsorted(day_cdf, rng.random(num_rows), side='right').clip(max=days - 1)
+    # Clientes que abandonaram param de comprar antes do fim do periodo
+    active_days = np.where(customers['is_churned'] == 1, rng.uniform(0.3, 0.8, num_customers), 1.0)
+    day = (day * active_days[owner]).astype(np.int64)
+
+    # 60% das compras na categoria preferida do cliente
+    category = np.where(rng.random(num_rows) < 0.6, customers['favourite_category'][owner],
+                        rng.integers(0, len(CATEGORIES), num_rows))
+    holiday_uplift = np.where(day_month[day] >= 11, 1.15, 1.0)
+    amount = 40 * customers['spend_level'][owner] * CATEGORY_PRICE[category] * holiday_uplift
+    amount = np.round(amount * rng.lognormal(0.0, 0.35, num_rows), 2)
+
+    starts = np.concatenate(([0], np.cumsum(purchases)[:-1]))
+    total_spent = np.add.reduceat(amount, starts)
+    last_day = np.maximum.reduceat(day, starts)
+    login_day = np.minimum(last_day + rng.integers(0, 30, num_customers), days - 1)
+    signup_day = -rng.integers(1, 730, num_customers)
+
+    start = np.datetime64(pd.Timestamp(start_date).date(), 'D')
+    return pd.DataFrame({
+        'customer_id': customers['customer_id'][owner],
+        'age': customers['age'][owner],
+        'gender': pd.Categorical.from_codes(customers['gender'][owner], GENDERS),
+        'purchase_amount': amount,
+        'purchase_date': (start + day).astype('datetime64[ns]'),
+        'category': pd.Categorical.from_codes(category, CATEGORIES),
+        'last_login': (start + login_day[owner]).astype('datetime64[ns]'),
+        'signup_date': (start + signup_day[owner]).astype('datetime64[ns]'),
+        'country': pd.Categorical.from_codes(customers['country'][owner], COUNTRIES),
+        'city': pd.Categorical.from_codes(customers['city'][owner], CITIES),
+        'is_churned': customers['is_churned'][owner],
+        'total_spent': np.round(total_spent, 2)[owner],
+        'customer_lifetime_value': np.round(total_spent * rng.uniform(1, 5, num_customers), 2)[owner]
+    }, columns=COLUMNS)
+
+
+def iter_transactions(num_rows, purchases_per_customer=10, seed=42, start_date='2024-01-01', days=365,
+                      churn_rate=0.2, block_customers=100_000):
+    """Yield synthetic transactions as DataFrame chunks totalling num_rows rows
+
+    Customers are generated in blocks of block_customers, each from its own
+    Generator seeded by (seed, block), so memory is bounded by one block
+    (about block_customers * purchases_per_customer rows) and a given seed
+    always yields the same data.
+    """
+    day_cdf = np.cumsum(seasonal_weights(start_date, days))
+    day_month = pd.date_range(start_date, periods=days, freq='D').month.to_numpy()
+    remaining = num_rows
+    block = 0
+    while remaining > 0:
+        rng = np.random.default_rng([seed, block])
+        customers = _customer_block(rng, block * block_customers + 1, block_customers,
+                                    purchases_per_customer, churn_rate)
+        # Ultimo bloco: corta o historico para fechar exatamente num_rows
+        cumulative = np.cumsum(customers['purchases'])
+        if cumulative[-1] > remaining:
+            keep = int(np.searchsorted(cumulative, remaining)) + 1
+            customers = {name: values[:keep] for name, values in customers.items()}
+            customers['purchases'][-1] -= cumulative[keep - 1] - remaining
+        chunk = _transactions_for(rng, customers, day_cdf, day_month, start_date)
+        remaining -= len(chunk)
+        block += 1
+        yield chunk
+
+
+def generate_transactions(num_rows, purchases_per_customer=10, seed=42, **options):
+    """Synthetic transactions as a single in-memory DataFrame"""
+    chunks = list(iter_transactions(num_rows, purchases_per_customer, seed, **options))
+    return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=COLUMNS)
+
+
+def write_transactions(out_path, num_rows, purchases_per_customer=10, seed=42, on_progress=None, **options):
+    """Stream synthetic transactions to CSV, Parquet or Arrow; returns the row count"""
+    def chunks():
+        rows = 0
+        start = time.perf_counter()
+        for chunk in iter_transactions(num_rows, purchases_per_customer, seed, **options):
+            yield chunk
+            rows += len(chunk)
+            if on_progress is not None:
+                on_progress(rows, time.perf_counter() - start)
+
+    return write_chunks(chunks(), out_path)
+
+
+def legacy_customer_metrics(data):
+    """Original calculate_customer_metrics implementation (lambda + merge)"""
+    snapshot_date = data['purchase_date'].max() + pd.Timedelta(days=1)
+    rfm = data.groupby('customer_id').agg(
+        Recency=('purchase_date', lambda date: (snapshot_date - date.max()).days),
+        Frequency=('purchase_amount', 'count'),
+        Monetary=('purchase_amount', 'sum')
+    )
+    rfm['Recency'] = rfm['Recency'].astype(int)
+    rfm['Frequency'] = rfm['Frequency'].astype(int)
+    rfm['Monetary'] = rfm['Monetary'].astype(float)
+
+    customer_metrics = data.groupby('customer_id').agg(
+        total_spent=('purchase_amount', 'sum'),
+        avg_purchase_amount=('purchase_amount', 'mean'),
+        num_purchases=('purchase_amount', 'count'),
+        first_purchase=('purchase_date', 'min'),
+        last_purchase=('purchase_date', 'max'),
+        age=('age', 'first'),
+        gender=('gender', 'first'),
+        country=('country', 'first'),
+        city=('city', 'first'),
+        is_churned=('is_churned', 'first')
+    )
+    customer_metrics = customer_metrics.merge(rfm, on='customer_id', how='left')
+    customer_metrics['customer_lifetime_value'] = customer_metrics['total_spent'] * (365 / (snapshot_date - customer_metrics['first_purchase']).dt.days)
+    return customer_metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic customer transactions")
+    parser.add_argument('out_path', help='Destination (.csv, .parquet, .feather or .arrow)')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--purchases-per-customer', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--start-date', default='2024-01-01')
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--block-customers', type=int, default=100_000,
+                        help='Customers generated per chunk (bounds memory)')
+    args = parser.parse_args()
+
+    def report(rows, seconds):
+        print(f"   {rows:,} rows ({rows / max(seconds, 1e-9):,.0f} rows/s)")
+
+    start = time.perf_counter()
+    rows = write_transactions(args.out_path, args.rows, args.purchases_per_customer, args.seed, on_progress=report,
+                              start_date=args.start_date, days=args.days, block_customers=args.block_customers)
+    print(f"Wrote {rows:,} rows to {args.out_path} in {time.perf_counter() - start:.1f}s "
+          f"({os.path.getsize(args.out_path) / 1e6:,.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
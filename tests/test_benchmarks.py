@@ -0,0 +1,52 @@
+
+import copy
+import os
+import shutil
+import tempfile
+import unittest
+from benchmarks.bench_startup import check_budget, measure_startup
+from benchmarks.datasets import write_dataset
+from benchmarks.run_benchmarks import PIPELINE_STAGES, compare, flatten, run_suite
+
+class TestBenchmarkSuite(unittest.TestCase):
+
+    def test_suite_report_and_baseline_compare(self):
+        report = run_suite([2000], repeat=1, trace_memory=False, skip_pipeline=True)
+        entry = report['scales']['2000']
+        self.assertIn('analytics_summary', entry['api'])
+        self.assertIn('predict_churn_batch', entry['api'])
+        self.assertIn('analytics_cohorts', entry['api'])
+        self.assertIn('2000/api/customer_lookup/cold_seconds', flatten(report))
+        self.assertEqual(compare(report, report), [])
+
+        baseline = copy.deepcopy(report)
+        baseline['scales']['2000']['api']['customers_ndjson_export']['cold_seconds'] = 1e-3
+        current = copy.deepcopy(report)
+        current['scales']['2000']['api']['customers_ndjson_export']['cold_seconds'] = 1.0
+        regressions = compare(current, baseline)
+        self.assertEqual([r['metric'] for r in regressions], ['2000/api/customers_ndjson_export/cold_seconds'])
+
+    def test_pipeline_stages_are_timed(self):
+        report = run_suite([2000], repeat=1, trace_memory=True, skip_api=True)
+        pipeline = report['scales']['2000']['pipeline']
+        self.assertEqual(list(pipeline), [name for name, _ in PIPELINE_STAGES])
+        for stats in pipeline.values():
+            self.assertGreaterEqual(stats['seconds'], 0)
+            self.assertIn('peak_mb', stats)
+
+    def test_cold_start_skips_heavy_modules(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            data_path = os.path.join(tmpdir, 'transactions.csv')
+            write_dataset(data_path, 2000)
+            result = measure_startup(data_path, runs=1)
+        finally:
+            shutil.rmtree(tmpdir)
+        # sklearn/plotly/joblib so carregam nas etapas que os usam
+        self.assertEqual(result['heavy_modules'], [])
+        self.assertEqual(result['status'], 200)
+        self.assertEqual(check_budget(result, import_budget=60, request_budget=60), [])
+        self.assertEqual(len(check_budget(dict(result, import_seconds=2.0), 1.0, 60)), 1)
+
+if __name__ == '__main__':
+    unittest.main()
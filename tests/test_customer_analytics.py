@@ -1,15 +1,25 @@
 
+import os
+import shutil
+import tempfile
 import unittest
 import pandas as pd
 import numpy as np
 from src.customer_analytics import CustomerBehaviorAnalytics
+from src.synthetic import generate_transactions, legacy_customer_metrics
 
 class TestCustomerBehaviorAnalytics(unittest.TestCase):
 
     def setUp(self):
-        self.analytics = CustomerBehaviorAnalytics(data_path='non_existent_path.csv')
+        self.tmpdir = tempfile.mkdtemp()
+        self.dashboard_path = os.path.join(self.tmpdir, 'customer_behavior_dashboard.html')
+        self.analytics = CustomerBehaviorAnalytics(data_path='non_existent_path.csv',
+                                                   dashboard_path=self.dashboard_path)
         self.analytics.load_data() # Isso deve gerar dados sintéticos
 
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
     def test_load_data_synthetic(self):
         self.assertIsNotNone(self.analytics.data)
         self.assertGreater(len(self.analytics.data), 0)
@@ -23,6 +33,25 @@ class TestCustomerBehaviorAnalytics(unittest.TestCase):
         self.assertIn('Monetary', metrics.columns)
         self.assertIn('customer_lifetime_value', metrics.columns)
 
+    def test_customer_metrics_match_legacy(self):
+        self.analytics.data = generate_transactions(20000)
+        metrics = self.analytics.calculate_customer_metrics()
+        pd.testing.assert_frame_equal(metrics, legacy_customer_metrics(self.analytics.data), check_exact=True)
+
+    def test_streaming_metrics_match_in_memory(self):
+        data = generate_transactions(20000)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'transactions.csv')
+            data.to_csv(path, index=False)
+            streaming = CustomerBehaviorAnalytics(data_path=path, chunksize=3000)
+            streaming.load_data()
+            self.assertIsNone(streaming.data)
+            self.assertEqual(streaming.ingest_stats['rows'], 20000)
+            metrics = streaming.calculate_customer_metrics()
+            expected = CustomerBehaviorAnalytics(data_path=path)
+            expected.load_data()
+            pd.testing.assert_frame_equal(metrics, expected.calculate_customer_metrics())
+
     def test_perform_customer_segmentation(self):
         metrics = self.analytics.calculate_customer_metrics()
         segments = self.analytics.perform_customer_segmentation(metrics)
@@ -30,6 +59,30 @@ class TestCustomerBehaviorAnalytics(unittest.TestCase):
         self.assertIn('segment_rfm', segments.columns)
         self.assertGreater(segments['segment_rfm'].nunique(), 1)
 
+    def test_default_segmentation_matches_full_kmeans(self):
+        from sklearn.cluster import KMeans
+        from sklearn.preprocessing import StandardScaler
+        metrics = self.analytics.calculate_customer_metrics()
+        segments = self.analytics.perform_customer_segmentation(metrics)
+        rfm_scaled = StandardScaler().fit_transform(segments[['Recency', 'Frequency', 'Monetary']])
+        expected = KMeans(n_clusters=4, random_state=42, n_init=10).fit_predict(rfm_scaled)
+        np.testing.assert_array_equal(segments['segment_rfm'].to_numpy(), expected)
+
+    def test_scalable_segmentation_engines(self):
+        for engine in ('minibatch', 'sampled'):
+            analytics = CustomerBehaviorAnalytics(data_path='non_existent_path.csv', n_clusters=5,
+                                                  segmentation_engine=engine, segmentation_sample_size=300)
+            analytics.data = generate_transactions(20000)
+            segments = analytics.perform_customer_segmentation(analytics.calculate_customer_metrics())
+            self.assertEqual(segments['segment_rfm'].nunique(), 5)
+            report = analytics.segmentation_quality_report(silhouette_sample=500)
+            self.assertEqual(report['engine'], engine)
+            self.assertLess(report['inertia_ratio'], 1.5)
+            self.assertIsNotNone(report['silhouette'])
+        with self.assertRaises(ValueError):
+            CustomerBehaviorAnalytics(segmentation_engine='dbscan').perform_customer_segmentation(
+                self.analytics.calculate_customer_metrics())
+
     def test_analyze_segment_characteristics(self):
         metrics = self.analytics.calculate_customer_metrics()
         self.analytics.perform_customer_segmentation(metrics)
@@ -47,6 +100,15 @@ class TestCustomerBehaviorAnalytics(unittest.TestCase):
         # import os
         # self.assertTrue(os.path.exists(output_path))
 
+    def test_dashboard_output_path_and_mode(self):
+        dashboard_path = os.path.join(self.tmpdir, 'reports', 'dash.html')
+        analytics = CustomerBehaviorAnalytics(dashboard_path=dashboard_path, dashboard_mode='density')
+        analytics.data = generate_transactions(20000)
+        analytics.perform_customer_segmentation(analytics.calculate_customer_metrics())
+        output_path = analytics.create_visualizations()
+        self.assertEqual(output_path, dashboard_path)
+        self.assertTrue(os.path.exists(output_path))
+
     def test_predict_customer_churn(self):
         metrics = self.analytics.calculate_customer_metrics()
         self.analytics.perform_customer_segmentation(metrics)
@@ -71,6 +133,10 @@ class TestCustomerBehaviorAnalytics(unittest.TestCase):
         self.assertIn('churn_model', results)
         self.assertIn('insights', results)
         self.assertIn('dashboard', results)
+        self.assertEqual(set(results['stage_timings']), {
+            'load_data', 'customer_metrics', 'segmentation', 'segment_analysis',
+            'visualizations', 'churn_model', 'insights'
+        })
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,55 @@
+
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from src.dashboard import build_dashboard, density_bins, sample_per_segment, write_dashboard
+
+def make_segments(num_customers=20000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Recency': rng.integers(1, 365, num_customers),
+        'Frequency': rng.integers(1, 30, num_customers),
+        'Monetary': rng.gamma(2.0, 300.0, num_customers),
+        'segment_rfm': rng.choice(4, num_customers, p=[0.7, 0.2, 0.09, 0.01]),
+        'is_churned': rng.integers(0, 2, num_customers),
+        'total_spent': rng.gamma(2.0, 300.0, num_customers),
+        'customer_lifetime_value': rng.gamma(2.0, 900.0, num_customers)
+    })
+
+class TestDashboard(unittest.TestCase):
+
+    def setUp(self):
+        self.segments = make_segments()
+
+    def test_sample_is_capped_per_segment(self):
+        sample = sample_per_segment(self.segments, max_points=500)
+        counts = sample['segment_rfm'].value_counts()
+        self.assertTrue((counts <= 500).all())
+        # Segmentos pequenos entram inteiros
+        small = (self.segments['segment_rfm'] == 3).sum()
+        self.assertEqual(counts[3], min(small, 500))
+
+    def test_density_bins_preserve_customer_counts(self):
+        binned = density_bins(self.segments, bins=10)
+        self.assertEqual(binned['customers'].sum(), len(self.segments))
+        self.assertLessEqual(len(binned), 4 * 10 ** 3)
+        per_segment = binned.groupby('segment_rfm')['customers'].sum()
+        pd.testing.assert_series_equal(per_segment, self.segments['segment_rfm'].value_counts().sort_index(),
+                                       check_names=False)
+
+    def test_html_size_is_bounded(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            sizes = {}
+            for n in (100000, 400000):
+                path = os.path.join(tmpdir, 'out', f'dashboard_{n}.html')
+                write_dashboard(build_dashboard(make_segments(n), max_points_per_segment=1000), path)
+                sizes[n] = os.path.getsize(path)
+                with open(path) as f:
+                    self.assertIn('cdn.plot.ly', f.read())
+            self.assertLess(sizes[400000], sizes[100000] * 1.1)
+            self.assertLess(sizes[400000], 500_000)
+
+if __name__ == '__main__':
+    unittest.main()
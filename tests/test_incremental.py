@@ -0,0 +1,90 @@
+
+import os
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+from src.customer_analytics import CustomerBehaviorAnalytics
+from src.incremental import IncrementalAnalytics
+from src.metrics_engine import compute_customer_metrics
+from src.synthetic import generate_transactions
+
+class TestIncrementalAnalytics(unittest.TestCase):
+
+    def setUp(self):
+        self.state_dir = tempfile.mkdtemp()
+        data = generate_transactions(20000).sort_values('purchase_date', kind='stable').reset_index(drop=True)
+        self.full = data
+        self.history = data.iloc[:18000]
+        self.batch = data.iloc[18000:]
+
+    def tearDown(self):
+        shutil.rmtree(self.state_dir)
+
+    def test_batch_matches_full_recompute(self):
+        incremental = IncrementalAnalytics(self.state_dir, drift_threshold=10)
+        incremental.initialize(self.history)
+        before = incremental.segments.copy()
+
+        report = IncrementalAnalytics(self.state_dir, drift_threshold=10).load().apply_batch(self.batch)
+        self.assertEqual(report['customers_touched'], self.batch['customer_id'].nunique())
+        self.assertFalse(report['refit'])
+
+        reloaded = IncrementalAnalytics(self.state_dir).load()
+        metrics = reloaded.metrics()
+        expected = compute_customer_metrics(self.full)
+        pd.testing.assert_frame_equal(metrics.drop(columns='segment_rfm'), expected, check_dtype=False)
+
+        untouched = before.index.difference(self.batch['customer_id'].unique())
+        pd.testing.assert_series_equal(reloaded.segments.loc[untouched], before.loc[untouched], check_dtype=False)
+
+    def test_refit_on_demand(self):
+        analytics = CustomerBehaviorAnalytics(data_path='non_existent_path.csv')
+        analytics.initialize_incremental(self.state_dir)
+        report = analytics.update_incremental(self.batch, self.state_dir, refit=True)
+        self.assertTrue(report['refit'])
+        self.assertIn('segment_rfm', analytics.segments.columns)
+        self.assertEqual(IncrementalAnalytics(self.state_dir).load().metadata['refits'], 2)
+
+    def test_reload_keeps_cluster_count_and_drift_threshold(self):
+        IncrementalAnalytics(self.state_dir, n_clusters=6, drift_threshold=0.8).initialize(self.history)
+
+        reloaded = IncrementalAnalytics(self.state_dir).load()
+        self.assertEqual((reloaded.n_clusters, reloaded.drift_threshold), (6, 0.8))
+        report = reloaded.apply_batch(self.batch, refit=True)
+        self.assertTrue(report['refit'])
+        self.assertEqual(reloaded.kmeans.n_clusters, 6)
+        self.assertEqual(reloaded.segments.nunique(), 6)
+
+        analytics = CustomerBehaviorAnalytics(data_path='non_existent_path.csv')
+        analytics.update_incremental(self.batch, self.state_dir, refit=True)
+        self.assertEqual(analytics.segments['segment_rfm'].nunique(), 6)
+
+        with self.assertRaises(ValueError):
+            IncrementalAnalytics(self.state_dir, n_clusters=4).load()
+
+    def test_streaming_history_and_file_batches(self):
+        history_path = os.path.join(self.state_dir, 'history.csv')
+        batch_path = os.path.join(self.state_dir, 'batch.csv')
+        self.history.to_csv(history_path, index=False)
+        self.batch.to_csv(batch_path, index=False)
+        state_dir = os.path.join(self.state_dir, 'state')
+
+        analytics = CustomerBehaviorAnalytics(data_path=history_path, chunksize=1000, n_clusters=3)
+        report = analytics.initialize_incremental(state_dir)
+        self.assertEqual(report['rows'], len(self.history))
+        self.assertEqual(analytics.segments['segment_rfm'].nunique(), 3)
+
+        analytics.update_incremental(batch_path, state_dir)
+        self.assertIn('batch', analytics.memory_report)
+        expected = compute_customer_metrics(self.full)
+        pd.testing.assert_frame_equal(analytics.segments.drop(columns='segment_rfm'), expected,
+                                      check_dtype=False, check_categorical=False)
+
+        sharded = CustomerBehaviorAnalytics(data_path=history_path, num_shards=2,
+                                            shard_dir=os.path.join(self.state_dir, 'shards'))
+        with self.assertRaises(ValueError):
+            sharded.initialize_incremental(os.path.join(self.state_dir, 'sharded_state'))
+
+if __name__ == '__main__':
+    unittest.main()
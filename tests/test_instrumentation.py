@@ -0,0 +1,79 @@
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from src import server
+from src.customer_analytics import CustomerBehaviorAnalytics
+from src.instrumentation import MetricsRegistry, current_rss_mb, instrument_stage
+
+class TestInstrumentation(unittest.TestCase):
+
+    def test_stage_record_and_profiles(self):
+        registry = MetricsRegistry()
+        profile_dir = tempfile.mkdtemp()
+        try:
+            with instrument_stage('work', registry=registry, profile_dir=profile_dir) as record:
+                sum(range(10000))
+                record['rows'] = 10000
+            self.assertTrue(os.path.exists(os.path.join(profile_dir, 'work.prof')))
+            self.assertTrue(os.path.exists(os.path.join(profile_dir, 'work.tracemalloc.txt')))
+        finally:
+            shutil.rmtree(profile_dir)
+        stage = registry.snapshot()['stages']['work']
+        self.assertEqual(stage['rows'], 10000)
+        self.assertGreaterEqual(stage['wall_seconds'], 0)
+        self.assertIn('cpu_seconds', stage)
+        self.assertIn('pipeline_stage_rows{stage="work"} 10000', registry.render_prometheus())
+
+    def test_stage_peak_counts_memory_freed_before_exit(self):
+        before = current_rss_mb()
+        if before is None:
+            self.skipTest('current RSS not available on this platform')
+        registry = MetricsRegistry()
+        with instrument_stage('alloc', registry=registry):
+            block = bytearray(200 * 1024 * 1024)
+            block[::4096] = b'x' * len(block[::4096])
+            time.sleep(0.05)
+            del block
+        with instrument_stage('idle', registry=registry):
+            pass
+        stages = registry.snapshot()['stages']
+        # Memoria liberada antes do fim do estagio ainda conta no pico
+        self.assertGreater(stages['alloc']['stage_peak_rss_mb'] - before, 150)
+        # O pico do processo nao se repete no estagio seguinte
+        self.assertLess(stages['idle']['stage_peak_rss_mb'] - before, 50)
+        self.assertIn('pipeline_stage_peak_rss_mb{stage="alloc"}', registry.render_prometheus())
+
+    def test_histogram_rendering(self):
+        registry = MetricsRegistry()
+        registry.observe('latency_seconds', 0.003, 'Latency', endpoint='/x')
+        registry.observe('latency_seconds', 2.0, 'Latency', endpoint='/x')
+        text = registry.render_prometheus([('extra', 'Extra', {'v': 'a'}, 1), ('extra', 'Extra', {'v': 'b'}, 2)])
+        self.assertIn('# TYPE latency_seconds histogram', text)
+        self.assertIn('latency_seconds_bucket{endpoint="/x",le="0.005"} 1', text)
+        self.assertIn('latency_seconds_bucket{endpoint="/x",le="+Inf"} 2', text)
+        self.assertIn('latency_seconds_count{endpoint="/x"} 2', text)
+        self.assertEqual(text.count('# TYPE extra gauge'), 1)
+        text = registry.render_prometheus(extra_counters=[('hits_total', 'Hits', {}, 3)])
+        self.assertIn('# TYPE hits_total counter\nhits_total 3', text)
+
+    def test_pipeline_stage_metrics_and_metrics_endpoint(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            analytics = CustomerBehaviorAnalytics(data_path='non_existent_path.csv',
+                                                  dashboard_path=os.path.join(tmpdir, 'dashboard.html'))
+            results = analytics.run_complete_analysis()
+        self.assertEqual(results['stage_metrics']['load_data']['rows'], 1000)
+        self.assertIn('stage_peak_rss_mb', results['stage_metrics']['churn_model'])
+
+        client = server.app.test_client()
+        client.get('/health')
+        text = client.get('/metrics').data.decode()
+        self.assertIn('http_request_duration_seconds_bucket{endpoint="/health",method="GET"', text)
+        self.assertIn('pipeline_stage_wall_seconds{stage="segmentation"}', text)
+        self.assertIn('# TYPE aggregate_cache_hits_total counter', text)
+        self.assertIn('# TYPE aggregate_cache_misses_total counter', text)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from src import server
+from src.aggregate_cache import AggregateCache
+from src.customer_analytics import CustomerBehaviorAnalytics
+from src.data_store import DatasetStore
+from src.jobs import JobManager
+
+class TestJobManager(unittest.TestCase):
+
+    def test_latest_result_served_while_new_job_runs(self):
+        manager = JobManager(max_workers=2)
+        first, created = manager.submit('analysis', lambda: 'first')
+        self.assertTrue(created)
+        manager.wait(first.id, timeout=5)
+        self.assertEqual(manager.latest('analysis').result, 'first')
+
+        release = threading.Event()
+        second, _ = manager.submit('analysis', lambda: release.wait(5) and 'second')
+        # Um job ativo do mesmo tipo e reutilizado em vez de duplicado
+        self.assertEqual(manager.submit('analysis', lambda: 'third'), (second, False))
+        self.assertEqual(manager.latest('analysis').result, 'first')
+        release.set()
+        manager.wait(second.id, timeout=5)
+        self.assertEqual(manager.latest('analysis').result, 'second')
+
+    def test_failed_job_keeps_previous_result(self):
+        manager = JobManager(max_workers=1)
+        ok, _ = manager.submit('analysis', lambda: 42)
+        manager.wait(ok.id, timeout=5)
+
+        def fail():
+            raise RuntimeError('boom')
+
+        failed, _ = manager.submit('analysis', fail)
+        manager.wait(failed.id, timeout=5)
+        self.assertEqual(failed.status, 'failed')
+        self.assertIn('boom', failed.error)
+        self.assertEqual(manager.latest('analysis').result, 42)
+        self.assertEqual(manager.stats(), {'succeeded': 1, 'failed': 1})
+
+class TestJobEndpoints(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        data_path = os.path.join(self.tmpdir, 'customer_data.csv')
+        CustomerBehaviorAnalytics()._generate_synthetic_data(num_customers=300).to_csv(data_path, index=False)
+        self.original = (server.store, server.aggregate_cache, server.jobs, server.ANALYSIS_OUTPUT_DIR)
+        server.store = DatasetStore(data_path)
+        server.aggregate_cache = AggregateCache()
+        server.jobs = JobManager(max_workers=1)
+        server.ANALYSIS_OUTPUT_DIR = os.path.join(self.tmpdir, 'reports')
+        self.client = server.app.test_client()
+
+    def tearDown(self):
+        server.store, server.aggregate_cache, server.jobs, server.ANALYSIS_OUTPUT_DIR = self.original
+        shutil.rmtree(self.tmpdir)
+
+    def wait_for(self, job_id):
+        deadline = time.time() + 60
+        while time.time() < deadline:
+            job = self.client.get(f'/api/jobs/{job_id}').get_json()
+            if job['status'] in ('succeeded', 'failed'):
+                return job
+            time.sleep(0.05)
+        self.fail('job did not finish')
+
+    def test_analysis_job_lifecycle(self):
+        self.assertEqual(self.client.get('/api/analysis/latest').status_code, 404)
+        response = self.client.post('/api/jobs', json={'type': 'analysis', 'max_workers': 2})
+        self.assertEqual(response.status_code, 202)
+        job = self.wait_for(response.get_json()['id'])
+        self.assertEqual(job['status'], 'succeeded', job['error'])
+
+        result = self.client.get(job['result_url'])
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(result.get_json()['total_customers'], 300)
+        self.assertTrue(os.path.exists(result.get_json()['dashboard']))
+
+        latest = self.client.get('/api/analysis/latest')
+        self.assertEqual(latest.headers['X-Analysis-Job'], job['id'])
+        self.assertEqual(self.client.get('/api/analysis/latest',
+                                         headers={'If-None-Match': latest.headers['ETag']}).status_code, 304)
+        self.assertEqual([j['id'] for j in self.client.get('/api/jobs').get_json()['jobs']], [job['id']])
+
+    def test_precompute_job_warms_analytics_cache(self):
+        response = self.client.post('/api/jobs', json={'type': 'precompute'})
+        self.assertEqual(self.wait_for(response.get_json()['id'])['status'], 'succeeded')
+        self.client.get('/api/analytics/summary')
+        self.client.get('/api/analytics/purchases')
+        stats = server.aggregate_cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (2, 3))
+
+    def test_analysis_job_fails_without_dataset(self):
+        server.store = DatasetStore(os.path.join(self.tmpdir, 'missing.csv'))
+        response = self.client.post('/api/jobs', json={'type': 'analysis'})
+        job = self.wait_for(response.get_json()['id'])
+        self.assertEqual(job['status'], 'failed')
+        self.assertIn('FileNotFoundError', job['error'])
+        self.assertEqual(self.client.get('/api/analysis/latest').status_code, 404)
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.post('/api/jobs', json={'type': 'reboot'}).status_code, 400)
+        self.assertEqual(self.client.post('/api/jobs', json={'max_workers': 'many'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/jobs/unknown').status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from src import server
+from src.customer_analytics import CustomerBehaviorAnalytics
+from src.model_store import ModelArtifacts, list_versions, load_artifacts
+from src.scoring import ChurnScorer
+
+class TestModelStore(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.model_dir = tempfile.mkdtemp()
+        cls.analytics = CustomerBehaviorAnalytics(data_path='non_existent_path.csv')
+        cls.analytics.load_data()
+        cls.analytics.perform_customer_segmentation(cls.analytics.calculate_customer_metrics())
+        cls.analytics.predict_customer_churn()
+        cls.version = cls.analytics.save_models(cls.model_dir, version='v1')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.model_dir)
+
+    def setUp(self):
+        self.original_scorer = server.churn_scorer
+        server.churn_scorer = server.load_churn_scorer(self.model_dir)
+        self.client = server.app.test_client()
+        columns = self.analytics.models['churn_prediction']['feature_columns']
+        self.records = self.analytics.segments[columns].head(20).to_dict('records')
+
+    def tearDown(self):
+        server.churn_scorer = self.original_scorer
+
+    def test_artifacts_roundtrip(self):
+        self.assertEqual(list_versions(self.model_dir), ['v1'])
+        artifacts = load_artifacts(self.model_dir)
+        self.assertEqual(artifacts.version, 'v1')
+        segments = self.analytics.segments
+        np.testing.assert_array_equal(artifacts.assign_segments(segments), segments['segment_rfm'].to_numpy())
+        model = self.analytics.models['churn_prediction']['model']
+        features = segments[artifacts.feature_columns]
+        np.testing.assert_allclose(artifacts.churn_probability(features), model.predict_proba(features)[:, 1])
+
+    def test_single_class_churn_model(self):
+        from sklearn.ensemble import RandomForestClassifier
+        artifacts = load_artifacts(self.model_dir)
+        features = self.analytics.segments[artifacts.feature_columns]
+        for label in (0, 1):
+            model = RandomForestClassifier(n_estimators=5).fit(features, np.full(len(features), label))
+            single = ModelArtifacts(artifacts.manifest, {'scaler': artifacts.scaler, 'centroids': artifacts.centroids,
+                                                         'churn_model': model})
+            np.testing.assert_array_equal(single.churn_probability(features.head(3)), [float(label)] * 3)
+        model = RandomForestClassifier(n_estimators=5).fit(features, np.arange(len(features)) % 2 + 2)
+        with self.assertRaises(ValueError):
+            ModelArtifacts(artifacts.manifest, {'scaler': artifacts.scaler, 'centroids': artifacts.centroids,
+                                                'churn_model': model})
+
+    def test_default_versions_do_not_collide(self):
+        model_dir = tempfile.mkdtemp()
+        try:
+            first = self.analytics.save_models(model_dir)
+            second = self.analytics.save_models(model_dir)
+            self.assertNotEqual(first, second)
+            self.assertEqual(list_versions(model_dir), [first, second])
+            self.assertEqual(load_artifacts(model_dir).version, second)
+        finally:
+            shutil.rmtree(model_dir)
+
+    def test_predict_single_and_batch(self):
+        single = self.client.post('/api/predict/churn', json={'features': self.records[0]}).get_json()
+        self.assertEqual(single['model_version'], 'v1')
+        self.assertTrue(0 <= single['churn_probability'] <= 1)
+        batch = self.client.post('/api/predict/churn', json={'instances': self.records}).get_json()
+        self.assertEqual(len(batch['predictions']), 20)
+        self.assertAlmostEqual(batch['predictions'][0]['churn_probability'], single['churn_probability'])
+
+        stats = self.client.get('/api/predict/stats').get_json()
+        self.assertEqual(stats['latency']['v1']['requests'], 2)
+        self.assertIn('p99_ms', stats['latency']['v1'])
+
+    def test_predict_validation(self):
+        bad = dict(self.records[0])
+        bad.pop('age')
+        response = self.client.post('/api/predict/churn', json={'features': bad})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.post('/api/predict/churn', json={}).status_code, 400)
+        server.churn_scorer = None
+        self.assertEqual(self.client.post('/api/predict/churn', json={'features': self.records[0]}).status_code, 503)
+
+    def test_concurrent_requests_are_microbatched(self):
+        scorer = ChurnScorer(load_artifacts(self.model_dir), max_wait_ms=50)
+        calls = []
+        score_fn = scorer.batcher.score_fn
+        scorer.batcher.score_fn = lambda rows: calls.append(len(rows)) or score_fn(rows)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda r: scorer.score([r]), self.records[:8]))
+        self.assertEqual(len(results), 8)
+        self.assertEqual(sum(calls), 8)
+        self.assertLess(len(calls), 8)
+
+if __name__ == '__main__':
+    unittest.main()
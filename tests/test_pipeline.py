@@ -0,0 +1,38 @@
+
+import threading
+import time
+import unittest
+from src.pipeline import PipelineScheduler
+
+class TestPipelineScheduler(unittest.TestCase):
+
+    def test_dependencies_and_results(self):
+        pipeline = PipelineScheduler()
+        pipeline.add('a', lambda: 2)
+        pipeline.add('b', lambda a: a * 3, ['a'])
+        pipeline.add('c', lambda a, b: a + b, ['a', 'b'])
+        results, timings = pipeline.run()
+        self.assertEqual(results, {'a': 2, 'b': 6, 'c': 8})
+        self.assertEqual(set(timings), {'a', 'b', 'c'})
+
+    def test_independent_stages_run_concurrently(self):
+        barrier = threading.Barrier(3, timeout=5)
+        pipeline = PipelineScheduler(max_workers=3)
+        pipeline.add('root', lambda: None)
+        for name in ('x', 'y', 'z'):
+            # Cada estagio so passa da barreira se os tres rodarem ao mesmo tempo
+            pipeline.add(name, lambda _: barrier.wait(), ['root'])
+        start = time.perf_counter()
+        pipeline.run()
+        self.assertLess(time.perf_counter() - start, 5)
+
+    def test_unknown_dependency_and_failure(self):
+        pipeline = PipelineScheduler()
+        with self.assertRaises(ValueError):
+            pipeline.add('a', lambda: None, ['missing'])
+        pipeline.add('boom', lambda: 1 / 0)
+        with self.assertRaises(ZeroDivisionError):
+            pipeline.run()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+import pandas as pd
+from src.customer_analytics import CustomerBehaviorAnalytics
+from src.result_store import ResultStore, file_fingerprint, fingerprint
+from src.synthetic import write_transactions
+
+class TestResultStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.root = os.path.join(self.tmpdir, 'results')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_put_get_and_clear(self):
+        store = ResultStore(self.root)
+        self.assertIsNone(store.get('metrics', 'abc'))
+        frame = pd.DataFrame({'x': [1, 2]}, index=pd.Index([10, 20], name='customer_id'))
+        store.put('metrics', 'abc', frame)
+        self.assertIn(('metrics', 'abc'), store)
+        pd.testing.assert_frame_equal(store.get('metrics', 'abc'), frame)
+        store.put('insights', 'def', {'total': 3})
+        info = store.info()
+        self.assertEqual(info['entries'], 2)
+        self.assertEqual((info['hits'], info['misses']), (1, 1))
+        self.assertEqual(store.clear('metrics'), 1)
+        self.assertEqual([entry['stage'] for entry in store.entries()], ['insights'])
+        self.assertEqual(store.clear(), 1)
+
+    def test_lru_eviction_keeps_recently_used(self):
+        payload = b'x' * 10_000
+        store = ResultStore(self.root, max_bytes=35_000)
+        for age, key in enumerate(('a', 'b', 'c')):
+            store.put('stage', key, payload)
+            stamp = time.time() - 100 + age
+            os.utime(os.path.join(self.root, f'stage-{key}.pkl'), (stamp, stamp))
+        store.get('stage', 'a')
+        store.put('stage', 'd', payload)
+        self.assertEqual(sorted(entry['key'] for entry in store.entries()), ['a', 'c', 'd'])
+
+    def test_unreadable_entries_are_dropped_as_misses(self):
+        store = ResultStore(self.root)
+        store.put('metrics', 'abc', {'rows': list(range(1000))})
+        path = os.path.join(self.root, 'metrics-abc.pkl')
+        with open(path, 'rb') as f:
+            data = f.read()
+        with open(path, 'wb') as f:
+            f.write(data[:len(data) // 2])
+        self.assertIsNone(store.get('metrics', 'abc'))
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual((store.hits, store.misses), (0, 1))
+
+        # Pickles de outra versao do pandas/numpy costumam falhar com estes erros
+        for error in (ValueError, TypeError, KeyError):
+            store.put('metrics', 'stale', {'rows': [1]})
+            with mock.patch('src.result_store.pickle.load', side_effect=error('stale')):
+                self.assertIsNone(store.get('metrics', 'stale'))
+            self.assertNotIn(('metrics', 'stale'), store)
+
+        # Falha no pickle.dump nao deixa arquivo temporario
+        with self.assertRaises(Exception):
+            store.put('metrics', 'lambda', lambda: None)
+        self.assertEqual(os.listdir(self.root), [])
+
+    def test_fingerprints(self):
+        self.assertEqual(fingerprint('x', 1, {'a': 1}), fingerprint('x', 1, {'a': 1}))
+        self.assertNotEqual(fingerprint('x', 1), fingerprint('x', 2))
+        current = fingerprint('x', 1)
+        with mock.patch('src.result_store.library_versions', return_value={'pandas': '0.1'}):
+            self.assertNotEqual(fingerprint('x', 1), current)
+        path = os.path.join(self.tmpdir, 'data.csv')
+        with open(path, 'w') as f:
+            f.write('a\n1\n')
+        before = file_fingerprint([path])
+        with open(path, 'a') as f:
+            f.write('2\n')
+        self.assertNotEqual(file_fingerprint([path]), before)
+
+    def test_file_fingerprint_follows_content(self):
+        path = os.path.join(self.tmpdir, 'data.csv')
+        with open(path, 'w') as f:
+            f.write('a\n1\n')
+        before = file_fingerprint([path])
+        copy = shutil.copy(path, os.path.join(self.tmpdir, 'copy.csv'))
+        self.assertEqual(file_fingerprint([copy]), before)
+
+        # Mesmo tamanho e mesmo mtime, conteudo diferente
+        stat = os.stat(path)
+        with open(path, 'w') as f:
+            f.write('a\n2\n')
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertNotEqual(file_fingerprint([path]), before)
+
+        # Arquivos grandes: blocos em offsets fixos
+        with mock.patch('src.result_store.FULL_HASH_MAX_BYTES', 64), \
+                mock.patch('src.result_store.SAMPLE_BLOCK_BYTES', 8), mock.patch('src.result_store.SAMPLE_BLOCKS', 4):
+            with open(path, 'wb') as f:
+                f.write(bytes(1000))
+            sampled = file_fingerprint([path])
+            with open(path, 'r+b') as f:
+                f.write(b'x')
+            self.assertNotEqual(file_fingerprint([path]), sampled)
+
+class TestAnalysisReuse(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.csv_path = os.path.join(self.tmpdir, 'transactions.csv')
+        write_transactions(self.csv_path, 5000, block_customers=200)
+        self.root = os.path.join(self.tmpdir, 'results')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def analytics(self, **options):
+        return CustomerBehaviorAnalytics(data_path=self.csv_path, result_store=self.root,
+                                         dashboard_path=os.path.join(self.tmpdir, 'dashboard.html'), **options)
+
+    def test_rerun_reuses_every_stage(self):
+        first = self.analytics().run_complete_analysis()
+        self.assertEqual(set(first['result_store'].values()), {'miss'})
+
+        second_analytics = self.analytics()
+        second = second_analytics.run_complete_analysis()
+        self.assertEqual(second['result_store'], {
+            'load_data': 'skipped', 'customer_metrics': 'hit', 'segmentation': 'hit',
+            'segment_analysis': 'hit', 'churn_model': 'hit', 'insights': 'hit'
+        })
+        self.assertIsNone(second_analytics.data)
+        pd.testing.assert_frame_equal(second['segments'], first['segments'])
+        pd.testing.assert_frame_equal(second['customer_metrics'], first['customer_metrics'])
+        self.assertNotIn('segment_rfm', first['customer_metrics'].columns)
+        self.assertEqual(second['insights']['total_customers'], first['insights']['total_customers'])
+        self.assertIn('churn_prediction', second_analytics.models)
+
+    def test_changed_parameters_reuse_upstream_stages(self):
+        self.analytics().run_complete_analysis()
+        rerun = self.analytics(n_clusters=3).run_complete_analysis()
+        self.assertEqual(rerun['result_store']['customer_metrics'], 'hit')
+        self.assertEqual(rerun['result_store']['segmentation'], 'miss')
+        self.assertEqual(rerun['segments']['segment_rfm'].nunique(), 3)
+
+        # Dados alterados invalidam todas as etapas
+        write_transactions(self.csv_path, 4000, block_customers=200)
+        changed = self.analytics().run_complete_analysis()
+        self.assertEqual(changed['result_store']['customer_metrics'], 'miss')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from src import server
+from src.aggregate_cache import AggregateCache
+from src.customer_analytics import CustomerBehaviorAnalytics
+from src.data_store import DatasetStore
+from src.metrics_engine import compute_customer_metrics
+from src.rollups import build_rollups, rollups_from_file
+from src.schema import TRANSACTION_SCHEMA
+from src.synthetic import generate_transactions
+
+class TestRollups(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.data = generate_transactions(30000, block_customers=1000)
+        cls.rollups = build_rollups(cls.data)
+
+    def test_range_totals_match_raw_scan(self):
+        totals = self.rollups.range_totals('2024-03-01', '2024-04-15')
+        rows = self.data[self.data['purchase_date'].between('2024-03-01', '2024-04-15')]
+        self.assertEqual(totals['purchases'], len(rows))
+        self.assertEqual(totals['customers'], rows['customer_id'].nunique())
+        self.assertAlmostEqual(totals['revenue'], rows['purchase_amount'].sum(), places=6)
+        np.testing.assert_allclose(totals['by_category']['revenue'].sort_index(),
+                                   rows.groupby('category', observed=True)['purchase_amount'].sum().sort_index())
+
+    def test_rfm_as_of_matches_metrics_engine(self):
+        rfm = self.rollups.rfm_as_of()
+        metrics = compute_customer_metrics(self.data)
+        pd.testing.assert_series_equal(rfm['Recency'], metrics['Recency'], check_dtype=False)
+        pd.testing.assert_series_equal(rfm['Frequency'], metrics['Frequency'], check_dtype=False)
+        np.testing.assert_allclose(rfm['Monetary'], metrics['Monetary'])
+
+        # Uma data passada equivale a recalcular so com as compras ate ela
+        past = self.data[self.data['purchase_date'] <= '2024-06-30']
+        expected = compute_customer_metrics(past, snapshot_date=pd.Timestamp('2024-07-01'))
+        pd.testing.assert_series_equal(self.rollups.rfm_as_of('2024-06-30')['Recency'], expected['Recency'],
+                                       check_dtype=False)
+
+    def test_cohort_retention(self):
+        sizes, retention = self.rollups.cohort_matrix('month')
+        first = self.data.groupby('customer_id')['purchase_date'].min().dt.to_period('M')
+        self.assertEqual(sizes.sum(), self.data['customer_id'].nunique())
+        self.assertEqual(sizes.iloc[0], (first == first.min()).sum())
+        self.assertTrue((retention[0] == 1).all())
+        # A ultima coorte ainda nao tem periodos seguintes observaveis
+        self.assertTrue(retention.iloc[-1, 1:].isna().all())
+
+    def test_rolling_revenue(self):
+        rolling = self.rollups.rolling_revenue(windows=(30,))
+        daily = self.data.groupby(self.data['purchase_date'].dt.normalize())['purchase_amount'].sum()
+        self.assertAlmostEqual(rolling['revenue_30d'].iloc[-1], daily.iloc[-30:].sum(), places=4)
+
+    def test_sparse_and_non_integer_ids_fall_back_to_groupby(self):
+        expected = self.rollups.daily[['day', 'customer_id', 'category', 'purchases', 'revenue']]
+        sparse = self.data.assign(customer_id=self.data['customer_id'] * 10 ** 13 + 7)
+        daily = build_rollups(sparse).daily
+        # Com a chave empacotada esses ids estourariam int64 e fundiriam grupos
+        self.assertEqual(len(daily), len(expected))
+        np.testing.assert_array_equal(daily['customer_id'], expected['customer_id'] * 10 ** 13 + 7)
+        np.testing.assert_allclose(daily['revenue'], expected['revenue'])
+
+        text = build_rollups(self.data.assign(customer_id='c' + self.data['customer_id'].astype(str)))
+        self.assertEqual(text.range_totals()['purchases'], len(self.data))
+        self.assertEqual(text.range_totals()['customers'], self.data['customer_id'].nunique())
+
+    def test_missing_dates_are_dropped(self):
+        data = self.data.copy()
+        data.loc[data.index[::10], 'purchase_date'] = pd.NaT
+        rollups = build_rollups(data)
+        self.assertEqual(rollups.range_totals()['purchases'], data['purchase_date'].notna().sum())
+        self.assertEqual(rollups.first_day, data['purchase_date'].min())
+
+    def test_missing_categories_stay_missing_when_chunked(self):
+        data = self.data.copy()
+        data.loc[data.index[::7], 'category'] = np.nan
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'transactions.csv')
+            data.to_csv(path, index=False)
+            chunked = rollups_from_file(path, chunksize=7000)
+        finally:
+            shutil.rmtree(tmpdir)
+        in_memory = build_rollups(data)
+        self.assertEqual(len(chunked.daily), len(in_memory.daily))
+        self.assertEqual(chunked.daily['category'].isna().sum(), in_memory.daily['category'].isna().sum())
+        by_category = [r.range_totals()['by_category'].rename(index=str).sort_index() for r in (chunked, in_memory)]
+        self.assertNotIn('nan', by_category[0].index)
+        pd.testing.assert_frame_equal(by_category[0], by_category[1], check_index_type=False)
+
+    def test_chunked_file_matches_in_memory(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'transactions.csv')
+            self.data.to_csv(path, index=False)
+            chunked = rollups_from_file(path, chunksize=7000)
+            self.assertEqual(len(chunked.daily), len(self.rollups.daily))
+            keys = ['day', 'customer_id', 'category']
+            ordered = [r.daily.astype({'category': str}).sort_values(keys) for r in (chunked, self.rollups)]
+            np.testing.assert_allclose(ordered[0]['revenue'], ordered[1]['revenue'])
+            pd.testing.assert_series_equal(chunked.cohort_matrix('week')[0], self.rollups.cohort_matrix('week')[0])
+
+            analytics = CustomerBehaviorAnalytics(data_path=path)
+            analytics.load_data()
+            sizes, _ = analytics.cohort_retention('month')
+            pd.testing.assert_series_equal(sizes, self.rollups.cohort_matrix('month')[0])
+            self.assertEqual(analytics.range_summary('2024-02-01', '2024-02-29')['purchases'],
+                             self.rollups.range_totals('2024-02-01', '2024-02-29')['purchases'])
+        finally:
+            shutil.rmtree(tmpdir)
+
+class TestWindowedEndpoints(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.data_path = os.path.join(self.tmpdir, 'customer_data.csv')
+        self.df = generate_transactions(5000, block_customers=200)
+        self.df.to_csv(self.data_path, index=False)
+        self.original = (server.store, server.aggregate_cache)
+        server.store = DatasetStore(self.data_path, schema=TRANSACTION_SCHEMA)
+        server.aggregate_cache = AggregateCache()
+        self.client = server.app.test_client()
+
+    def tearDown(self):
+        server.store, server.aggregate_cache = self.original
+        shutil.rmtree(self.tmpdir)
+
+    def test_full_range_matches_whole_history(self):
+        first, last = self.df['purchase_date'].min().date(), self.df['purchase_date'].max().date()
+        for name in ('summary', 'demographics', 'purchases'):
+            whole = self.client.get(f'/api/analytics/{name}').get_json()
+            ranged = self.client.get(f'/api/analytics/{name}?from={first}&to={last}').get_json()
+            self.assertEqual(ranged.pop('window'), {'from': str(first), 'to': str(last)})
+            self.assertEqual(json_round(ranged), json_round(whole), name)
+
+    def test_window_demographics_skip_missing_ages(self):
+        self.df.loc[self.df['customer_id'] % 5 == 0, 'age'] = np.nan
+        self.df.to_csv(self.data_path, index=False)
+        server.store = DatasetStore(self.data_path, schema=TRANSACTION_SCHEMA)
+        response = self.client.get('/api/analytics/demographics?from=2024-03-01&to=2024-03-31')
+        self.assertEqual(response.status_code, 200)
+        ages = response.get_json()['age_statistics']
+        expected = self.df.loc[self.df['purchase_date'].dt.month == 3, 'age'].dropna()
+        self.assertEqual((ages['min_age'], ages['max_age']), (expected.min(), expected.max()))
+        self.assertAlmostEqual(ages['average_age'], expected.mean())
+        self.assertEqual(ages['median_age'], expected.median())
+
+    def test_range_is_part_of_cache_key(self):
+        march = self.client.get('/api/analytics/purchases?from=2024-03-01&to=2024-03-31')
+        april = self.client.get('/api/analytics/purchases?from=2024-04-01&to=2024-04-30')
+        self.assertNotEqual(march.headers['ETag'], april.headers['ETag'])
+        expected = self.df[self.df['purchase_date'].dt.month == 3]
+        self.assertEqual(march.get_json()['transaction_count'], len(expected))
+        again = self.client.get('/api/analytics/purchases?from=2024-3-1&to=2024-03-31',
+                                headers={'If-None-Match': march.headers['ETag']})
+        self.assertEqual(again.status_code, 304)
+
+    def test_cohorts_endpoint(self):
+        payload = self.client.get('/api/analytics/cohorts?period=month').get_json()
+        self.assertEqual(sum(c['customers'] for c in payload['cohorts']), self.df['customer_id'].nunique())
+        self.assertEqual(payload['cohorts'][0]['retention'][0], 1.0)
+        self.assertEqual(self.client.get('/api/analytics/cohorts?period=year').status_code, 400)
+        self.assertEqual(self.client.get('/api/analytics/summary?from=2024-05-01&to=2024-04-01').status_code, 400)
+        self.assertEqual(self.client.get('/api/analytics/summary?from=yesterday-ish').status_code, 400)
+
+def json_round(value):
+    # Somas por rollup diferem das somas brutas so na ultima casa do float
+    if isinstance(value, dict):
+        return {k: json_round(v) for k, v in value.items()}
+    if isinstance(value, float):
+        return round(value, 6)
+    return value
+
+if __name__ == '__main__':
+    unittest.main()
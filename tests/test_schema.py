@@ -0,0 +1,42 @@
+
+import unittest
+import numpy as np
+import pandas as pd
+from src.schema import CUSTOMER_SCHEMA, TRANSACTION_SCHEMA, apply_schema, compact_frame
+
+class TestSchema(unittest.TestCase):
+
+    def test_transaction_schema_is_compact_and_lossless(self):
+        df = pd.DataFrame({
+            'customer_id': np.arange(1000),
+            'age': np.arange(1000) % 60 + 18,
+            'country': np.array(['USA', 'UK', 'Canada', 'Germany'], dtype=object)[np.arange(1000) % 4],
+            'purchase_date': ['2024-01-%02d' % (i % 28 + 1) for i in range(1000)],
+            'purchase_amount': np.linspace(1, 500, 1000).round(2),
+            'is_churned': np.arange(1000) % 2
+        })
+        compacted, report = compact_frame(df, TRANSACTION_SCHEMA)
+        self.assertEqual(compacted['age'].dtype, np.int8)
+        self.assertEqual(compacted['is_churned'].dtype, np.int8)
+        self.assertIsInstance(compacted['country'].dtype, pd.CategoricalDtype)
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(compacted['purchase_date']))
+        self.assertEqual(compacted['customer_id'].dtype, np.int64)
+        self.assertLess(report['after_bytes'], report['before_bytes'])
+        pd.testing.assert_frame_equal(compacted.astype({'age': int, 'is_churned': int, 'country': object}),
+                                      df.assign(purchase_date=pd.to_datetime(df['purchase_date'])),
+                                      check_dtype=False)
+        # O frame original nao e alterado
+        self.assertEqual(df['age'].dtype, np.int64)
+
+    def test_out_of_range_values_keep_a_wider_type(self):
+        df = pd.DataFrame({'age': [20, 300], 'Recency': [1, 40000], 'Monetary': [0.1, 2.5]})
+        self.assertEqual(apply_schema(df, TRANSACTION_SCHEMA)['age'].dtype, np.int16)
+        compacted = apply_schema(df, CUSTOMER_SCHEMA)
+        self.assertEqual(compacted['Recency'].dtype, np.int32)
+        # 0.1 nao e exato em float32; 2.5 e 0.5 sao
+        self.assertEqual(compacted['Monetary'].dtype, np.float64)
+        self.assertEqual(apply_schema(pd.DataFrame({'Monetary': [0.5, 2.5]}), CUSTOMER_SCHEMA)['Monetary'].dtype,
+                         np.float32)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+
+import os
+import shutil
+import tempfile
+import threading
+import json
+import unittest
+import pandas as pd
+from src import server
+from src.aggregate_cache import AggregateCache
+from src.data_store import DatasetStore
+from src.jobs import JobManager
+from src.schema import TRANSACTION_SCHEMA
+from src.customer_analytics import CustomerBehaviorAnalytics
+
+class TestServer(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.data_path = os.path.join(self.tmpdir, 'customer_data.csv')
+        self.df = CustomerBehaviorAnalytics()._generate_synthetic_data(num_customers=200)
+        self.df.to_csv(self.data_path, index=False)
+        self.original_store = server.store
+        self.original_cache = server.aggregate_cache
+        self.original_jobs = server.jobs
+        server.store = DatasetStore(self.data_path, schema=TRANSACTION_SCHEMA)
+        server.aggregate_cache = AggregateCache(max_entries=2)
+        server.jobs = JobManager(max_workers=1)
+        self.client = server.app.test_client()
+
+    def tearDown(self):
+        server.store = self.original_store
+        server.aggregate_cache = self.original_cache
+        server.jobs = self.original_jobs
+        shutil.rmtree(self.tmpdir)
+
+    def test_dataset_loaded_once(self):
+        self.client.get('/api/analytics/summary')
+        self.client.get('/api/analytics/demographics')
+        self.assertEqual(server.store.stats()['loads'], 1)
+        data = server.store.get().data
+        self.assertEqual(str(data['country'].dtype), 'category')
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(data['purchase_date']))
+        self.assertEqual(str(data['age'].dtype), 'int8')
+        stats = server.store.stats()
+        self.assertLess(stats['memory_bytes'], stats['raw_memory_bytes'])
+
+    def test_dataset_reloaded_in_background_on_change(self):
+        self.client.get('/api/analytics/summary')
+        release = threading.Event()
+        loader = server.store.loader
+        server.store.loader = lambda path: release.wait(5) and loader(path)
+        self.df.head(50).to_csv(self.data_path, index=False)
+        os.utime(self.data_path, ns=(0, 0))
+
+        # Leitores recebem a versao anterior enquanto a recarga roda
+        for _ in range(2):
+            self.assertEqual(self.client.get('/api/analytics/summary').get_json()['total_customers'], 200)
+        refresh = server.jobs.list('refresh')
+        self.assertEqual(len(refresh), 1)
+        release.set()
+        self.assertEqual(server.jobs.wait(refresh[0].id, timeout=5).status, 'succeeded')
+
+        response = self.client.get('/api/analytics/summary')
+        self.assertEqual(response.get_json()['total_customers'], 50)
+        self.assertEqual(server.store.stats()['loads'], 2)
+
+    def test_failed_reload_keeps_previous_snapshot(self):
+        self.client.get('/api/analytics/summary')
+
+        def broken(path):
+            raise ValueError('corrupt file')
+
+        server.store.loader = broken
+        os.utime(self.data_path, ns=(0, 0))
+        self.client.get('/api/analytics/summary')
+        refresh = server.jobs.wait(server.jobs.list('refresh')[0].id, timeout=5)
+        self.assertEqual(refresh.status, 'failed')
+        # A versao com falha nao e recarregada a cada requisicao
+        self.assertFalse(server.store.changed())
+        self.assertEqual(self.client.get('/api/analytics/summary').get_json()['total_customers'], 200)
+        self.assertEqual(len(server.jobs.list('refresh')), 1)
+        self.assertEqual(server.store.stats()['last_error'], 'corrupt file')
+
+    def test_analytics_etag_not_modified(self):
+        first = self.client.get('/api/analytics/purchases')
+        self.assertEqual(first.status_code, 200)
+        etag = first.headers['ETag']
+        second = self.client.get('/api/analytics/purchases', headers={'If-None-Match': etag})
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.data, b'')
+        stats = server.aggregate_cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_analytics_cache_eviction(self):
+        for endpoint in ('summary', 'demographics', 'purchases'):
+            self.client.get(f'/api/analytics/{endpoint}')
+        stats = server.aggregate_cache.stats()
+        self.assertEqual(stats['entries'], 2)
+        self.assertEqual(stats['evictions'], 1)
+
+    def test_get_customer(self):
+        response = self.client.get('/api/customers/10')
+        self.assertEqual(response.status_code, 200)
+        payload = response.get_json()
+        self.assertEqual(payload['customer_id'], 10)
+        self.assertEqual(payload['purchase_date'], str(self.df.loc[9, 'purchase_date'].date()))
+        self.assertEqual(self.client.get('/api/customers/99999').status_code, 404)
+
+    def test_customers_filtered_by_index(self):
+        response = self.client.get('/api/customers?country=usa&category=BOOKS&limit=10000')
+        payload = response.get_json()
+        expected = self.df[(self.df['country'] == 'USA') & (self.df['category'] == 'Books')]
+        self.assertEqual(payload['total_count'], len(expected))
+        self.assertEqual([c['customer_id'] for c in payload['customers']], expected['customer_id'].tolist())
+
+    def test_customers_pagination(self):
+        seen = []
+        cursor = None
+        while True:
+            url = '/api/customers?country=Canada&limit=7' + (f'&cursor={cursor}' if cursor else '')
+            payload = self.client.get(url).get_json()
+            seen.extend(c['customer_id'] for c in payload['customers'])
+            cursor = payload['next_cursor']
+            if cursor is None:
+                break
+        expected = self.df.loc[self.df['country'] == 'Canada', 'customer_id'].tolist()
+        self.assertEqual(seen, expected)
+        self.assertEqual(self.client.get('/api/customers?limit=0').status_code, 400)
+
+    def test_customers_ndjson_export(self):
+        response = self.client.get('/api/customers?format=ndjson')
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        rows = [json.loads(line) for line in response.data.decode().splitlines()]
+        self.assertEqual(len(rows), 200)
+        self.assertEqual(rows[0]['customer_id'], 1)
+
+    def test_health_reports_dataset(self):
+        self.client.get('/api/customers')
+        dataset = self.client.get('/health').get_json()['dataset']
+        self.assertEqual(dataset['rows'], 200)
+        self.assertGreater(dataset['memory_bytes'], 0)
+        self.assertIn('load_seconds', dataset)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+
+import os
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+import numpy as np
+import pandas as pd
+from src.customer_analytics import CustomerBehaviorAnalytics
+from src.metrics_engine import REQUIRED_COLUMNS, compute_customer_metrics
+from src.schema import TRANSACTION_SCHEMA, apply_schema
+from src.sharding import partition_transactions, shard_of, shard_paths, sharded_metrics
+from src.storage import read_table
+from src.synthetic import write_transactions
+
+class TestSharding(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.csv_path = os.path.join(self.tmpdir, 'transactions.csv')
+        write_transactions(self.csv_path, 30000, block_customers=500)
+        self.shard_dir = os.path.join(self.tmpdir, 'shards')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def expected_metrics(self):
+        data = apply_schema(read_table(self.csv_path, columns=REQUIRED_COLUMNS), TRANSACTION_SCHEMA)
+        return compute_customer_metrics(data)
+
+    def test_shard_of_is_stable_and_balanced(self):
+        ids = np.arange(1, 100_001)
+        shards = shard_of(ids, 8)
+        np.testing.assert_array_equal(shards, shard_of(ids, 8))
+        counts = np.bincount(shards, minlength=8)
+        self.assertLess(counts.max() / counts.min(), 1.1)
+
+    def test_each_customer_lives_in_one_shard(self):
+        shards = partition_transactions(self.csv_path, self.shard_dir, 4, chunksize=7000)
+        self.assertEqual(shards, shard_paths(self.shard_dir))
+        seen = set()
+        rows = 0
+        for shard in shards:
+            ids = set()
+            for name in sorted(os.listdir(shard)):
+                part = read_table(os.path.join(shard, name))
+                ids.update(part['customer_id'])
+                rows += len(part)
+            self.assertFalse(ids & seen)
+            seen |= ids
+        self.assertEqual(rows, 30000)
+
+        # Reparticionar substitui os shards anteriores
+        self.assertEqual(len(partition_transactions(self.csv_path, self.shard_dir, 2)), 2)
+        self.assertEqual(len(shard_paths(self.shard_dir)), 2)
+
+    def test_sharded_metrics_match_single_process_exactly(self):
+        expected = self.expected_metrics()
+        partition_transactions(self.csv_path, self.shard_dir, 5, chunksize=7000, columns=REQUIRED_COLUMNS)
+        for workers in (1, 2):
+            result = sharded_metrics(self.shard_dir, max_workers=workers, schema=TRANSACTION_SCHEMA)
+            pd.testing.assert_frame_equal(result, expected, check_exact=True)
+
+    def test_worker_processes_are_spawned_not_forked(self):
+        partition_transactions(self.csv_path, self.shard_dir, 2, columns=REQUIRED_COLUMNS)
+        with mock.patch('src.sharding.ProcessPoolExecutor', wraps=ProcessPoolExecutor) as pool:
+            sharded_metrics(self.shard_dir, max_workers=2)
+        self.assertEqual(pool.call_args.kwargs['mp_context'].get_start_method(), 'spawn')
+
+    def test_sharded_analytics_segments_match(self):
+        single = CustomerBehaviorAnalytics(data_path=self.csv_path)
+        single.load_data()
+        expected = single.perform_customer_segmentation(single.calculate_customer_metrics())
+
+        sharded = CustomerBehaviorAnalytics(data_path=self.csv_path, num_shards=3, shard_dir=self.shard_dir,
+                                            shard_workers=2)
+        sharded.load_data()
+        self.assertIsNone(sharded.data)
+        self.assertEqual(sharded.ingest_stats['shards'], 3)
+        segments = sharded.perform_customer_segmentation(sharded.calculate_customer_metrics())
+        pd.testing.assert_frame_equal(segments, expected, check_exact=True)
+
+        # Shards ja gravados sao reutilizados sem o arquivo original
+        reused = CustomerBehaviorAnalytics(data_path=None, shard_dir=self.shard_dir, shard_workers=1)
+        reused.load_data()
+        pd.testing.assert_frame_equal(reused.calculate_customer_metrics(), sharded.calculate_customer_metrics(),
+                                      check_exact=True)
+
+if __name__ == '__main__':
+    unittest.main()
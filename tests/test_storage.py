@@ -0,0 +1,103 @@
+
+import importlib.util
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+from src import server
+from src.aggregate_cache import AggregateCache
+from src.customer_analytics import CustomerBehaviorAnalytics
+from src.data_store import DatasetStore
+from src.storage import convert_csv, detect_format, iter_chunks, read_table, write_chunks
+
+HAS_PYARROW = importlib.util.find_spec('pyarrow') is not None
+
+class TestStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.csv_path = os.path.join(self.tmpdir, 'customer_data.csv')
+        self.df = CustomerBehaviorAnalytics()._generate_synthetic_data(num_customers=300)
+        self.df.to_csv(self.csv_path, index=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_detect_format(self):
+        self.assertEqual(detect_format('a/b.csv'), 'csv')
+        self.assertEqual(detect_format('a/b.parquet'), 'parquet')
+        self.assertEqual(detect_format('a/b.feather'), 'arrow')
+
+    def test_csv_projection_and_filters(self):
+        df = read_table(self.csv_path, columns=['customer_id', 'country'], filters={'country': 'uk'})
+        self.assertEqual(list(df.columns), ['customer_id', 'country'])
+        self.assertEqual(len(df), (self.df['country'] == 'UK').sum())
+
+    @unittest.skipUnless(HAS_PYARROW, 'pyarrow not installed')
+    def test_columnar_roundtrip(self):
+        for name in ('customer_data.parquet', 'customer_data.feather'):
+            out_path = os.path.join(self.tmpdir, name)
+            self.assertEqual(convert_csv(self.csv_path, out_path, chunksize=100), 300)
+            df = read_table(out_path)
+            self.assertEqual(len(df), 300)
+            self.assertEqual(str(df['country'].dtype), 'category')
+            self.assertTrue(pd.api.types.is_datetime64_any_dtype(df['purchase_date']))
+
+            filtered = read_table(out_path, columns=['customer_id', 'category'],
+                                  filters={'country': 'germany', 'category': 'BOOKS'})
+            expected = self.df[(self.df['country'] == 'Germany') & (self.df['category'] == 'Books')]
+            self.assertEqual(list(filtered.columns), ['customer_id', 'category'])
+            self.assertEqual(filtered['customer_id'].tolist(), expected['customer_id'].tolist())
+            self.assertEqual(sum(len(c) for c in iter_chunks(out_path, chunksize=64)), 300)
+
+    @unittest.skipUnless(HAS_PYARROW, 'pyarrow not installed')
+    def test_parquet_pipeline_and_api(self):
+        out_path = os.path.join(self.tmpdir, 'customer_data.parquet')
+        convert_csv(self.csv_path, out_path)
+
+        analytics = CustomerBehaviorAnalytics(data_path=out_path)
+        analytics.load_data()
+        self.assertNotIn('email', analytics.data.columns)
+        from_csv = CustomerBehaviorAnalytics(data_path=self.csv_path)
+        from_csv.load_data()
+        pd.testing.assert_frame_equal(analytics.calculate_customer_metrics(), from_csv.calculate_customer_metrics(),
+                                      check_index_type=False, check_dtype=False)
+
+        original = (server.store, server.aggregate_cache)
+        server.store, server.aggregate_cache = DatasetStore(out_path), AggregateCache()
+        try:
+            client = server.app.test_client()
+            response = client.get('/api/customers?format=ndjson&country=usa')
+            rows = [json.loads(line) for line in response.data.decode().splitlines()]
+            self.assertEqual(len(rows), (self.df['country'] == 'USA').sum())
+            self.assertEqual(client.get('/health').get_json()['dataset']['format'], 'parquet')
+        finally:
+            server.store, server.aggregate_cache = original
+
+    @unittest.skipUnless(HAS_PYARROW, 'pyarrow not installed')
+    def test_export_stays_on_snapshot_version(self):
+        out_path = os.path.join(self.tmpdir, 'customer_data.parquet')
+        convert_csv(self.csv_path, out_path)
+        replacement = os.path.join(self.tmpdir, 'replacement.parquet')
+        write_chunks([self.df.head(10)], replacement)
+
+        original = server.store
+        server.store = DatasetStore(out_path)
+        try:
+            # Arquivo trocado depois de aberto: o export segue no arquivo mapeado
+            chunks = server.export_chunks(server.store.get(), {'country': 'usa'})
+            os.replace(replacement, out_path)
+            self.assertEqual(sum(len(c) for c in chunks), (self.df['country'] == 'USA').sum())
+
+            # Arquivo trocado antes do export: usa as linhas do snapshot em memoria
+            snapshot = server.store.get()
+            write_chunks([self.df.head(20)], out_path)
+            os.utime(out_path, ns=(0, 0))
+            self.assertEqual(sum(len(c) for c in server.export_chunks(snapshot, {})), 10)
+        finally:
+            server.store = original
+
+if __name__ == '__main__':
+    unittest.main()
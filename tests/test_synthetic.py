@@ -0,0 +1,44 @@
+
+import os
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+from src.metrics_engine import compute_customer_metrics
+from src.storage import read_table
+from src.synthetic import generate_transactions, iter_transactions, write_transactions
+
+class TestSyntheticGenerator(unittest.TestCase):
+
+    def test_reproducible_multi_purchase_history(self):
+        df = generate_transactions(20000, seed=7, block_customers=500)
+        self.assertEqual(len(df), 20000)
+        pd.testing.assert_frame_equal(df, generate_transactions(20000, seed=7, block_customers=500))
+        self.assertFalse(df.equals(generate_transactions(20000, seed=8, block_customers=500)))
+        self.assertGreater(df.groupby('customer_id').size().mean(), 5)
+        self.assertIsInstance(df['country'].dtype, pd.CategoricalDtype)
+
+        # Sazonalidade: dezembro vende mais que julho; quem abandonou compra ha mais tempo
+        months = df['purchase_date'].dt.month.value_counts()
+        self.assertGreater(months[12], months[7])
+        metrics = compute_customer_metrics(df)
+        recency = metrics.groupby('is_churned')['Recency'].mean()
+        self.assertGreater(recency[1], recency[0])
+
+    def test_chunks_are_bounded(self):
+        sizes = [len(chunk) for chunk in iter_transactions(50000, block_customers=1000)]
+        self.assertEqual(sum(sizes), 50000)
+        self.assertLess(max(sizes), 20000)
+
+    def test_streamed_csv_matches_in_memory(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'transactions.csv')
+            self.assertEqual(write_transactions(path, 5000, block_customers=200), 5000)
+            expected = generate_transactions(5000, block_customers=200)
+            pd.testing.assert_frame_equal(read_table(path), expected, check_dtype=False, check_categorical=False)
+        finally:
+            shutil.rmtree(tmpdir)
+
+if __name__ == '__main__':
+    unittest.main()